@@ -0,0 +1,211 @@
+import itertools
+import time
+from contextlib import asynccontextmanager
+
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row, namedtuple_row, tuple_row
+from psycopg_pool import AsyncConnectionPool
+
+from database import ROW_FORMATS, QueryCache, _row_count, _to_columns
+from instrumentation import caller_tag, result_size
+
+
+_ROW_FACTORIES = {
+    "dict": dict_row,
+    "tuple": tuple_row,
+    "record": namedtuple_row,
+    "columns": tuple_row,
+}
+
+
+class AsyncDatabase:
+    """asyncio counterpart of database.Database for services without a GUI.
+
+    Built on psycopg 3 and its AsyncConnectionPool: each execute_query or
+    stream_query borrows its own pooled connection, so up to pool_max
+    queries run at once (e.g. under asyncio.gather). The query API matches
+    Database: the same SQL and %s / %(name)s parameters, row formats, result
+    cache, metrics and transaction(), with coroutines and async generators.
+
+        async with AsyncDatabase("lab", "user", "secret", pool_max=20) as db:
+            rows = await db.execute_query(GRANTS_SQL, fetch=True)
+            async for batch in db.stream_query(USAGE_SQL, row_format="tuple"):
+                ...
+    """
+
+    def __init__(self, dbname, user, password, host="localhost", port=5432,
+                 pool_min=1, pool_max=10, pool_timeout=30.0, pool_max_idle=300.0,
+                 row_format="dict", cache_size=0, cache_ttl=60.0, cache_max_rows=10000,
+                 metrics=None):
+        self.row_format = self._check_row_format(row_format)
+        self.cache = QueryCache(cache_size, cache_ttl, cache_max_rows) if cache_size else None
+        self.metrics = metrics
+        self._cursor_ids = itertools.count(1)
+        # Opened by open() / async with: a pool cannot start without a running loop
+        self.pool = AsyncConnectionPool(
+            make_conninfo(dbname=dbname, user=user, password=password, host=host, port=port),
+            min_size=pool_min,
+            max_size=pool_max,
+            timeout=pool_timeout,
+            max_idle=pool_max_idle,
+            check=AsyncConnectionPool.check_connection,
+            open=False,
+        )
+
+    async def open(self, wait=True):
+        # wait=True fails fast if the server cannot be reached
+        await self.pool.open(wait=wait)
+        return self
+
+    async def close(self):
+        await self.pool.close()
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @staticmethod
+    def _check_row_format(row_format):
+        if row_format not in ROW_FORMATS:
+            raise ValueError(f"row_format must be one of {ROW_FORMATS}, got {row_format!r}")
+        return row_format
+
+    def _row_format(self, row_format):
+        if row_format is None:
+            return self.row_format
+        return self._check_row_format(row_format)
+
+    @asynccontextmanager
+    async def transaction(self, row_format="tuple"):
+        """Yield a cursor whose statements commit together, or roll back on error."""
+        try:
+            # The pool's connection block commits on success, rolls back on error
+            async with self.pool.connection() as conn:
+                async with conn.cursor(row_factory=_ROW_FACTORIES[self._row_format(row_format)]) as cur:
+                    yield cur
+        finally:
+            # The block may have written to any table
+            self.invalidate_cache()
+
+    def invalidate_cache(self, tables=None):
+        if self.cache is not None:
+            self.cache.invalidate(tables)
+
+    def execute_query(self, query, params=None, fetch=False, row_format=None, cache=True,
+                      prepare=None, tag=None):
+        # Awaitable with Database.execute_query's result. prepare=name (any
+        # name) has psycopg prepare the statement on each connection that
+        # runs it.
+        if self.metrics is None:
+            return self._run_query(query, params, fetch, row_format, cache, prepare)
+        # Name the caller now: once the coroutine runs in a task (asyncio.gather,
+        # create_task) its calling frame is the event loop
+        return self._timed_query(tag or caller_tag(), query, params, fetch, row_format, cache, prepare)
+
+    async def _timed_query(self, tag, query, params, fetch, row_format, cache, prepare):
+        start = time.perf_counter()
+        try:
+            result = await self._run_query(query, params, fetch, row_format, cache, prepare)
+        except Exception:
+            self.metrics.record(tag, query, time.perf_counter() - start, error=True)
+            raise
+        elapsed = time.perf_counter() - start
+        if fetch:
+            self.metrics.record(tag, query, elapsed, _row_count(result), result_size(result))
+        else:
+            self.metrics.record(tag, query, elapsed)
+        if self.metrics.is_slow(elapsed):
+            await self._log_slow(tag, query, params, elapsed)
+        return result
+
+    async def _log_slow(self, tag, query, params, elapsed):
+        plan = None
+        # EXPLAIN ANALYZE runs the statement again, so only for plain reads
+        if self.metrics.explain and QueryCache.is_cacheable(query):
+            try:
+                async with self.pool.connection() as conn:
+                    async with conn.cursor(row_factory=tuple_row) as cur:
+                        await cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+                        plan = "\n".join(row[0] for row in await cur.fetchall())
+                    await conn.rollback()
+            except Exception as e:
+                plan = f"EXPLAIN failed: {e}"
+        self.metrics.log_slow(tag, query, params, elapsed, plan)
+        print(f"Slow query ({elapsed:.3f}s, {tag}):", self.metrics.statement(query)[:200])
+
+    async def _run_query(self, query, params, fetch, row_format, cache, prepare):
+        row_format = self._row_format(row_format)
+        cache_key = None
+        is_read = self.cache is not None and self.cache.is_cacheable(query)
+        if is_read and fetch and cache:
+            cache_key = self.cache.key(query, params, row_format)
+        if cache_key is not None:
+            rows = self.cache.get(cache_key, row_format)
+            if rows is not None:
+                return rows
+            generation = self.cache.generation
+
+        result = True
+        try:
+            async with self.pool.connection() as conn:
+                async with conn.cursor(row_factory=_ROW_FACTORIES[row_format]) as cur:
+                    await cur.execute(query, params, prepare=True if prepare else None)
+                    if fetch:
+                        result = await cur.fetchall()
+                        if row_format == "columns":
+                            result = _to_columns(cur, result)
+        except Exception as e:
+            print("Query error:", e)
+            raise
+
+        # Committed when the connection block ended
+        if cache_key is not None:
+            self.cache.put(cache_key, result, row_format, generation)
+        elif self.cache is not None and not is_read:
+            self.cache.invalidate_for(query)
+        return result
+
+    def stream_query(self, query, params=None, itersize=2000, row_format=None, tag=None):
+        # Async generator of lists of up to `itersize` rows from a server-side
+        # cursor; the connection is held until it is exhausted or closed
+        # (aclose(), or leaving an `async for` early).
+        if self.metrics is None:
+            return self._stream(query, params, itersize, row_format)
+        # Name the caller now; the stream may be consumed from another frame
+        return self._timed_stream(tag or caller_tag(), query, params, itersize, row_format)
+
+    async def _timed_stream(self, tag, query, params, itersize, row_format):
+        start = time.perf_counter()
+        rows = nbytes = 0
+        error = True
+        try:
+            async for batch in self._stream(query, params, itersize, row_format):
+                rows += _row_count(batch)
+                nbytes += result_size(batch)
+                yield batch
+            error = False
+        except GeneratorExit:
+            # Closed early by the caller, not a failure
+            error = False
+            raise
+        finally:
+            self.metrics.record(tag, query, time.perf_counter() - start, rows, nbytes, error=error)
+
+    async def _stream(self, query, params, itersize, row_format):
+        row_format = self._row_format(row_format)
+        try:
+            async with self.pool.connection() as conn:
+                name = f"stream_{next(self._cursor_ids)}"
+                async with conn.cursor(name=name, row_factory=_ROW_FACTORIES[row_format]) as cur:
+                    cur.itersize = itersize
+                    await cur.execute(query, params)
+                    while True:
+                        rows = await cur.fetchmany(itersize)
+                        if not rows:
+                            break
+                        yield _to_columns(cur, rows) if row_format == "columns" else rows
+        except Exception as e:
+            print("Query error:", e)
+            raise
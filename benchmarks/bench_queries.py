@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks.lab import PAGED_TABLES
+from modules import equipment, mentorship, projects, reports
+from modules.widgets import page_queries
+
+
+def page_cases():
+    """(name, sql, params) for every statement the paged list tables issue."""
+    cases = []
+    for table, (key, columns) in PAGED_TABLES.items():
+        sql = page_queries(table, columns, key)
+        cases += [
+            (f"{table}_first_page", sql["first_page"], lambda s: (100,)),
+            (f"{table}_keyset", sql["keyset"], lambda s, t=table: (s["pages"][t][0], 100)),
+            (f"{table}_offset", sql["offset"], lambda s, t=table: (100, s["pages"][t][1])),
+            (f"{table}_count", sql["count"], lambda s: None),
+            (f"{table}_row", sql["row"], lambda s, t=table: (s["pages"][t][0],)),
+            (f"{table}_position", sql["position"], lambda s, t=table: (s["pages"][t][0],)),
+        ]
+    return cases
+
+
+# (name, sql, params from the lab's sample values) for every statement the
+# menus issue; the list tables' paging statements come from page_cases().
+CASES = page_cases() + [
+    ("members_by_grant", reports.MEMBERS_BY_GRANT_SQL, lambda s: (s["gid"],)),
+    ("project_mentorships", projects.PROJECT_MENTORSHIPS_SQL, lambda s: (s["pid"],)),
+    ("project_status", projects.PROJECT_STATUS_SQL, lambda s: (s["pid"],)),
+    ("grant_projects_active", reports.GRANT_PROJECTS_ACTIVE_SQL, lambda s: s["period"]),
+    ("equipment_status", equipment.EQUIPMENT_STATUS_SQL, lambda s: (s["eid"],)),
+    ("equipment_open_uses", equipment.EQUIPMENT_OPEN_USES_SQL, lambda s: (s["eid"],)),
+    ("current_users", equipment.CURRENT_USERS_SQL, lambda s: (s["eid"],)),
+    ("usage", equipment.USAGE_SQL, lambda s: None),
+    ("usage_row", equipment.USAGE_ROW_SQL, lambda s: s["uses_key"]),
+    ("top_publishers_view", reports.TOP_PUBLISHERS_VIEW_SQL, lambda s: None),
+    ("top_publishers_live", reports.TOP_PUBLISHERS_LIVE_SQL, lambda s: None),
+    ("avg_student_pubs_view", reports.AVG_STUDENT_PUBS_VIEW_SQL, lambda s: None),
+    ("avg_student_pubs_live", reports.AVG_STUDENT_PUBS_LIVE_SQL, lambda s: None),
+    ("top3_for_grant_view", reports.TOP3_FOR_GRANT_VIEW_SQL, lambda s: (s["gid"],)),
+    ("top3_for_grant_live", reports.TOP3_FOR_GRANT_LIVE_SQL, lambda s: (s["gid"],)),
+    ("report_view_status", reports.VIEW_STATUS_SQL, lambda s: ("report_member_publications",)),
+    ("grants", reports.GRANTS_SQL, lambda s: None),
+    ("publications", reports.PUBLICATIONS_SQL, lambda s: None),
+    ("mentorship_depth_stats", mentorship.DEPTH_STATS_SQL, lambda s: None),
+]
+
+
+@pytest.mark.parametrize("name, sql, params", CASES, ids=[case[0] for case in CASES])
+def test_query(benchmark, lab, plan_baseline, name, sql, params):
+    args = params(lab.sample)
+    shape = lab.plan_shape(sql, args)
+    benchmark.group = f"{lab.scale}"
+    benchmark.extra_info["plan"] = shape
+    plan_baseline.check(f"{lab.scale}:{name}", shape)
+    rows = benchmark(lab.run, sql, args)
+    assert rows is not None
@@ -0,0 +1,27 @@
+import os
+
+import psycopg2
+import pytest
+
+from benchmarks.lab import BASELINE_PATH, DSN_ENV, UPDATE_ENV, PlanBaseline, SeededLab, selected_scales
+
+
+@pytest.fixture(scope="session", params=selected_scales())
+def lab(request):
+    dsn = os.environ.get(DSN_ENV)
+    if not dsn:
+        pytest.skip(f"Set {DSN_ENV} to a scratch PostgreSQL database to run the benchmarks")
+    try:
+        seeded = SeededLab(dsn, request.param)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Benchmark database unavailable: {e}")
+    yield seeded
+    seeded.close()
+
+
+@pytest.fixture(scope="session")
+def plan_baseline():
+    baseline = PlanBaseline(BASELINE_PATH, update=os.environ.get(UPDATE_ENV) == "1")
+    yield baseline
+    baseline.save()
+
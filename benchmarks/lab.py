@@ -0,0 +1,185 @@
+import json
+import os
+from datetime import timedelta
+
+import psycopg2
+import pytest
+
+import create
+import generate
+import views
+from modules.equipment import EQUIPMENT_COLUMNS
+from modules.members import MEMBER_COLUMNS
+from modules.projects import PROJECT_COLUMNS
+
+
+# Benchmarks need a PostgreSQL database to seed, given as a libpq DSN, e.g.
+#   LAB_BENCH_DSN="dbname=labbench user=postgres host=localhost"
+# Each scale is loaded into its own schema (bench_<scale>) of that database and
+# reused by later runs while its generator parameters are unchanged.
+DSN_ENV = "LAB_BENCH_DSN"
+SCALES_ENV = "LAB_BENCH_SCALES"
+UPDATE_ENV = "LAB_BENCH_UPDATE_BASELINE"
+
+SCALES = {
+    "small": dict(members=1000, projects=200, grants=50, equipment=100,
+                  weeks=52, uses=10000, publications=2000),
+    "medium": dict(members=10000, projects=2000, grants=500, equipment=1000,
+                   weeks=52, uses=100000, publications=20000),
+    "large": dict(members=100000, projects=20000, grants=5000, equipment=10000,
+                  weeks=52, uses=1000000, publications=200000),
+}
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline_plans.json")
+
+# Tables listed by the menus' VirtualTable, with their key
+PAGED_TABLES = {
+    "lab_member": ("mid", MEMBER_COLUMNS),
+    "project": ("pid", PROJECT_COLUMNS),
+    "equipment": ("eid", EQUIPMENT_COLUMNS),
+}
+
+
+def selected_scales():
+    names = os.environ.get(SCALES_ENV, "small").split(",")
+    unknown = [n for n in names if n not in SCALES]
+    if unknown:
+        raise pytest.UsageError(f"Unknown {SCALES_ENV} scale(s): {', '.join(unknown)}")
+    return names
+
+
+def _connect(dsn, schema=None):
+    options = f"-c search_path={schema}" if schema else None
+    return psycopg2.connect(dsn, options=options)
+
+
+def seed(dsn, scale):
+    """Load one scale into schema bench_<scale> unless it is already there.
+
+    create.py runs every time so a reused schema picks up new migrations.
+    """
+    schema = f"bench_{scale}"
+    params = json.dumps(SCALES[scale], sort_keys=True)
+    conn = _connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        fresh = True
+        cur.execute("SELECT to_regclass(%s);", (f"{schema}.bench_seed",))
+        if cur.fetchone()[0] is not None:
+            cur.execute(f"SELECT params FROM {schema}.bench_seed;")
+            fresh = cur.fetchone()[0] != params
+        if fresh:
+            cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE;")
+            cur.execute(f"CREATE SCHEMA {schema};")
+    conn.close()
+
+    # create.py and generate.py open their own connections
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(create, "get_connection", lambda: _connect(dsn, schema))
+        mp.setattr(generate, "get_connection", lambda: _connect(dsn, schema))
+        create.main()
+        if fresh:
+            generate.main(generate.SyntheticLab(**SCALES[scale]))
+
+    conn = _connect(dsn, schema)
+    with conn.cursor() as cur:
+        if fresh:
+            views.create_views(cur)
+            views.refresh_views(cur, force=True)
+            cur.execute("CREATE TABLE bench_seed (params TEXT NOT NULL);")
+            cur.execute("INSERT INTO bench_seed VALUES (%s);", (params,))
+    conn.commit()
+    # Fresh statistics and visibility map, so plans (index-only scans in
+    # particular) do not depend on whether autovacuum has run yet
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("VACUUM ANALYZE;")
+    conn.close()
+    return schema
+
+
+class SeededLab:
+    """A seeded scale: runs statements on an autocommit connection."""
+
+    def __init__(self, dsn, scale):
+        self.scale = scale
+        self.conn = _connect(dsn, seed(dsn, scale))
+        self.conn.autocommit = True
+        self.sample = self._sample()
+
+    def run(self, sql, params=None):
+        with self.conn.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall()
+
+    def _one(self, sql, params=None):
+        rows = self.run(sql, params)
+        return rows[0] if rows else None
+
+    def _sample(self):
+        # Parameter values that exist at every scale and exercise the joins
+        gid = self._one("SELECT gid FROM funds GROUP BY gid ORDER BY COUNT(*) DESC, gid LIMIT 1;")[0]
+        pid = self._one(
+            "SELECT pid FROM works WHERE week = 1 GROUP BY pid ORDER BY COUNT(*) DESC, pid LIMIT 1;")[0]
+        eid = self._one("SELECT eid FROM equipment WHERE status = 'In Use' ORDER BY eid LIMIT 1;")[0]
+        uses_key = self._one(
+            "SELECT eid, mid, start_date FROM uses WHERE eid = %s ORDER BY start_date DESC LIMIT 1;", (eid,))
+        # The year of history before the generator's anchor date
+        end = generate.ANCHOR_DATE
+        sample = dict(gid=gid, pid=pid, eid=eid, uses_key=tuple(uses_key),
+                      period=(gid, end, end - timedelta(days=365)), pages={})
+        for table, (key, _) in PAGED_TABLES.items():
+            total = self._one(f"SELECT COUNT(*) FROM {table};")[0]
+            middle = self._one(f"SELECT {key} FROM {table} ORDER BY {key} OFFSET %s LIMIT 1;", (total // 2,))[0]
+            sample["pages"][table] = (middle, total // 2)
+        return sample
+
+    def plan_shape(self, sql, params=None):
+        """The plan as node types and the relations/indexes they read, without costs."""
+        with self.conn.cursor() as cur:
+            cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cur.fetchone()[0][0]["Plan"]
+
+        def shape(node):
+            text = node["Node Type"]
+            target = node.get("Index Name") or node.get("Relation Name")
+            if target:
+                text += f"[{target}]"
+            children = [shape(child) for child in node.get("Plans", [])]
+            return f"{text}({', '.join(children)})" if children else text
+        return shape(plan)
+
+    def close(self):
+        self.conn.close()
+
+
+class PlanBaseline:
+    """Plan shapes recorded in baseline_plans.json, keyed '<scale>:<query>'."""
+
+    def __init__(self, path, update=False):
+        self.path = path
+        self.update = update
+        self.changed = False
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.plans = json.load(f)
+        except FileNotFoundError:
+            self.plans = {}
+
+    def check(self, key, shape):
+        expected = self.plans.get(key)
+        if self.update or expected is None:
+            if expected != shape:
+                self.plans[key] = shape
+                self.changed = True
+            return
+        assert shape == expected, (
+            f"Plan shape of {key} changed:\n  baseline: {expected}\n  now:      {shape}\n"
+            f"Run with {UPDATE_ENV}=1 to accept it."
+        )
+
+    def save(self):
+        if self.changed:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(dict(sorted(self.plans.items())), f, indent=2)
+                f.write("\n")
@@ -1,4 +1,8 @@
+import argparse
+import sys
+
 import psycopg2
+import psycopg2.errors
 
 # ------------------------
 # DATABASE CONNECTION
@@ -13,6 +17,185 @@ def get_connection():
     )
 
 
+# ------------------------
+# SECONDARY INDEXES
+# ------------------------
+# The composite primary keys lead with the other column (WORKS is (PID, MID, WEEK),
+# FUNDS is (GID, PID), ...), so lookups the menus make by the second column would
+# fall back to sequential scans without these.
+INDEXES = {
+    # members-by-grant / top-3 joins and the weekly-hours trigger: WORKS by member
+    "idx_works_mid_week": "CREATE INDEX IF NOT EXISTS idx_works_mid_week ON WORKS (MID, WEEK);",
+    # grant reports join FUNDS to projects by PID
+    "idx_funds_pid": "CREATE INDEX IF NOT EXISTS idx_funds_pid ON FUNDS (PID);",
+    # publication counts per member
+    "idx_published_mid": "CREATE INDEX IF NOT EXISTS idx_published_mid ON PUBLISHED (MID);",
+    # open usage rows per device (show_status, show_current_users)
+    "idx_uses_open_eid": "CREATE INDEX IF NOT EXISTS idx_uses_open_eid ON USES (EID) WHERE END_DATE IS NULL;",
+    # end_usage matches EID/MID case-insensitively on open rows
+    "idx_uses_open_upper": (
+        "CREATE INDEX IF NOT EXISTS idx_uses_open_upper ON USES (UPPER(EID), UPPER(MID)) "
+        "WHERE END_DATE IS NULL;"
+    ),
+    # sessions overlapping a date or period, across devices (USES.PERIOD @> / &&)
+    "idx_uses_period": "CREATE INDEX IF NOT EXISTS idx_uses_period ON USES USING gist (PERIOD);",
+    # member deletes cascade into USES; usage table is listed newest first
+    "idx_uses_mid": "CREATE INDEX IF NOT EXISTS idx_uses_mid ON USES (MID);",
+    "idx_uses_start_date": "CREATE INDEX IF NOT EXISTS idx_uses_start_date ON USES (START_DATE DESC);",
+    # mentorship joins
+    "idx_lab_member_mentor_mid": "CREATE INDEX IF NOT EXISTS idx_lab_member_mentor_mid ON LAB_MEMBER (MENTOR_MID);",
+    # projects active in a period (modules/activity.py); same expression as the queries
+    "idx_project_period": (
+        "CREATE INDEX IF NOT EXISTS idx_project_period ON PROJECT "
+        "USING gist (daterange(START_DATE, END_DATE, '[]')) WHERE START_DATE IS NOT NULL;"
+    ),
+    # effort per project (modules/effort.py); the primary key leads with MID
+    "idx_member_project_month_hours_pid": (
+        "CREATE INDEX IF NOT EXISTS idx_member_project_month_hours_pid ON MEMBER_PROJECT_MONTH_HOURS (PID, MONTH);"
+    ),
+    # projects led by a faculty member (and FK checks when faculty are deleted)
+    "idx_project_facultyid": "CREATE INDEX IF NOT EXISTS idx_project_facultyid ON PROJECT (FACULTYID);",
+}
+
+
+def create_indexes(cur):
+    for ddl in INDEXES.values():
+        cur.execute(ddl)
+
+
+def missing_indexes(cur):
+    """Return the names from INDEXES that do not exist in the current schema."""
+    cur.execute(
+        "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND indexname = ANY(%s);",
+        (list(INDEXES),)
+    )
+    present = {row[0] for row in cur.fetchall()}
+    return [name for name in INDEXES if name not in present]
+
+
+# ------------------------
+# USES PERIOD MIGRATION
+# ------------------------
+USES_PERIOD_COLUMN_SQL = (
+    "ALTER TABLE USES ADD COLUMN IF NOT EXISTS PERIOD DATERANGE "
+    "GENERATED ALWAYS AS (daterange(START_DATE, END_DATE, '[)')) STORED;"
+)
+# One device cannot be in two sessions at once. The GiST index behind the
+# constraint also answers "who uses E007 now" (EID = ... AND PERIOD @> date).
+USES_EXCLUSION_SQL = (
+    "ALTER TABLE USES ADD CONSTRAINT uses_no_overlap "
+    "EXCLUDE USING gist (EID WITH =, PERIOD WITH &&);"
+)
+# Without btree_gist the same rule is enforced by a trigger; the advisory lock
+# serialises concurrent bookings of one device.
+USES_OVERLAP_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION uses_no_overlap() RETURNS trigger AS $$
+DECLARE
+    clash RECORD;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('uses:' || NEW.EID));
+    SELECT MID, START_DATE, END_DATE INTO clash FROM USES
+    WHERE EID = NEW.EID
+      AND PERIOD && daterange(NEW.START_DATE, NEW.END_DATE, '[)')
+      AND (TG_OP = 'INSERT' OR (EID, MID, START_DATE) <> (OLD.EID, OLD.MID, OLD.START_DATE))
+    LIMIT 1;
+    IF FOUND THEN
+        RAISE EXCEPTION 'Equipment % is already in use by % from %', NEW.EID, clash.MID, clash.START_DATE
+            USING ERRCODE = 'exclusion_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_uses_no_overlap ON USES;
+CREATE TRIGGER trg_uses_no_overlap
+BEFORE INSERT OR UPDATE OF EID, MID, START_DATE, END_DATE ON USES
+FOR EACH ROW EXECUTE FUNCTION uses_no_overlap();
+"""
+
+
+def migrate_uses_period(cur):
+    """Add USES.PERIOD and forbid overlapping sessions of one device.
+
+    Uses an exclusion constraint when the btree_gist extension can be
+    installed, otherwise a trigger. Returns "exclusion" or "trigger".
+    """
+    cur.execute(USES_PERIOD_COLUMN_SQL)
+    # Superseded by PERIOD @> CURRENT_DATE lookups
+    cur.execute("DROP INDEX IF EXISTS idx_uses_eid_end_date;")
+    cur.execute(
+        "SELECT 1 FROM pg_constraint WHERE conname = 'uses_no_overlap' AND conrelid = 'uses'::regclass;"
+    )
+    if cur.fetchone():
+        return "exclusion"
+
+    cur.execute("SAVEPOINT uses_exclusion;")
+    try:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS btree_gist;")
+        cur.execute(USES_EXCLUSION_SQL)
+    except (psycopg2.errors.UndefinedFile, psycopg2.errors.FeatureNotSupported,
+            psycopg2.errors.InsufficientPrivilege) as e:
+        # btree_gist is not installed on the server, or we may not create it
+        cur.execute("ROLLBACK TO SAVEPOINT uses_exclusion;")
+        print(f"btree_gist unavailable ({e.pgerror.strip().splitlines()[0] if e.pgerror else e}); "
+              "using a trigger to prevent overlapping USES sessions.")
+    except psycopg2.errors.ExclusionViolation:
+        cur.execute("ROLLBACK TO SAVEPOINT uses_exclusion;")
+        print("Existing USES sessions overlap; fix them and re-run create.py to add the "
+              "exclusion constraint. New sessions are checked by a trigger meanwhile.")
+    else:
+        cur.execute("RELEASE SAVEPOINT uses_exclusion;")
+        cur.execute("DROP TRIGGER IF EXISTS trg_uses_no_overlap ON USES;")
+        return "exclusion"
+    cur.execute("RELEASE SAVEPOINT uses_exclusion;")
+    cur.execute(USES_OVERLAP_TRIGGER_SQL)
+    return "trigger"
+
+
+# WEEK is a week of the year; the effort ledger (triggers.py) files its hours
+# under the month the week starts in, so other values have no month.
+WORKS_WEEK_CHECK_SQL = (
+    "ALTER TABLE WORKS ADD CONSTRAINT works_week_range CHECK (WEEK BETWEEN 1 AND 53) NOT VALID;"
+)
+
+
+def migrate_works_week(cur):
+    """Add the WORKS.WEEK range check to tables created before it.
+
+    Returns the number of existing rows outside 1..53. The check applies to
+    new rows either way; it is only validated once no old row breaks it.
+    """
+    cur.execute(
+        "SELECT convalidated FROM pg_constraint WHERE conname = 'works_week_range' AND conrelid = 'works'::regclass;"
+    )
+    row = cur.fetchone()
+    if row is None:
+        cur.execute(WORKS_WEEK_CHECK_SQL)
+    elif row[0]:
+        return 0
+    cur.execute("SELECT COUNT(*) FROM WORKS WHERE WEEK NOT BETWEEN 1 AND 53;")
+    bad = cur.fetchone()[0]
+    if not bad:
+        cur.execute("ALTER TABLE WORKS VALIDATE CONSTRAINT works_week_range;")
+    return bad
+
+
+def check_indexes():
+    conn = get_connection()
+    cur = conn.cursor()
+    missing = missing_indexes(cur)
+    cur.close()
+    conn.close()
+    if missing:
+        print("Missing secondary indexes:")
+        for name in missing:
+            print(f"  {name}: {INDEXES[name]}")
+        print("Run create.py to create them.")
+    else:
+        print(f"All {len(INDEXES)} secondary indexes are present.")
+    return missing
+
+
 def main():
     conn = get_connection()
     cur = conn.cursor()
@@ -125,6 +308,9 @@ CREATE TABLE IF NOT EXISTS LAB_MEMBER (
             PURPOSE VARCHAR(255),
             START_DATE DATE,
             END_DATE DATE,
+            -- [START_DATE, END_DATE): a session is current from its start day
+            -- until the day before END_DATE; an open session never ends
+            PERIOD DATERANGE GENERATED ALWAYS AS (daterange(START_DATE, END_DATE, '[)')) STORED,
             PRIMARY KEY (EID, MID, START_DATE),
             FOREIGN KEY (EID) REFERENCES EQUIPMENT(EID) ON DELETE CASCADE,
             FOREIGN KEY (MID) REFERENCES LAB_MEMBER(MID) ON DELETE CASCADE,
@@ -151,6 +337,7 @@ CREATE TABLE IF NOT EXISTS LAB_MEMBER (
             WEEK INT NOT NULL,
             ROLE VARCHAR(100) NOT NULL,
             HOURS INT CHECK (HOURS >= 0 AND HOURS <= 40),
+            CONSTRAINT works_week_range CHECK (WEEK BETWEEN 1 AND 53),
             PRIMARY KEY (PID, MID, WEEK),
             FOREIGN KEY (PID) REFERENCES PROJECT(PID) ON DELETE CASCADE,
             FOREIGN KEY (MID) REFERENCES LAB_MEMBER(MID) ON DELETE CASCADE
@@ -166,6 +353,44 @@ CREATE TABLE IF NOT EXISTS LAB_MEMBER (
             FOREIGN KEY (PUBLICATIONID) REFERENCES PUBLICATION(PUBLICATIONID) ON DELETE CASCADE,
             FOREIGN KEY (MID) REFERENCES LAB_MEMBER(MID) ON DELETE CASCADE
         );
+        """,
+
+        # MEMBER_WEEK_HOURS: total WORKS hours per member and week, maintained
+        # by the WORKS triggers in triggers.py for the 40-hour check. ENTRIES
+        # counts the WORKS rows behind a total, as in the effort ledger below.
+        """
+        CREATE TABLE IF NOT EXISTS MEMBER_WEEK_HOURS (
+            MID VARCHAR(10) NOT NULL,
+            WEEK INT NOT NULL,
+            HOURS INT NOT NULL DEFAULT 0,
+            ENTRIES INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (MID, WEEK)
+        );
+        """,
+
+        # Effort ledger: WORKS rolled up per member, project and month, and per
+        # project and week, maintained by the WORKS triggers in triggers.py so
+        # effort reports read totals instead of scanning the WORKS history.
+        # ENTRIES counts the WORKS rows behind a total (the members, for
+        # PROJECT_WEEK_HOURS); a total whose count drops to 0 is deleted.
+        """
+        CREATE TABLE IF NOT EXISTS MEMBER_PROJECT_MONTH_HOURS (
+            MID VARCHAR(10) NOT NULL,
+            PID VARCHAR(10) NOT NULL,
+            MONTH INT NOT NULL CHECK (MONTH BETWEEN 1 AND 12),
+            HOURS BIGINT NOT NULL DEFAULT 0,
+            ENTRIES INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (MID, PID, MONTH)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS PROJECT_WEEK_HOURS (
+            PID VARCHAR(10) NOT NULL,
+            WEEK INT NOT NULL,
+            HOURS BIGINT NOT NULL DEFAULT 0,
+            ENTRIES INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (PID, WEEK)
+        );
         """
     ]
 
@@ -174,9 +399,29 @@ CREATE TABLE IF NOT EXISTS LAB_MEMBER (
     conn.commit()
     print("All tables created successfully.\n")
 
+    mode = migrate_uses_period(cur)
+    conn.commit()
+    print(f"USES.PERIOD in place; overlapping sessions rejected by {mode}.\n")
+
+    bad_weeks = migrate_works_week(cur)
+    conn.commit()
+    if bad_weeks:
+        print(f"{bad_weeks} WORKS row(s) have a WEEK outside 1..53; fix them and re-run create.py. "
+              "New rows are checked already.\n")
+
+    create_indexes(cur)
+    conn.commit()
+    print(f"{len(INDEXES)} secondary indexes created (or already present).\n")
+
     cur.close()
     conn.close()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the lab schema and its secondary indexes.")
+    parser.add_argument("--check-indexes", action="store_true",
+                        help="only report which secondary indexes are missing (exit status 1 if any)")
+    args = parser.parse_args()
+    if args.check_indexes:
+        sys.exit(1 if check_indexes() else 0)
     main()
@@ -1,44 +1,786 @@
+import itertools
+import json
+import re
+import select
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
 import psycopg2
+import psycopg2.errors
 import psycopg2.extras
 
+from instrumentation import caller_tag, result_size
+
+
+# Row shapes execute_query/stream_query can return:
+#   "dict"    - RealDictCursor dicts keyed by column name (default)
+#   "tuple"   - plain tuples in SELECT-list order
+#   "record"  - namedtuples (slotted tuples with attribute access)
+#   "columns" - one dict of column name -> list of values for the whole result
+ROW_FORMATS = ("dict", "tuple", "record", "columns")
+
+_CURSOR_FACTORIES = {
+    "dict": psycopg2.extras.RealDictCursor,
+    "tuple": None,
+    "record": psycopg2.extras.NamedTupleCursor,
+    "columns": None,
+}
+
+
+def _to_columns(cur, rows):
+    names = [d[0] for d in cur.description]
+    if not rows:
+        return {name: [] for name in names}
+    return {name: list(values) for name, values in zip(names, zip(*rows))}
+
+
+def _row_count(rows):
+    if isinstance(rows, dict):
+        # row_format="columns"
+        return len(next(iter(rows.values()), []))
+    return len(rows)
+
+
+def _copy_rows(rows, row_format):
+    # Cached results are shared, so callers always get their own copy
+    if row_format == "columns":
+        return {name: list(values) for name, values in rows.items()}
+    if row_format == "dict":
+        return [dict(r) for r in rows]
+    # tuples and namedtuples are immutable
+    return list(rows)
+
+
+# Tables written by triggers when the key table is inserted into (triggers.py,
+# views.py), so cached reads of them are dropped along with the key table's.
+CACHE_DEPENDENTS = {
+    "works": ("member_week_hours", "member_project_month_hours", "project_week_hours", "report_view_changes"),
+    "published": ("report_view_changes",),
+    "lab_member": ("report_view_changes",),
+    "student": ("report_view_changes",),
+    "funds": ("report_view_changes",),
+}
+
+# Quoted literals/identifiers (kept verbatim), comments and whitespace runs
+_SQL_TOKENS = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|(?:\s|--[^\n]*|/\*.*?\*/)+", re.S)
+_WORDS = re.compile(r"[a-z_][a-z0-9_$]*")
+_LOCKING_OR_SIDE_EFFECTS = re.compile(r"\bfor\s+(update|share|no\s+key|key)\b|\binto\b|\bnextval\s*\(|\bsetval\s*\(")
+_DML = re.compile(r"\b(insert|update|delete|merge)\b")
+_INSERT_TARGET = re.compile(r"insert\s+into\s+(?:[\w\"]+\.)?\"?(\w+)")
+
+
+def _normalize(query):
+    # Collapse whitespace and drop comments outside of quotes
+    def token(match):
+        text = match.group(0)
+        return text if text[0] in "'\"" else " "
+    return _SQL_TOKENS.sub(token, query).strip().rstrip(";").strip()
+
+
+# psycopg2 substitutes these anywhere in the query text, quotes included
+_PLACEHOLDERS = re.compile(r"%%|%s|%\(")
+_STATEMENT_NAME = re.compile(r"[a-z_][a-z0-9_]*")
+
+
+def _numbered_params(query):
+    # Rewrite psycopg2 %s placeholders as PREPARE's $1, $2, ... and return
+    # the statement with its parameter count.
+    count = 0
+
+    def token(match):
+        nonlocal count
+        text = match.group(0)
+        if text == "%s":
+            count += 1
+            return f"${count}"
+        if text == "%%":
+            return "%"
+        raise ValueError("Prepared statements take positional %s parameters only")
+    return _PLACEHOLDERS.sub(token, query).strip().rstrip(";"), count
+
+
+class QueryCache:
+    """LRU cache of SELECT results with a time-to-live, invalidated by table.
+
+    Only plain SELECTs that read a table are cached. An entry is tagged with
+    every identifier in its statement, a superset of the tables it reads, so
+    subqueries, CTEs and comma joins are covered. An INSERT drops the entries
+    mentioning its target table (and the tables its triggers write, see
+    CACHE_DEPENDENTS); any other statement (UPDATE, DELETE, TRUNCATE, DDL,
+    SELECT of a function such as refresh_report_views()) may cascade or have
+    side effects, so it clears the whole cache. The TTL bounds how long
+    changes made by other clients can go unseen.
+    """
+
+    def __init__(self, max_entries=256, ttl=60.0, max_rows=10000, dependents=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.dependents = CACHE_DEPENDENTS if dependents is None else dependents
+        self._lock = threading.Lock()
+        # key -> (expires_at, rows, identifiers)
+        self._entries = OrderedDict()
+        # Bumped by every invalidation; a result read before an invalidation
+        # finished is not stored, as it may predate the write.
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def is_cacheable(query):
+        normalized = _normalize(query).lower()
+        if normalized.startswith("with "):
+            # Data-modifying CTEs are writes
+            if _DML.search(normalized):
+                return False
+        elif not normalized.startswith("select "):
+            return False
+        return " from " in normalized and not _LOCKING_OR_SIDE_EFFECTS.search(normalized)
+
+    @staticmethod
+    def key(query, params, row_format):
+        if isinstance(params, list):
+            params = tuple(params)
+        elif isinstance(params, dict):
+            params = tuple(sorted(params.items()))
+        key = (_normalize(query), params, row_format)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get(self, key, row_format):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _copy_rows(entry[1], row_format)
+
+    def put(self, key, rows, row_format, generation):
+        count = len(next(iter(rows.values()), [])) if row_format == "columns" else len(rows)
+        if count > self.max_rows:
+            return
+        identifiers = frozenset(_WORDS.findall(key[0].lower()))
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, _copy_rows(rows, row_format), identifiers)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tables=None):
+        """Drop entries reading any of `tables` (lower-case names), or everything."""
+        with self._lock:
+            self.generation += 1
+            if tables is None:
+                self._entries.clear()
+                return
+            tables = set(tables)
+            for table in list(tables):
+                tables.update(self.dependents.get(table, ()))
+            for key in [k for k, e in self._entries.items() if e[2] & tables]:
+                del self._entries[key]
+
+    def invalidate_for(self, query):
+        # Invalidate whatever a non-cacheable statement may have changed
+        match = _INSERT_TARGET.match(_normalize(query).lower())
+        self.invalidate([match.group(1)] if match else None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Channel the notify_lab_change() triggers (triggers.py) publish on
+CHANGE_CHANNEL = "lab_changes"
+
+
+class CancelScope:
+    """Connections one piece of work is running statements on.
+
+    Statements run inside `Database.cancel_scope(scope)` register their
+    connection here while they hold it, so another thread can cancel them
+    with libpq's out-of-band cancel request. That needs no second pooled
+    connection, and a connection handed back to the pool (perhaps already
+    running someone else's statement) is never cancelled.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conns = []
+        self.cancelled = False
+
+    def _enter(self, conn):
+        with self._lock:
+            self._conns.append(conn)
+
+    def _exit(self, conn):
+        with self._lock:
+            self._conns.remove(conn)
+
+    def cancel(self):
+        # Returns whether a statement was running to cancel
+        with self._lock:
+            self.cancelled = True
+            for conn in self._conns:
+                conn.cancel()
+            return bool(self._conns)
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections.
+
+    Connections are health-checked when borrowed and idle connections above
+    ``minconn`` are closed once they have been unused for ``max_idle`` seconds.
+    """
+
+    def __init__(self, minconn, maxconn, timeout=30.0, max_idle=300.0, on_discard=None,
+                 **connect_kwargs):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Pool sizes must satisfy 0 <= minconn <= maxconn and maxconn >= 1")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_idle = max_idle
+        # Called with every connection the pool closes
+        self.on_discard = on_discard
+        self._connect_kwargs = connect_kwargs
+        self._cond = threading.Condition()
+        # Idle connections as (conn, last_used) pairs, most recently used last
+        self._idle = []
+        self._in_use = set()
+        # Slots reserved by callers that are opening a new connection
+        self._pending = 0
+        self._closed = False
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        return psycopg2.connect(**self._connect_kwargs)
+
+    def _size(self):
+        return len(self._idle) + len(self._in_use) + self._pending
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        if self.on_discard is not None:
+            self.on_discard(conn)
+
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            self._reap_idle_locked()
+            while True:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                    self._in_use.add(conn)
+                    break
+                if self._size() < self.maxconn:
+                    # Reserve the slot before connecting outside the lock
+                    conn = None
+                    self._pending += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                self._cond.wait(remaining)
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._pending -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._pending -= 1
+                self._in_use.add(conn)
+            return conn
+
+        # Health check on borrow; replace a dead connection transparently
+        if not self._is_healthy(conn):
+            self._discard(conn)
+            try:
+                fresh = self._connect()
+            except Exception:
+                with self._cond:
+                    self._in_use.discard(conn)
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._in_use.discard(conn)
+                self._in_use.add(fresh)
+            conn = fresh
+        return conn
+
+    def putconn(self, conn, discard=False):
+        with self._cond:
+            self._in_use.discard(conn)
+            if discard or self._closed or conn.closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._reap_idle_locked()
+            self._cond.notify()
+
+    def reap_idle(self):
+        with self._cond:
+            self._reap_idle_locked()
+
+    def _reap_idle_locked(self):
+        if self.max_idle is None:
+            return
+        now = time.monotonic()
+        keep = []
+        # Oldest connections sit at the front of the list
+        excess = self._size() - self.minconn
+        for conn, last_used in self._idle:
+            if excess > 0 and now - last_used > self.max_idle:
+                self._discard(conn)
+                excess -= 1
+            else:
+                keep.append((conn, last_used))
+        self._idle = keep
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+            for conn in self._in_use:
+                self._discard(conn)
+            self._in_use = set()
+            self._cond.notify_all()
+
+
 class Database:
-    def __init__(self, dbname, user, password, host="localhost", port=5432):
+    def __init__(self, dbname, user, password, host="localhost", port=5432,
+                 pool_min=None, pool_max=None, pool_timeout=30.0, pool_max_idle=300.0,
+                 row_format="dict", cache_size=0, cache_ttl=60.0, cache_max_rows=10000,
+                 metrics=None):
+        # Passing pool_max switches to pooled mode: each execute_query borrows
+        # its own connection so concurrent callers do not queue on one socket.
+        # row_format sets the default row shape (see ROW_FORMATS); callers can
+        # override it per query. cache_size > 0 enables the QueryCache for
+        # execute_query reads. metrics takes an instrumentation.QueryMetrics
+        # to time every query and keep a slow-query log.
+        self.row_format = self._check_row_format(row_format)
+        self.cache = QueryCache(cache_size, cache_ttl, cache_max_rows) if cache_size else None
+        self.metrics = metrics
         self.conn = None
+        self.pool = None
+        self._cursor_ids = itertools.count(1)
+        # Per-thread CancelScope (see cancel_scope)
+        self._local = threading.local()
+        connect_kwargs = dict(
+            database=dbname,
+            user=user,
+            password=password,
+            host=host,
+            port=port
+        )
+        self._connect_kwargs = connect_kwargs
+        # Prepared statements: name -> (query, numbered statement, parameter
+        # count), and the names PREPAREd on each open connection.
+        self._statements = {}
+        self._prepared = {}
+        # Change listeners (see add_listener) and their background thread
+        self._listeners = []
+        self._listener_thread = None
+        self._listener_stop = threading.Event()
         try:
-            self.conn = psycopg2.connect(
-                database=dbname,
-                user=user,
-                password=password,
-                host=host,
-                port=port
-            )
+            if pool_max:
+                self.pool = ConnectionPool(
+                    pool_min if pool_min is not None else 1,
+                    pool_max,
+                    timeout=pool_timeout,
+                    max_idle=pool_max_idle,
+                    on_discard=self._forget_prepared,
+                    **connect_kwargs
+                )
+            else:
+                self.conn = psycopg2.connect(**connect_kwargs)
             print("Connected to PostgreSQL successfully!")
         except Exception as e:
             print("Database connection failed:", e)
 
-    def execute_query(self, query, params=None, fetch=False):
+    @staticmethod
+    def _check_row_format(row_format):
+        if row_format not in ROW_FORMATS:
+            raise ValueError(f"row_format must be one of {ROW_FORMATS}, got {row_format!r}")
+        return row_format
+
+    def _row_format(self, row_format):
+        if row_format is None:
+            return self.row_format
+        return self._check_row_format(row_format)
+
+    @contextmanager
+    def _connection(self):
+        scope = getattr(self._local, "scope", None)
+        if self.pool is None:
+            conn = self.conn
+        else:
+            conn = self.pool.getconn()
+        if scope is not None:
+            scope._enter(conn)
+        broken = False
         try:
-            with self.conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                cur.execute(query, params)
+            yield conn
+        except psycopg2.InterfaceError:
+            broken = True
+            raise
+        finally:
+            # Unregistered before the pool can lend the connection out again
+            if scope is not None:
+                scope._exit(conn)
+            if self.pool is not None:
+                self.pool.putconn(conn, discard=broken)
 
-                if fetch:
-                    return cur.fetchall()
+    @contextmanager
+    def cancel_scope(self, scope):
+        """Register the connections of statements this thread runs in the block with `scope`.
 
-                self.conn.commit()
-                return True
-        except Exception as e:
-            # Rollback to clear connection error state, log and propagate the
-            # exception so callers (UI) can display accurate error messages and
-            # avoid continuing as if the operation succeeded.
+        `scope.cancel()` from any thread then aborts them; the statement
+        raises QueryCanceled.
+        """
+        outer = getattr(self._local, "scope", None)
+        self._local.scope = scope
+        try:
+            yield scope
+        finally:
+            self._local.scope = outer
+
+    @contextmanager
+    def transaction(self, row_format="tuple"):
+        """Yield a cursor whose statements commit together, or roll back on error.
+
+        Use SAVEPOINTs on the cursor for partial recovery inside the block.
+        """
+        with self._connection() as conn:
             try:
-                if self.conn:
-                    self.conn.rollback()
+                with conn.cursor(cursor_factory=_CURSOR_FACTORIES[self._row_format(row_format)]) as cur:
+                    yield cur
+                conn.commit()
             except Exception:
-                pass
-            print("Query error:", e)
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                raise
+            finally:
+                # The block may have written to any table
+                self.invalidate_cache()
+
+    def prepare(self, name, query):
+        """Register `query` (with %s placeholders) as server-side prepared statement `name`.
+
+        Each connection PREPAREs it the first time it runs it there, so later
+        calls skip parsing and planning. Run it with execute_prepared(name, ...)
+        or execute_query(query, ..., prepare=name).
+        """
+        if not _STATEMENT_NAME.fullmatch(name):
+            raise ValueError(f"Invalid prepared statement name {name!r}")
+        registered = self._statements.get(name)
+        if registered is not None:
+            if registered[0] != query:
+                raise ValueError(f"Prepared statement {name!r} is already registered for another query")
+            return
+        statement, nparams = _numbered_params(query)
+        self._statements[name] = (query, statement, nparams)
+
+    def execute_prepared(self, name, params=None, fetch=False, row_format=None, cache=True):
+        query = self._statements[name][0]
+        return self.execute_query(query, params, fetch=fetch, row_format=row_format, cache=cache, prepare=name)
+
+    def _forget_prepared(self, conn):
+        # A closed connection takes its prepared statements with it
+        self._prepared.pop(conn, None)
+
+    def _execute(self, conn, cur, query, params, prepare):
+        if prepare is None:
+            cur.execute(query, params)
+            return
+        self.prepare(prepare, query)
+        _, statement, nparams = self._statements[prepare]
+        sql = f"EXECUTE {prepare}" + (f" ({', '.join(['%s'] * nparams)})" if nparams else "")
+        for attempt in range(2):
+            names = self._prepared.setdefault(conn, set())
+            if prepare not in names:
+                cur.execute(f"PREPARE {prepare} AS {statement}")
+                names.add(prepare)
+            try:
+                cur.execute(sql, params)
+                return
+            except psycopg2.errors.InvalidSqlStatementName:
+                # The session lost it (DISCARD ALL, a pooler reset): prepare again
+                if attempt:
+                    raise
+                conn.rollback()
+                self._forget_prepared(conn)
+
+    def invalidate_cache(self, tables=None):
+        # For changes made outside execute_query (other clients, COPY, ...)
+        if self.cache is not None:
+            self.cache.invalidate(tables)
+
+    def execute_query(self, query, params=None, fetch=False, row_format=None, cache=True,
+                      prepare=None, tag=None):
+        # cache=False bypasses the result cache for one read; prepare=name
+        # runs the query as a named prepared statement (see prepare()); tag
+        # names the caller in metrics (default: the calling function)
+        if self.metrics is None:
+            return self._run_query(query, params, fetch, row_format, cache, prepare)
+        tag = tag or caller_tag()
+        start = time.perf_counter()
+        try:
+            result = self._run_query(query, params, fetch, row_format, cache, prepare)
+        except Exception:
+            self.metrics.record(tag, query, time.perf_counter() - start, error=True)
+            raise
+        elapsed = time.perf_counter() - start
+        if fetch:
+            self.metrics.record(tag, query, elapsed, _row_count(result), result_size(result))
+        else:
+            self.metrics.record(tag, query, elapsed)
+        if self.metrics.is_slow(elapsed):
+            self._log_slow(tag, query, params, elapsed)
+        return result
+
+    def _log_slow(self, tag, query, params, elapsed):
+        plan = None
+        # EXPLAIN ANALYZE runs the statement again, so only for plain reads
+        if self.metrics.explain and QueryCache.is_cacheable(query):
+            try:
+                with self._connection() as conn:
+                    try:
+                        with conn.cursor() as cur:
+                            cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+                            plan = "\n".join(row[0] for row in cur.fetchall())
+                    finally:
+                        conn.rollback()
+            except Exception as e:
+                plan = f"EXPLAIN failed: {e}"
+        self.metrics.log_slow(tag, query, params, elapsed, plan)
+        print(f"Slow query ({elapsed:.3f}s, {tag}):", self.metrics.statement(query)[:200])
+
+    def _run_query(self, query, params, fetch, row_format, cache, prepare):
+        row_format = self._row_format(row_format)
+        cache_key = None
+        is_read = self.cache is not None and self.cache.is_cacheable(query)
+        if is_read and fetch and cache:
+            cache_key = self.cache.key(query, params, row_format)
+        if cache_key is not None:
+            rows = self.cache.get(cache_key, row_format)
+            if rows is not None:
+                return rows
+            generation = self.cache.generation
+
+        with self._connection() as conn:
+            try:
+                with conn.cursor(cursor_factory=_CURSOR_FACTORIES[row_format]) as cur:
+                    self._execute(conn, cur, query, params, prepare)
+
+                    if fetch:
+                        rows = cur.fetchall()
+                        if row_format == "columns":
+                            rows = _to_columns(cur, rows)
+                        if self.pool is not None:
+                            # Pooled connections are shared between callers, so
+                            # end the read transaction before handing it back.
+                            conn.commit()
+                        if cache_key is not None:
+                            self.cache.put(cache_key, rows, row_format, generation)
+                        elif self.cache is not None and not is_read:
+                            # e.g. INSERT ... RETURNING
+                            self.cache.invalidate_for(query)
+                        return rows
+
+                    conn.commit()
+                    if self.cache is not None and not is_read:
+                        self.cache.invalidate_for(query)
+                    return True
+            except Exception as e:
+                # Rollback to clear connection error state, log and propagate the
+                # exception so callers (UI) can display accurate error messages and
+                # avoid continuing as if the operation succeeded.
+                try:
+                    if conn:
+                        conn.rollback()
+                except Exception:
+                    pass
+                print("Query error:", e)
+                raise
+
+    def stream_query(self, query, params=None, itersize=2000, row_format=None, tag=None):
+        # Generator yielding lists of up to `itersize` rows from a named
+        # (server-side) cursor, so large tables never sit in memory at once.
+        # With row_format="columns" each batch is a column -> values dict.
+        # The connection stays checked out until the generator is exhausted
+        # or closed; in single-connection mode do not run other queries
+        # while a stream is open, as their commit would close the cursor.
+        if self.metrics is None:
+            return self._stream(query, params, itersize, row_format)
+        # Name the caller now; the stream may be consumed from another frame
+        return self._timed_stream(tag or caller_tag(), query, params, itersize, row_format)
+
+    def _timed_stream(self, tag, query, params, itersize, row_format):
+        # Recorded once the stream ends: total time, rows and bytes
+        start = time.perf_counter()
+        rows = nbytes = 0
+        error = True
+        try:
+            for batch in self._stream(query, params, itersize, row_format):
+                rows += _row_count(batch)
+                nbytes += result_size(batch)
+                yield batch
+            error = False
+        except GeneratorExit:
+            # Closed early by the caller (e.g. a newer refresh), not a failure
+            error = False
             raise
+        finally:
+            self.metrics.record(tag, query, time.perf_counter() - start, rows, nbytes, error=error)
+
+    def _stream(self, query, params, itersize, row_format):
+        row_format = self._row_format(row_format)
+        with self._connection() as conn:
+            name = f"stream_{next(self._cursor_ids)}"
+            completed = False
+            try:
+                with conn.cursor(name=name, cursor_factory=_CURSOR_FACTORIES[row_format]) as cur:
+                    cur.itersize = itersize
+                    cur.execute(query, params)
+                    while True:
+                        rows = cur.fetchmany(itersize)
+                        if not rows:
+                            break
+                        yield _to_columns(cur, rows) if row_format == "columns" else rows
+                completed = True
+            except Exception as e:
+                print("Query error:", e)
+                raise
+            finally:
+                # End the cursor's transaction whether the stream was drained,
+                # failed, or abandoned early by the caller.
+                try:
+                    if completed:
+                        conn.commit()
+                    else:
+                        conn.rollback()
+                except Exception:
+                    pass
+
+    # ---------- change notifications ----------
+    def add_listener(self, callback):
+        """Call callback(event) for every change notification on CHANGE_CHANNEL.
+
+        event is a dict {"table", "op", "key"}: op is INSERT, UPDATE, DELETE
+        or RELOAD (bulk change, truncate, or a reconnect that may have missed
+        events; table is None when every table should be reloaded) and key
+        the list of the row's primary-key values as text. Callbacks run on
+        the listener thread, not the caller's. The listener uses its own
+        autocommit connection and reconnects if it drops.
+        """
+        self._listeners.append(callback)
+        if self._listener_thread is None:
+            self._listener_stop.clear()
+            self._listener_thread = threading.Thread(
+                target=self._listen_loop, name="db-listener", daemon=True
+            )
+            self._listener_thread.start()
+        return callback
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _listen_loop(self, poll_interval=1.0, retry_delay=5.0):
+        connected_before = False
+        while not self._listener_stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(**self._connect_kwargs)
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANGE_CHANNEL};")
+                if connected_before:
+                    # Events sent while we were disconnected are lost
+                    self._dispatch({"table": None, "op": "RELOAD", "key": None})
+                connected_before = True
+                while not self._listener_stop.is_set():
+                    if select.select([conn], [], [], poll_interval) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            event = json.loads(notify.payload)
+                        except ValueError:
+                            continue
+                        self._dispatch(event)
+            except Exception as e:
+                print("Change listener error:", e)
+                self._listener_stop.wait(retry_delay)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def _dispatch(self, event):
+        if self.cache is not None:
+            # Another client's write: same rule as local writes, inserts drop
+            # the table's entries, anything else may have cascaded.
+            if event.get("op") == "INSERT" and event.get("table"):
+                self.cache.invalidate([event["table"]])
+            else:
+                self.cache.invalidate()
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                print("Change listener callback error:", e)
 
     def close(self):
+        if self._listener_thread is not None:
+            self._listener_stop.set()
+            self._listener_thread = None
+        if self.pool:
+            self.pool.closeall()
+            print("Connection pool closed.")
         if self.conn:
             self.conn.close()
+            self._forget_prepared(self.conn)
             print("Connection closed.")
@@ -0,0 +1,266 @@
+import argparse
+import random
+from datetime import date, timedelta
+
+from insert import get_connection, load_tables
+
+
+# Synthetic lab data at arbitrary scale for benchmarking the modules' queries.
+# Every table is produced lazily by a generator and streamed through the bulk
+# COPY loader in insert.py, so memory stays flat at 10^7 rows. The data honours
+# the constraints enforced by create.py and triggers.py:
+#   - mentors are Faculty members inserted before their mentees
+#   - STUDENT / FACULTY / COLLABORATOR rows match LAB_MEMBER.MEMBER_TYPE
+#   - PROJECT.FACULTYID is a Faculty member
+#   - a member's WORKS hours never exceed 40 in any week
+#   - USES sessions of one piece of equipment never overlap
+
+MAJORS = ['BIOLOGY', 'CS', 'PHYSICS', 'CHEMISTRY', 'MATH', 'ENGINEERING']
+LEVELS = ['UNDERGRADUATE', 'GRADUATE']
+DEPARTMENTS = ['BIOLOGY', 'CS', 'PHYSICS', 'CHEMISTRY']
+ROLES = ["RESEARCH ASSISTANT", "LEAD PI", "CO-PI", "ANALYST", "DEVELOPER", "TECHNICIAN"]
+EQUIPMENT_TYPES = ["Microscope", "Centrifuge", "PCR Machine", "Imaging System", "Computer", "Sensor"]
+EQUIPMENT_STATUSES = ["Available", "In Use", "Under Maintenance", "Retired"]
+
+# Days between consecutive USES sessions of one device; sessions last less.
+USES_SPACING_DAYS = 3
+
+# Default "today" of the generated history, so a seed always yields the same
+# rows; pass --anchor to date the history from another day.
+ANCHOR_DATE = date(2025, 1, 1)
+
+
+class SyntheticLab:
+    def __init__(self, members=1000, projects=200, grants=50, equipment=100,
+                 weeks=52, uses=10000, publications=2000, assignments=2, seed=42,
+                 anchor=ANCHOR_DATE):
+        if members < 1:
+            raise ValueError("At least one member is required (mentors and project leads are Faculty).")
+        if weeks > 53:
+            raise ValueError("WORKS weeks are weeks of the year (1..53).")
+        if anchor > date.today():
+            raise ValueError(f"The anchor {anchor} is in the future; GRANTS and EQUIPMENT dates may not be.")
+        if projects < 1 and (weeks > 0 and assignments > 0):
+            raise ValueError("WORKS rows need at least one project.")
+        self.members = members
+        self.projects = projects
+        self.grants = grants
+        self.equipment = equipment
+        self.weeks = weeks
+        self.uses = uses
+        self.publications = publications
+        # Projects each member is assigned to; weekly hours are split between them
+        self.assignments = max(0, min(assignments, projects))
+        self.seed = seed
+        # Dates are drawn back from the anchor, never from the wall clock
+        self.today = anchor
+        # Every fifth member (index 0, 5, 10, ...) is Faculty
+        self.faculty_count = (members + 4) // 5
+
+    # ---------- helpers ----------
+    def _rng(self, table):
+        # Independent, reproducible stream per table
+        return random.Random(f"{self.seed}:{table}")
+
+    @staticmethod
+    def member_mid(i):
+        return f'M{i:07}'
+
+    def member_type(self, i):
+        if i % 5 == 0:
+            return 'Faculty'
+        if i % 5 == 4:
+            return 'Collaborator'
+        return 'Student'
+
+    def random_faculty(self, rng, below=None):
+        # Faculty member index, optionally restricted to faculty before `below`
+        limit = self.faculty_count if below is None else min(self.faculty_count, below // 5)
+        return 5 * rng.randrange(limit)
+
+    def _days_ago(self, rng, max_days):
+        return self.today - timedelta(days=rng.randrange(max_days))
+
+    # ---------- tables ----------
+    def lab_members(self):
+        rng = self._rng("LAB_MEMBER")
+        # Faculty first so every mentor exists before the members it mentors
+        for i in range(0, self.members, 5):
+            mentor = None
+            if i > 0 and rng.random() < 0.3:
+                mentor = self.member_mid(self.random_faculty(rng, below=i))
+            yield (self.member_mid(i), f'FACULTY {i}', 'Faculty', self._days_ago(rng, 20 * 365), mentor)
+        for i in range(self.members):
+            member_type = self.member_type(i)
+            if member_type == 'Faculty':
+                continue
+            mentor = self.member_mid(self.random_faculty(rng)) if rng.random() < 0.9 else None
+            name = f'{member_type.upper()} {i}'
+            yield (self.member_mid(i), name, member_type, self._days_ago(rng, 10 * 365), mentor)
+
+    def faculty(self):
+        rng = self._rng("FACULTY")
+        for i in range(0, self.members, 5):
+            yield (self.member_mid(i), rng.choice(DEPARTMENTS))
+
+    def students(self):
+        rng = self._rng("STUDENT")
+        for i in range(self.members):
+            if self.member_type(i) == 'Student':
+                yield (self.member_mid(i), f'S{i:07}', rng.choice(LEVELS), rng.choice(MAJORS))
+
+    def collaborators(self):
+        for i in range(4, self.members, 5):
+            yield (self.member_mid(i), f'COLLABORATOR BIO {i}', f'AFFILIATION {i % 97}')
+
+    def publication_rows(self):
+        rng = self._rng("PUBLICATION")
+        for i in range(self.publications):
+            yield (f'PUB{i:07}', f'JOURNAL {i % 211}', f'PUBLICATION TITLE {i}',
+                   self._days_ago(rng, 10 * 365), f'DOI-{i:07}')
+
+    def grant_rows(self):
+        rng = self._rng("GRANTS")
+        for i in range(self.grants):
+            yield (f'G{i:07}', f'AGENCY {i % 53}', round(rng.uniform(50000, 2000000), 2),
+                   self._days_ago(rng, 8 * 365), rng.randrange(12, 61))
+
+    def project_rows(self):
+        rng = self._rng("PROJECT")
+        for i in range(self.projects):
+            start = self._days_ago(rng, 6 * 365)
+            if rng.random() < 0.2:
+                end = None
+                exp_duration = rng.randrange(6, 48)
+            else:
+                end = start + timedelta(days=rng.randrange(90, 900))
+                exp_duration = (end - start).days // 30
+            faculty_id = self.member_mid(self.random_faculty(rng))
+            yield (f'PR{i:07}', f'PROJECT {i}', start, end, exp_duration, faculty_id)
+
+    def equipment_rows(self):
+        rng = self._rng("EQUIPMENT")
+        for i in range(self.equipment):
+            yield (f'E{i:07}', f'EQUIPMENT {i}', rng.choice(EQUIPMENT_TYPES),
+                   self.equipment_status(i), self._days_ago(rng, 12 * 365))
+
+    def equipment_status(self, i):
+        return EQUIPMENT_STATUSES[i % len(EQUIPMENT_STATUSES)]
+
+    def uses_rows(self):
+        if not self.equipment:
+            return
+        rng = self._rng("USES")
+        per_device = (self.uses + self.equipment - 1) // self.equipment
+        # Sessions of each device follow each other without overlap and the
+        # latest one ends no later than today.
+        first_day = self.today - timedelta(days=per_device * USES_SPACING_DAYS)
+        for s in range(self.uses):
+            e, seq = s % self.equipment, s // self.equipment
+            start = first_day + timedelta(days=seq * USES_SPACING_DAYS)
+            last = seq == (self.uses - 1 - e) // self.equipment
+            if last and self.equipment_status(e) == 'In Use':
+                end = None
+            else:
+                end = start + timedelta(days=rng.randrange(0, USES_SPACING_DAYS))
+            mid = self.member_mid(rng.randrange(self.members))
+            yield (f'E{e:07}', mid, f'PURPOSE {s % 101}', start, end)
+
+    def funds_rows(self):
+        if not self.grants:
+            return
+        rng = self._rng("FUNDS")
+        for p in range(self.projects):
+            for g in set(rng.randrange(self.grants) for _ in range(rng.randint(1, 2))):
+                yield (f'G{g:07}', f'PR{p:07}')
+
+    def works_rows(self):
+        if not self.assignments:
+            return
+        rng = self._rng("WORKS")
+        # Each member works on `assignments` distinct projects every week and
+        # splits at most 40 hours between them.
+        cap = 40 // self.assignments
+        for i in range(self.members):
+            mid = self.member_mid(i)
+            projects = rng.sample(range(self.projects), self.assignments)
+            roles = [rng.choice(ROLES) for _ in projects]
+            for week in range(1, self.weeks + 1):
+                for p, role in zip(projects, roles):
+                    yield (f'PR{p:07}', mid, week, role, rng.randint(0, cap))
+
+    def published_rows(self):
+        rng = self._rng("PUBLISHED")
+        for p in range(self.publications):
+            for i in set(rng.randrange(self.members) for _ in range(rng.randint(1, 3))):
+                yield (f'PUB{p:07}', self.member_mid(i))
+
+    def tables(self):
+        return {
+            "LAB_MEMBER": self.lab_members(),
+            "FACULTY": self.faculty(),
+            "STUDENT": self.students(),
+            "COLLABORATOR": self.collaborators(),
+            "PUBLICATION": self.publication_rows(),
+            "GRANTS": self.grant_rows(),
+            "PROJECT": self.project_rows(),
+            "EQUIPMENT": self.equipment_rows(),
+            "USES": self.uses_rows(),
+            "FUNDS": self.funds_rows(),
+            "WORKS": self.works_rows(),
+            "PUBLISHED": self.published_rows(),
+        }
+
+
+def past_date(text):
+    # --anchor: the CHECK constraints reject GRANTS and EQUIPMENT dates after today
+    day = date.fromisoformat(text)
+    if day > date.today():
+        raise argparse.ArgumentTypeError(f"{text} is in the future; the anchor must be today or earlier")
+    return day
+
+
+def main(lab, chunk_size=50000):
+    conn = get_connection()
+    cur = conn.cursor()
+    print("Connected to PostgreSQL for synthetic data generation.")
+
+    load_tables(cur, lab.tables(), bulk=True, chunk_size=chunk_size)
+
+    conn.commit()
+    cur.close()
+    conn.close()
+    print(
+        f"Generated {lab.members} members, {lab.projects} projects, {lab.weeks} weeks of WORKS, "
+        f"{lab.uses} USES sessions and {lab.publications} publications (seed {lab.seed}, anchor {lab.today})."
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic, referentially valid lab database for scale testing.")
+    parser.add_argument("--members", type=int, default=1000, help="lab members (1 in 5 is Faculty)")
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--grants", type=int, default=50)
+    parser.add_argument("--equipment", type=int, default=100)
+    parser.add_argument("--weeks", type=int, default=52, help="weeks of WORKS history per member")
+    parser.add_argument("--assignments", type=int, default=2, help="projects each member works on per week")
+    parser.add_argument("--uses", type=int, default=10000, help="USES sessions in total")
+    parser.add_argument("--publications", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", type=past_date, default=ANCHOR_DATE, metavar="YYYY-MM-DD",
+                        help=f"date the generated history ends on (default {ANCHOR_DATE})")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="rows per COPY chunk")
+    args = parser.parse_args()
+    lab = SyntheticLab(
+        members=args.members,
+        projects=args.projects,
+        grants=args.grants,
+        equipment=args.equipment,
+        weeks=args.weeks,
+        uses=args.uses,
+        publications=args.publications,
+        assignments=args.assignments,
+        seed=args.seed,
+        anchor=args.anchor,
+    )
+    main(lab, chunk_size=args.chunk_size)
@@ -1,21 +1,48 @@
+import argparse
+import io
 import psycopg2
 from datetime import date, timedelta
 
 
 def get_connection():
     return psycopg2.connect(
-        database="mydatabase",   
-        user="myuser",           
-        password="mypassword",   
+        database="mydatabase",
+        user="myuser",
+        password="mypassword",
         host="localhost",
         port=5432
     )
 
 
-def main():
-    conn = get_connection()
-    cur = conn.cursor()
-    print("Connected to PostgreSQL for inserts.")
+# ------------------------
+# TABLE LAYOUT
+# ------------------------
+# (table, columns, conflict key) in an order that satisfies foreign keys and the
+# subtype triggers: LAB_MEMBER before its subtypes, parents before link tables.
+TABLES = [
+    ("LAB_MEMBER", ("MID", "NAME", "MEMBER_TYPE", "JOIN_DATE", "MENTOR_MID"), ("MID",)),
+    ("FACULTY", ("MID", "DEPARTMENT"), ("MID",)),
+    ("STUDENT", ("MID", "SID", "LEVEL", "MAJOR"), ("MID",)),
+    ("COLLABORATOR", ("MID", "BIOGRAPHY", "AFFILIATION"), ("MID",)),
+    ("PUBLICATION", ("PUBLICATIONID", "VENUE", "TITLE", "PUBLICATION_DATE", "DOI"), ("PUBLICATIONID",)),
+    ("GRANTS", ("GID", "SOURCE", "BUDGET", "START_DATE", "DURATION"), ("GID",)),
+    ("PROJECT", ("PID", "TITLE", "START_DATE", "END_DATE", "EXP_DURATION", "FACULTYID"), ("PID",)),
+    ("EQUIPMENT", ("EID", "NAME", "TYPE", "STATUS", "PUR_DATE"), ("EID",)),
+    ("USES", ("EID", "MID", "PURPOSE", "START_DATE", "END_DATE"), ("EID", "MID", "START_DATE")),
+    ("FUNDS", ("GID", "PID"), ("GID", "PID")),
+    ("WORKS", ("PID", "MID", "WEEK", "ROLE", "HOURS"), ("PID", "MID", "WEEK")),
+    ("PUBLISHED", ("PUBLICATIONID", "MID"), ("PUBLICATIONID", "MID")),
+]
+
+# Tables whose rows must be merged in the order they were produced. LAB_MEMBER
+# rows reference mentors created earlier in the same batch and the mentor
+# trigger only sees rows already inserted by the statement.
+ORDERED_TABLES = {"LAB_MEMBER"}
+
+
+def seed_rows():
+    """Build the demo data set (30 rows per entity) as {table: [row tuples]}."""
+    rows = {table: [] for table, _, _ in TABLES}
 
     # ---------- FACULTY LAB_MEMBER + FACULTY (30) ----------
     base = date(2019, 1, 1)
@@ -25,11 +52,8 @@ def main():
         name = f'Faculty {i}'.upper()
         member_type = 'Faculty'
         join_date = base + timedelta(days=i * 30)
-        cur.execute(
-            "INSERT INTO LAB_MEMBER (MID, NAME, MEMBER_TYPE, JOIN_DATE, MENTOR_MID) VALUES (%s,%s,%s,%s,%s) ON CONFLICT (MID) DO NOTHING;",
-            (mid, name, member_type, join_date, None)
-        )
-        cur.execute("INSERT INTO FACULTY (MID, DEPARTMENT) VALUES (%s,%s) ON CONFLICT (MID) DO NOTHING;", (mid, 'BIOLOGY'))
+        rows["LAB_MEMBER"].append((mid, name, member_type, join_date, None))
+        rows["FACULTY"].append((mid, 'BIOLOGY'))
 
     # ---------- LAB_MEMBER (30) ----------
     lab_members = []
@@ -44,10 +68,7 @@ def main():
         # assign a faculty mentor for members after the first few
         mentor_mid = f'F{((i-1)%30)+1:03}' if i > 2 else None
         lab_members.append((mid, name, member_type, join_date, mentor_mid))
-        cur.execute(
-            "INSERT INTO LAB_MEMBER (MID, NAME, MEMBER_TYPE, JOIN_DATE, MENTOR_MID) VALUES (%s,%s,%s,%s,%s) ON CONFLICT (MID) DO NOTHING;",
-            (mid, name, member_type, join_date, mentor_mid)
-        )
+        rows["LAB_MEMBER"].append((mid, name, member_type, join_date, mentor_mid))
 
     # ---------- STUDENT (30) ----------
     majors = ['BIOLOGY', 'CS', 'PHYSICS', 'CHEMISTRY']
@@ -60,7 +81,7 @@ def main():
         sid = f'S{student_counter:04}'
         level = ('UNDERGRADUATE' if student_counter % 2 == 0 else 'GRADUATE')
         major = majors[student_counter % len(majors)]
-        cur.execute("INSERT INTO STUDENT (MID,SID,LEVEL,MAJOR) VALUES (%s,%s,%s,%s) ON CONFLICT (MID) DO NOTHING;", (mid, sid.upper(), level, major))
+        rows["STUDENT"].append((mid, sid.upper(), level, major))
         student_counter += 1
 
     # Keep a list of student MIDs for linking publications to students below.
@@ -73,13 +94,10 @@ def main():
         name = f'Collaborator {i}'.upper()
         member_type = 'Collaborator'
         join_date = base + timedelta(days=i * 30)
-        cur.execute(
-            "INSERT INTO LAB_MEMBER (MID, NAME, MEMBER_TYPE, JOIN_DATE, MENTOR_MID) VALUES (%s,%s,%s,%s,%s) ON CONFLICT (MID) DO NOTHING;",
-            (mid, name, member_type, join_date, None)
-        )
+        rows["LAB_MEMBER"].append((mid, name, member_type, join_date, None))
         bio = f'Collaborator bio {i}'.upper()
         aff = f'Affiliation {i}'.upper()
-        cur.execute("INSERT INTO COLLABORATOR (MID, BIOGRAPHY, AFFILIATION) VALUES (%s,%s,%s) ON CONFLICT (MID) DO NOTHING;", (mid, bio, aff))
+        rows["COLLABORATOR"].append((mid, bio, aff))
 
     # ---------- PUBLICATION (30) ----------
     for i in range(1, 31):
@@ -88,7 +106,7 @@ def main():
         title = f'Publication Title {i}'.upper()
         pub_date = date(2020, 1, 1) + timedelta(days=i * 45)
         doi = f'DOI-{i:03}'.upper()
-        cur.execute("INSERT INTO PUBLICATION (PUBLICATIONID, VENUE, TITLE, PUBLICATION_DATE, DOI) VALUES (%s,%s,%s,%s,%s) ON CONFLICT (PUBLICATIONID) DO NOTHING;", (pid, venue, title, pub_date, doi))
+        rows["PUBLICATION"].append((pid, venue, title, pub_date, doi))
 
     # ---------- GRANTS (30) ----------
     for i in range(1, 31):
@@ -97,7 +115,7 @@ def main():
         budget = 100000.00 + i * 1000
         start = date(2019, 6, 1) + timedelta(days=i * 30)
         duration = 12 + (i % 36)
-        cur.execute("INSERT INTO GRANTS (GID,SOURCE,BUDGET,START_DATE,DURATION) VALUES (%s,%s,%s,%s,%s) ON CONFLICT (GID) DO NOTHING;", (gid, source, budget, start, duration))
+        rows["GRANTS"].append((gid, source, budget, start, duration))
 
     # ---------- PROJECT (30) ----------
     for i in range(1, 31):
@@ -107,8 +125,7 @@ def main():
         end_date = start_date + timedelta(days=180 + (i * 10))
         exp_duration = (end_date - start_date).days // 30
         faculty_id = f'F{((i-1)%30)+1:03}'
-        cur.execute("INSERT INTO PROJECT (PID,TITLE,START_DATE,END_DATE,EXP_DURATION,FACULTYID) VALUES (%s,%s,%s,%s,%s,%s) ON CONFLICT (PID) DO NOTHING;",
-                    (pid, title, start_date, end_date, exp_duration, faculty_id))
+        rows["PROJECT"].append((pid, title, start_date, end_date, exp_duration, faculty_id))
 
     # ---------- EQUIPMENT (30) ----------
     types = ["Microscope","Centrifuge","PCR Machine","Imaging System","Computer","Sensor"]
@@ -123,8 +140,7 @@ def main():
         typ = types[i % len(types)]
         status = statuses[i % len(statuses)]
         pur_date = date(2018, 1, 1) + timedelta(days=i * 60)
-        cur.execute("INSERT INTO EQUIPMENT (EID,NAME,TYPE,STATUS,PUR_DATE) VALUES (%s,%s,%s,%s,%s) ON CONFLICT (EID) DO NOTHING;",
-                    (eid, name, typ, status, pur_date))
+        rows["EQUIPMENT"].append((eid, name, typ, status, pur_date))
         equipment_status[eid] = status
 
     # ---------- USES (30) ----------
@@ -141,15 +157,13 @@ def main():
         else:
             start_date = date(2021, 1, 1) + timedelta(days=i * 5)
             end_date = start_date + timedelta(days=1 + (i % 10))
-
-        cur.execute("INSERT INTO USES (EID,MID,PURPOSE,START_DATE,END_DATE) VALUES (%s,%s,%s,%s,%s) ON CONFLICT (EID,MID,START_DATE) DO NOTHING;",
-                    (eid, mid, purpose, start_date, end_date))
+        rows["USES"].append((eid, mid, purpose, start_date, end_date))
 
     # ---------- FUNDS (30) ----------
     for i in range(1, 31):
         gid = f'G{((i-1)%30)+1:03}'
         pid = f'PR{((i-1)%30)+1:03}'
-        cur.execute("INSERT INTO FUNDS (GID,PID) VALUES (%s,%s) ON CONFLICT (GID,PID) DO NOTHING;", (gid, pid))
+        rows["FUNDS"].append((gid, pid))
 
     # ---------- WORKS (30) ----------
     roles = ["RESEARCH ASSISTANT","LEAD PI","CO-PI","ANALYST","DEVELOPER","TECHNICIAN"]
@@ -165,8 +179,7 @@ def main():
             week = ((i + idx) % 52) + 1
             role = roles[(i + idx) % len(roles)]
             hours = 5 + ((i + idx) % 36)
-            cur.execute("INSERT INTO WORKS (PID,MID,WEEK,ROLE,HOURS) VALUES (%s,%s,%s,%s,%s) ON CONFLICT (PID,MID,WEEK) DO NOTHING;",
-                        (pid, mid, week, role, hours))
+            rows["WORKS"].append((pid, mid, week, role, hours))
 
     # ---------- PUBLISHED (30) ----------
     # Ensure publications are associated with STUDENTs so average per-major
@@ -177,10 +190,24 @@ def main():
         pubid = f'PUB{((i-1)%30)+1:03}'
         # pick a student MID (or fallback) to link the publication to a student
         mid = mids_source[(i*3-1) % len(mids_source)]
-        cur.execute("INSERT INTO PUBLISHED (PUBLICATIONID,MID) VALUES (%s,%s) ON CONFLICT (PUBLICATIONID,MID) DO NOTHING;",
-                    (pubid, mid))
+        rows["PUBLISHED"].append((pubid, mid))
+
+    return rows
+
 
-    # ---------- ADD MENTOR WORKS ----------
+# ------------------------
+# ROW-BY-ROW LOADING
+# ------------------------
+def insert_rows(cur, table, columns, conflict, rows):
+    query = (
+        f"INSERT INTO {table} ({','.join(columns)}) VALUES ({','.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({','.join(conflict)}) DO NOTHING;"
+    )
+    for row in rows:
+        cur.execute(query, row)
+
+
+def add_mentor_works(cur):
     # For every works row where the member has a mentor, ensure the mentor
     # also has a works entry for the same project with role 'MENTOR' and 0 hours.
     try:
@@ -220,6 +247,106 @@ def main():
     except Exception as e:
         print(f"Failed to add mentor works: {e}")
 
+
+# ------------------------
+# BULK (COPY) LOADING
+# ------------------------
+def _copy_value(value):
+    # Render one value in COPY text format: \N for NULL, with the format's
+    # special characters escaped.
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_rows(cur, table, columns, conflict, rows, chunk_size=50000):
+    """Stream rows into a staging table with COPY, then merge them into `table`.
+
+    `rows` may be any iterable (including a generator); it is consumed in
+    chunks of `chunk_size` rows so memory stays bounded. Rows that collide with
+    existing keys are skipped, matching the row-by-row ON CONFLICT DO NOTHING.
+    Returns the number of rows merged into the target table.
+    """
+    stage = f"stage_{table.lower()}"
+    col_list = ",".join(columns)
+    cur.execute(f"DROP TABLE IF EXISTS {stage};")
+    cur.execute(f"CREATE TEMP TABLE {stage} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP;")
+    ordered = table in ORDERED_TABLES
+    if ordered:
+        cur.execute(f"ALTER TABLE {stage} ADD COLUMN seed_ord BIGSERIAL;")
+
+    buf = io.StringIO()
+    pending = 0
+    for row in rows:
+        buf.write("\t".join(_copy_value(v) for v in row))
+        buf.write("\n")
+        pending += 1
+        if pending >= chunk_size:
+            buf.seek(0)
+            cur.copy_expert(f"COPY {stage} ({col_list}) FROM STDIN", buf)
+            buf = io.StringIO()
+            pending = 0
+    if pending:
+        buf.seek(0)
+        cur.copy_expert(f"COPY {stage} ({col_list}) FROM STDIN", buf)
+
+    cur.execute(
+        f"INSERT INTO {table} ({col_list}) SELECT {col_list} FROM {stage}"
+        f"{' ORDER BY seed_ord' if ordered else ''} "
+        f"ON CONFLICT ({','.join(conflict)}) DO NOTHING;"
+    )
+    merged = cur.rowcount
+    cur.execute(f"DROP TABLE {stage};")
+    return merged
+
+
+def add_mentor_works_bulk(cur):
+    # Set-based equivalent of add_mentor_works: mentors that have no works row
+    # on a mentee's project get one (week 1, role MENTOR, 0 hours).
+    cur.execute("""
+        INSERT INTO works (PID, MID, WEEK, ROLE, HOURS)
+        SELECT DISTINCT w.pid, lm.mentor_mid, 1, 'MENTOR', 0
+        FROM works w
+        JOIN lab_member lm ON lm.mid = w.mid
+        WHERE lm.mentor_mid IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM works mw WHERE mw.pid = w.pid AND mw.mid = lm.mentor_mid
+          )
+        ON CONFLICT (PID, MID, WEEK) DO NOTHING;
+    """)
+    return cur.rowcount
+
+
+def load_tables(cur, rows_by_table, bulk=False, chunk_size=50000):
+    # Load every table in TABLES order, row by row or through COPY staging.
+    for table, columns, conflict in TABLES:
+        rows = rows_by_table.get(table)
+        if rows is None:
+            continue
+        if bulk:
+            copy_rows(cur, table, columns, conflict, rows, chunk_size=chunk_size)
+        else:
+            insert_rows(cur, table, columns, conflict, rows)
+
+    if bulk:
+        add_mentor_works_bulk(cur)
+    else:
+        add_mentor_works(cur)
+
+
+def main(bulk=False, chunk_size=50000):
+    conn = get_connection()
+    cur = conn.cursor()
+    print("Connected to PostgreSQL for inserts.")
+
+    load_tables(cur, seed_rows(), bulk=bulk, chunk_size=chunk_size)
+
     conn.commit()
     cur.close()
     conn.close()
@@ -227,4 +354,10 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Seed the lab database with demo data.")
+    parser.add_argument("--bulk", action="store_true",
+                        help="load each table through COPY into a staging table and merge set-based")
+    parser.add_argument("--chunk-size", type=int, default=50000,
+                        help="rows per COPY chunk in bulk mode (default: 50000)")
+    args = parser.parse_args()
+    main(bulk=args.bulk, chunk_size=args.chunk_size)
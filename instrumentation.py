@@ -0,0 +1,185 @@
+import bisect
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Frames in these files are plumbing, not the caller a query is charged to
+_SKIP_FILES = {
+    os.path.join("modules", "executor.py"),
+    "database.py",
+    "async_database.py",
+    "instrumentation.py",
+    "threading.py",
+    os.path.join("concurrent", "futures", "thread.py"),
+    "contextlib.py",
+}
+
+
+def caller_tag(depth=2):
+    """Name the code that issued a query, e.g. 'members:members_menu.show_members_by_grant.run'."""
+    frame = sys._getframe(depth)
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if not any(path.endswith(os.sep + skip) for skip in _SKIP_FILES):
+            module = os.path.splitext(os.path.basename(path))[0]
+            name = getattr(frame.f_code, "co_qualname", frame.f_code.co_name)
+            return f"{module}:{name.replace('<locals>.', '')}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def result_size(rows):
+    """Rough size of a result in bytes: the length of each value as text."""
+    if isinstance(rows, dict):
+        # row_format="columns"
+        values = (v for column in rows.values() for v in column)
+    else:
+        values = (v for row in rows for v in (row.values() if isinstance(row, dict) else row))
+    size = 0
+    for value in values:
+        if value is None:
+            continue
+        size += len(value) if isinstance(value, (str, bytes, memoryview)) else len(str(value))
+    return size
+
+
+class _Stats:
+    def __init__(self, nbuckets):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+        # Non-cumulative counts; the last slot is the +Inf bucket
+        self.buckets = [0] * (nbuckets + 1)
+
+    def add(self, other):
+        self.count += other.count
+        self.errors += other.errors
+        self.seconds += other.seconds
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+        self.rows += other.rows
+        self.bytes += other.bytes
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+
+class QueryMetrics:
+    """Per-caller, per-statement query timings for Database.
+
+    Pass an instance as Database(metrics=...). Each execute_query/stream_query
+    call records its wall time, rows and approximate bytes under a caller tag
+    (the tag= argument, or the calling function). Reads slower than
+    `slow_threshold` seconds are re-run under EXPLAIN (ANALYZE, BUFFERS) and
+    kept, with their plan, in the last `slow_log_size` entries of `slow_log`.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, slow_threshold=None, slow_log_size=100, explain=True):
+        self.buckets = tuple(sorted(buckets))
+        self.slow_threshold = slow_threshold
+        self.explain = explain
+        self.slow_log = deque(maxlen=slow_log_size)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def statement(query):
+        return _WHITESPACE.sub(" ", query).strip().rstrip(";").strip()
+
+    def record(self, tag, query, seconds, rows=0, nbytes=0, error=False):
+        key = (tag, self.statement(query))
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _Stats(len(self.buckets))
+            stats.count += 1
+            stats.errors += int(error)
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.rows += rows
+            stats.bytes += nbytes
+            stats.buckets[bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def is_slow(self, seconds):
+        return self.slow_threshold is not None and seconds >= self.slow_threshold
+
+    def log_slow(self, tag, query, params, seconds, plan=None):
+        self.slow_log.append({
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "caller": tag,
+            "query": self.statement(query),
+            "params": [str(p) for p in params] if params else [],
+            "seconds": round(seconds, 6),
+            "plan": plan,
+        })
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+        self.slow_log.clear()
+
+    def _by_caller(self):
+        totals = {}
+        with self._lock:
+            for (tag, _), stats in self._stats.items():
+                if tag not in totals:
+                    totals[tag] = _Stats(len(self.buckets))
+                totals[tag].add(stats)
+        return totals
+
+    def to_json(self):
+        """Stats per caller and statement, slowest total first, plus the slow log."""
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: item[1].seconds, reverse=True)
+            queries = [{
+                "caller": tag,
+                "query": query,
+                "count": s.count,
+                "errors": s.errors,
+                "total_seconds": round(s.seconds, 6),
+                "mean_seconds": round(s.seconds / s.count, 6),
+                "max_seconds": round(s.max_seconds, 6),
+                "rows": s.rows,
+                "bytes": s.bytes,
+                "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], s.buckets)),
+            } for (tag, query), s in items]
+        return {"queries": queries, "slow_queries": list(self.slow_log)}
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, indent=2, default=str)
+
+    def to_prometheus(self, prefix="lab_query"):
+        """Prometheus text exposition format, labelled by caller."""
+        lines = [
+            f"# HELP {prefix}_duration_seconds Query wall time.",
+            f"# TYPE {prefix}_duration_seconds histogram",
+        ]
+        totals = sorted(self._by_caller().items())
+        for tag, s in totals:
+            label = tag.replace("\\", "\\\\").replace('"', '\\"')
+            cumulative = 0
+            for bound, count in zip([str(b) for b in self.buckets] + ["+Inf"], s.buckets):
+                cumulative += count
+                lines.append(f'{prefix}_duration_seconds_bucket{{caller="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_duration_seconds_sum{{caller="{label}"}} {s.seconds:.6f}')
+            lines.append(f'{prefix}_duration_seconds_count{{caller="{label}"}} {s.count}')
+        for name, attr, help_text in (("errors_total", "errors", "Queries that raised."),
+                                      ("rows_total", "rows", "Rows returned."),
+                                      ("bytes_total", "bytes", "Approximate result bytes.")):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for tag, s in totals:
+                label = tag.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{prefix}_{name}{{caller="{label}"}} {getattr(s, attr)}')
+        return "\n".join(lines) + "\n"
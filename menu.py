@@ -5,6 +5,7 @@ from modules.members import members_menu
 from modules.projects import projects_menu
 from modules.equipment import equipment_menu
 from database import Database
+from instrumentation import QueryMetrics
 
 
 def create_db():
@@ -14,11 +15,24 @@ def create_db():
 		password="mypassword",
 		host="localhost",
 		port=5432,
+		pool_min=1,
+		pool_max=4,
+		# Menus re-read the same lists and reports; writes through execute_query
+		# invalidate the cached results of the tables they touch.
+		cache_size=256,
+		cache_ttl=30.0,
+		# Per-caller query timings; reads over half a second are logged with
+		# their EXPLAIN (ANALYZE, BUFFERS) plan and written out on exit.
+		metrics=QueryMetrics(slow_threshold=0.5),
 	)
 
 
 def on_exit(root, db):
 	if messagebox.askokcancel("Exit", "Do you want to exit?"):
+		try:
+			db.metrics.write_json("query_metrics.json")
+		except Exception:
+			pass
 		try:
 			db.close()
 		except Exception:
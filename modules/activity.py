@@ -0,0 +1,222 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import date, datetime, timedelta
+
+
+# Project activity per grant and calendar bucket, for every grant in one pass.
+# A project counts as active in a bucket when its [START_DATE, END_DATE] span
+# (END_DATE NULL = ongoing) overlaps the bucket, the same rule as the
+# single-grant reports.GRANT_PROJECTS_ACTIVE_SQL.
+UNITS = {"month": 1, "quarter": 3}
+
+# Funded project spans overlapping [start, end]; the range test uses the GiST
+# index idx_project_period on the same daterange expression
+SPANS_SQL = (
+    "SELECT f.gid, p.start_date, p.end_date FROM project p "
+    "JOIN funds f ON f.pid = p.pid "
+    "WHERE p.start_date IS NOT NULL "
+    "AND daterange(p.start_date, p.end_date, '[]') && daterange(%s::date, %s::date, '[]') "
+    "ORDER BY f.gid;"
+)
+
+# The same counts computed server-side: one row per (grant, bucket) with at
+# least one active project. Parameters: start, end, interval, interval.
+ACTIVITY_SQL = """
+SELECT f.gid, b.bucket_start, COUNT(*) AS active
+FROM (
+    SELECT s::date AS bucket_start, (s + %s::interval)::date AS bucket_end
+    FROM generate_series(%s::date, %s::date, %s::interval) s
+) b
+JOIN project p
+  ON p.start_date IS NOT NULL
+ AND daterange(p.start_date, p.end_date, '[]') && daterange(b.bucket_start, b.bucket_end, '[)')
+JOIN funds f ON f.pid = p.pid
+GROUP BY f.gid, b.bucket_start
+ORDER BY f.gid, b.bucket_start;
+"""
+
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def buckets(start, end, unit="month"):
+    """(first, last) days of the months or quarters covering [start, end]."""
+    if unit not in UNITS:
+        raise ValueError(f"unit must be one of {', '.join(UNITS)}")
+    step = UNITS[unit]
+    first = date(start.year, start.month - (start.month - 1) % step, 1)
+    result = []
+    while first <= end:
+        after = _add_months(first, step)
+        result.append((first, after - timedelta(days=1)))
+        first = after
+    return result
+
+
+def sweep(spans, bkts):
+    """Active-project counts per grant for each bucket, by a sweep over sorted spans.
+
+    `spans` are (gid, start, end) with end None for ongoing projects; `bkts` are
+    ordered, non-overlapping (first, last) buckets. A span overlaps a bucket when
+    it starts on or before `last` and ends on or after `first`, so the count is
+    starts seen so far minus ends already passed. O(P log P + G * B).
+    """
+    by_grant = {}
+    for gid, start, end in spans:
+        starts, ends = by_grant.setdefault(gid, ([], []))
+        starts.append(start)
+        ends.append(end or date.max)
+    counts = {}
+    for gid, (starts, ends) in by_grant.items():
+        starts.sort()
+        ends.sort()
+        started = ended = 0
+        row = []
+        for first, last in bkts:
+            while started < len(starts) and starts[started] <= last:
+                started += 1
+            while ended < len(ends) and ends[ended] < first:
+                ended += 1
+            row.append(started - ended)
+        counts[gid] = row
+    return counts
+
+
+def _period(start, end, unit):
+    bkts = buckets(start, end, unit)
+    if not bkts:
+        raise ValueError("The period must end on or after its start.")
+    return bkts
+
+
+def activity(db, start, end, unit="month"):
+    """(buckets, {gid: [active projects per bucket]}) for every funded grant.
+
+    One indexed query loads the funded project spans overlapping the period;
+    the counts come from sweep().
+    """
+    bkts = _period(start, end, unit)
+    spans = db.execute_query(SPANS_SQL, (bkts[0][0], bkts[-1][1]), fetch=True, row_format="tuple")
+    return bkts, sweep(spans, bkts)
+
+
+def activity_sql(db, start, end, unit="month"):
+    """Same result as activity(), counted by PostgreSQL with generate_series buckets."""
+    bkts = _period(start, end, unit)
+    step = f"{UNITS[unit]} months"
+    rows = db.execute_query(ACTIVITY_SQL, (step, bkts[0][0], bkts[-1][0], step), fetch=True, row_format="tuple")
+    index = {first: i for i, (first, _) in enumerate(bkts)}
+    counts = {}
+    for gid, bucket_start, active in rows:
+        counts.setdefault(gid, [0] * len(bkts))[index[bucket_start]] = active
+    return bkts, counts
+
+
+def bucket_label(first, unit):
+    if unit == "quarter":
+        return f"{first.year} Q{(first.month - 1) // 3 + 1}"
+    return first.strftime("%Y-%m")
+
+
+# Line colours for the chart, cycled per grant
+COLORS = ("#1976d2", "#e53935", "#43a047", "#fb8c00", "#8e24aa", "#00897b", "#6d4c41", "#546e7a")
+
+
+def draw_chart(canvas, bkts, counts, unit, width=760, height=360, top=len(COLORS)):
+    """Plot the `top` grants by total activity as lines over the buckets."""
+    canvas.delete("all")
+    series = sorted(counts.items(), key=lambda item: (-sum(item[1]), item[0]))[:top]
+    if not series or not bkts:
+        canvas.create_text(width // 2, height // 2, text="No funded projects in this period")
+        return
+    left, right, top_margin, bottom = 40, 140, 20, 50
+    plot_w = width - left - right
+    plot_h = height - top_margin - bottom
+    peak = max(max(row) for _, row in series) or 1
+    step = plot_w / max(len(bkts) - 1, 1)
+
+    def xy(i, value):
+        return left + i * step, top_margin + plot_h - value * plot_h / peak
+
+    canvas.create_line(left, top_margin, left, top_margin + plot_h)
+    canvas.create_line(left, top_margin + plot_h, left + plot_w, top_margin + plot_h)
+    for value in sorted({0, peak // 2, peak}):
+        y = xy(0, value)[1]
+        canvas.create_text(left - 6, y, text=str(value), anchor="e")
+    # Label at most ~12 buckets so the axis stays readable
+    every = max(1, len(bkts) // 12)
+    for i in range(0, len(bkts), every):
+        x = xy(i, 0)[0]
+        canvas.create_text(x, top_margin + plot_h + 6, text=bucket_label(bkts[i][0], unit), anchor="ne", angle=45)
+    for n, (gid, row) in enumerate(series):
+        color = COLORS[n % len(COLORS)]
+        points = [c for i, value in enumerate(row) for c in xy(i, value)]
+        if len(points) > 2:
+            canvas.create_line(*points, fill=color, width=2)
+        else:
+            x, y = points
+            canvas.create_oval(x - 3, y - 3, x + 3, y + 3, fill=color, outline=color)
+        ly = top_margin + n * 18
+        canvas.create_rectangle(width - right + 12, ly, width - right + 24, ly + 12, fill=color, outline=color)
+        canvas.create_text(width - right + 30, ly + 6, text=f"{gid} ({max(row)} max)", anchor="w")
+
+
+def activity_dialog(window, db, executor):
+    """Active projects per grant per month or quarter, as a chart and a table."""
+    dlg = tk.Toplevel(window)
+    dlg.title("Project Activity by Grant")
+    frm = tk.Frame(dlg, bg="#fff3e0")
+    frm.pack(fill=tk.X, padx=8, pady=8)
+    today = date.today()
+    tk.Label(frm, text="Start(YYYY-MM-DD):", bg="#fff3e0").pack(side=tk.LEFT)
+    start_entry = tk.Entry(frm, width=12)
+    start_entry.insert(0, date(today.year - 1, today.month, 1).isoformat())
+    start_entry.pack(side=tk.LEFT, padx=4)
+    tk.Label(frm, text="End(YYYY-MM-DD):", bg="#fff3e0").pack(side=tk.LEFT)
+    end_entry = tk.Entry(frm, width=12)
+    end_entry.insert(0, today.isoformat())
+    end_entry.pack(side=tk.LEFT, padx=4)
+    unit_box = ttk.Combobox(frm, values=list(UNITS), state="readonly", width=8)
+    unit_box.set("month")
+    unit_box.pack(side=tk.LEFT, padx=4)
+
+    canvas = tk.Canvas(dlg, width=760, height=360, bg="white")
+    canvas.pack(padx=8)
+    table = ttk.Treeview(dlg, show="headings", height=8)
+    table.pack(fill=tk.BOTH, expand=True, padx=8, pady=(6, 8))
+
+    def show(result, unit):
+        bkts, counts = result
+        draw_chart(canvas, bkts, counts, unit)
+        cols = ["Grant"] + [bucket_label(first, unit) for first, _ in bkts]
+        table.configure(columns=cols)
+        for c in cols:
+            table.heading(c, text=c)
+            table.column(c, width=70, anchor="center")
+        table.delete(*table.get_children())
+        for gid in sorted(counts):
+            table.insert("", tk.END, values=[gid] + counts[gid])
+
+    def run():
+        try:
+            start = datetime.strptime(start_entry.get().strip(), "%Y-%m-%d").date()
+            end = datetime.strptime(end_entry.get().strip(), "%Y-%m-%d").date()
+        except ValueError:
+            messagebox.showwarning("Validation", "Dates must be YYYY-MM-DD.", parent=dlg)
+            return
+        if end < start:
+            messagebox.showwarning("Validation", "End must be on or after start.", parent=dlg)
+            return
+        # Labelled with the unit the query ran with, even if the box changes
+        unit = unit_box.get()
+        executor.submit(
+            lambda: activity(db, start, end, unit),
+            lambda result: show(result, unit),
+            lambda e: messagebox.showerror("Error", str(e), parent=dlg),
+        )
+
+    tk.Button(frm, text="Show", bg="#fb8c00", fg="white", command=run).pack(side=tk.LEFT, padx=6)
+    run()
+    return dlg
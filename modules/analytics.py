@@ -0,0 +1,145 @@
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError as e:
+    np = None
+    _numpy_error = e
+
+
+# Grant burn-rate analytics. A grant's spending is the cost of the WORKS hours
+# on the projects it funds, priced per member type; a project funded by
+# several grants is charged to them in equal shares. Hours come from the
+# effort ledger (MEMBER_PROJECT_MONTH_HOURS, see triggers.py), so the query
+# reads at most members x projects x 12 totals however long the WORKS history.
+# WORKS weeks are weeks of the year, so a grant's monthly profile repeats each
+# year; it is laid out over the grant's DURATION months from its START_DATE.
+HOURLY_RATES = {"Faculty": 95.0, "Student": 30.0, "Collaborator": 60.0}
+DEFAULT_HOURLY_RATE = 45.0
+
+# Cost per grant and calendar month: each project-month is priced first, then
+# split between the project's grants. Parameters: default rate, member types,
+# their rates.
+BURN_SQL = """
+WITH project_cost AS (
+    SELECT l.pid, l.month, SUM(l.hours * COALESCE(r.rate, %s::float8)) AS cost
+    FROM member_project_month_hours l
+    JOIN lab_member lm ON lm.mid = l.mid
+    LEFT JOIN unnest(%s::text[], %s::float8[]) AS r(member_type, rate) ON r.member_type = lm.member_type
+    GROUP BY l.pid, l.month
+),
+shares AS (
+    SELECT gid, pid, 1.0::float8 / COUNT(*) OVER (PARTITION BY pid) AS share
+    FROM funds
+),
+monthly AS (
+    SELECT s.gid, c.month, SUM(c.cost * s.share) AS cost
+    FROM shares s
+    JOIN project_cost c ON c.pid = s.pid
+    GROUP BY s.gid, c.month
+)
+SELECT g.gid, g.budget, g.start_date, g.duration, m.month, m.cost
+FROM grants g
+LEFT JOIN monthly m ON m.gid = g.gid
+ORDER BY g.gid, m.month;
+"""
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("Grant analytics need NumPy; install it with 'pip install numpy'.") from _numpy_error
+
+
+class BurnReport:
+    """Burn rate and projected exhaustion for every grant.
+
+    Arrays are indexed like `gids`. `remaining_by_month[g, k]` is grant g's
+    budget left at the end of its k-th month (NaN past its duration or
+    without a budget).
+    """
+
+    def __init__(self, gids, budget, start, duration, monthly_burn, spent, remaining,
+                 runway_months, exhaustion, remaining_by_month):
+        self.gids = gids
+        self.budget = budget
+        self.start = start
+        self.duration = duration
+        self.monthly_burn = monthly_burn
+        self.spent = spent
+        self.remaining = remaining
+        self.runway_months = runway_months
+        self.exhaustion = exhaustion
+        self.remaining_by_month = remaining_by_month
+
+    def __len__(self):
+        return len(self.gids)
+
+    def rows(self):
+        """(gid, budget, monthly burn, spent, remaining, runway months, exhaustion) per grant."""
+        def num(value):
+            return None if np.isnan(value) else round(float(value), 2)
+
+        return [
+            (gid, num(self.budget[i]), num(self.monthly_burn[i]), num(self.spent[i]), num(self.remaining[i]),
+             None if np.isinf(self.runway_months[i]) else num(self.runway_months[i]), self.exhaustion[i])
+            for i, gid in enumerate(self.gids)
+        ]
+
+
+def compute_burn(rows, today=None):
+    """Build a BurnReport from BURN_SQL rows.
+
+    A grant without START_DATE is laid out from the current month and one
+    without DURATION projects no spending.
+    """
+    _require_numpy()
+    today = today or date.today()
+    gids, index, monthly = [], {}, []
+    for gid, budget, start, duration, month, cost in rows:
+        if gid not in index:
+            index[gid] = len(gids)
+            gids.append((gid, budget, start, duration))
+        if month is not None:
+            monthly.append((index[gid], month - 1, float(cost or 0)))
+
+    count = len(gids)
+    profile = np.zeros((count, 12))
+    if monthly:
+        i, month, cost = zip(*monthly)
+        profile[list(i), list(month)] = cost
+    budget = np.array([np.nan if b is None else float(b) for _, b, _, _ in gids])
+    duration = np.array([d or 0 for _, _, _, d in gids], dtype=int)
+    start = [s or today.replace(day=1) for _, _, s, _ in gids]
+    start_month = np.array([s.year * 12 + s.month - 1 for s in start], dtype=int)
+
+    # Month k of a grant falls in calendar month (start month + k) % 12
+    horizon = max(int(duration.max(initial=0)), 1)
+    offsets = np.arange(horizon)
+    active = offsets < duration[:, None]
+    cost = profile[np.arange(count)[:, None], (start_month[:, None] + offsets) % 12] * active
+    cumulative = np.hstack([np.zeros((count, 1)), np.cumsum(cost, axis=1)])
+
+    elapsed = np.clip(today.year * 12 + today.month - 1 - start_month, 0, duration)
+    spent = cumulative[np.arange(count), elapsed]
+    remaining = budget - spent
+    monthly_burn = profile.sum(axis=1) / 12
+    with np.errstate(divide="ignore", invalid="ignore"):
+        runway = np.where(monthly_burn > 0, np.maximum(remaining, 0) / monthly_burn, np.inf)
+
+    remaining_by_month = np.where(active, budget[:, None] - cumulative[:, 1:], np.nan)
+    over = remaining_by_month < 0
+    first_over = over.argmax(axis=1)
+    # First day of the month the budget runs out in (datetime64 months count from 1970)
+    exhausted_on = (start_month - 1970 * 12 + first_over).astype("datetime64[M]").astype("datetime64[D]").tolist()
+    exhaustion = [day if over[i].any() else None for i, day in enumerate(exhausted_on)]
+    return BurnReport([g for g, _, _, _ in gids], budget, start, duration, monthly_burn, spent, remaining,
+                      runway, exhaustion, remaining_by_month)
+
+
+def grant_burn(db, rates=None, default_rate=DEFAULT_HOURLY_RATE, today=None):
+    """BurnReport for every grant, from one query over the effort ledger."""
+    _require_numpy()
+    rates = HOURLY_RATES if rates is None else rates
+    rows = db.execute_query(BURN_SQL, (default_rate, list(rates), list(rates.values())),
+                            fetch=True, row_format="tuple")
+    return compute_burn(rows, today)
@@ -0,0 +1,116 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+# The grant FTE report is also run headless, so it lives in reports.py
+from modules.reports import FULL_TIME_HOURS, grant_fte
+
+# Effort reports read the ledger the WORKS triggers maintain (triggers.py,
+# section 4b) rather than WORKS itself, so their cost follows the size of the
+# report, not of the hours history.
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# Hours per member and month on a project: (mid, name, month, hours)
+PROJECT_EFFORT_SQL = (
+    "SELECT l.mid, lm.name, l.month, l.hours FROM member_project_month_hours l "
+    "JOIN lab_member lm ON lm.mid = l.mid "
+    "WHERE l.pid = %s ORDER BY l.mid, l.month;"
+)
+
+# Weekly totals of a project: (week, hours, members)
+PROJECT_WEEKS_SQL = "SELECT week, hours, entries AS members FROM project_week_hours WHERE pid = %s ORDER BY week;"
+
+# Hours per project for a member: (pid, title, hours)
+MEMBER_EFFORT_SQL = (
+    "SELECT l.pid, p.title, SUM(l.hours) AS hours FROM member_project_month_hours l "
+    "JOIN project p ON p.pid = l.pid "
+    "WHERE l.mid = %s GROUP BY l.pid, p.title ORDER BY hours DESC, l.pid;"
+)
+
+def project_effort(db, pid):
+    """(members, totals): per member (mid, name, [hours per month], total), and hours per month."""
+    rows = db.execute_query(PROJECT_EFFORT_SQL, (pid,), fetch=True, row_format="tuple")
+    members = {}
+    totals = [0] * 12
+    for mid, name, month, hours in rows:
+        entry = members.setdefault(mid, [mid, name, [0] * 12, 0])
+        entry[2][month - 1] += hours
+        entry[3] += hours
+        totals[month - 1] += hours
+    return [tuple(m) for m in members.values()], totals
+
+
+def project_weeks(db, pid):
+    return db.execute_query(PROJECT_WEEKS_SQL, (pid,), fetch=True, row_format="tuple")
+
+
+def member_effort(db, mid):
+    return db.execute_query(MEMBER_EFFORT_SQL, (mid,), fetch=True, row_format="tuple")
+
+
+def effort_dialog(window, db, executor):
+    """Hours per member and month for a project, or FTE per grant."""
+    dlg = tk.Toplevel(window)
+    dlg.title("Effort Report")
+    dlg.geometry("900x420")
+    top = tk.Frame(dlg, bg="#fff3e0")
+    top.pack(fill=tk.X, padx=8, pady=8)
+    tk.Label(top, text="PID:", bg="#fff3e0").pack(side=tk.LEFT)
+    pid_entry = tk.Entry(top, width=12)
+    pid_entry.pack(side=tk.LEFT, padx=4)
+    summary = tk.Label(dlg, text="", anchor="w")
+    summary.pack(fill=tk.X, padx=8)
+
+    table_frame = tk.Frame(dlg)
+    table_frame.pack(fill=tk.BOTH, expand=True, padx=8, pady=(4, 8))
+    table = ttk.Treeview(table_frame, show="headings")
+    table.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scroll = ttk.Scrollbar(table_frame, orient="vertical", command=table.yview)
+    table.configure(yscrollcommand=scroll.set)
+    scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def fill(cols, rows, widths=None):
+        table.delete(*table.get_children())
+        table.configure(columns=cols)
+        for i, c in enumerate(cols):
+            table.heading(c, text=c)
+            table.column(c, width=(widths or {}).get(i, 55), anchor="w" if i < 2 else "center")
+        for r in rows:
+            table.insert("", tk.END, values=r)
+
+    def show_project(result):
+        pid, (members, totals) = result
+        if not members:
+            summary.config(text=f"No hours recorded for project {pid}.")
+            fill((), [])
+            return
+        rows = [(mid, name, *months, total) for mid, name, months, total in members]
+        rows.append(("", "Total", *totals, sum(totals)))
+        summary.config(text=f"Project {pid}: {sum(totals)} hours by {len(members)} member(s)")
+        fill(("MID", "Name") + MONTHS + ("Total",), rows, {0: 90, 1: 160})
+
+    def run_project():
+        pid = pid_entry.get().strip()
+        if not pid:
+            messagebox.showinfo("Input needed", "Enter PID", parent=dlg)
+            return
+        executor.submit(
+            lambda: (pid, project_effort(db, pid)),
+            show_project,
+            lambda e: messagebox.showerror("Error", str(e), parent=dlg),
+        )
+
+    def show_fte(rows):
+        summary.config(text=f"Mean weekly FTE per grant ({FULL_TIME_HOURS} hours = 1 FTE), over weeks with effort")
+        fill(("Grant", "Projects", "Weeks", "Hours", "FTE"), rows, {0: 120, 1: 90})
+
+    def run_fte():
+        executor.submit(
+            lambda: grant_fte(db),
+            show_fte,
+            lambda e: messagebox.showerror("Error", str(e), parent=dlg),
+        )
+
+    tk.Button(top, text="Project Effort", bg="#fb8c00", fg="white", command=run_project).pack(side=tk.LEFT, padx=4)
+    tk.Button(top, text="FTE per Grant", bg="#607d8b", fg="white", command=run_fte).pack(side=tk.LEFT, padx=4)
+    tk.Button(top, text="Close", command=dlg.destroy).pack(side=tk.RIGHT)
+    return dlg
@@ -1,7 +1,47 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
 
+from modules.executor import QueryExecutor, busy_indicator
+from modules.importer import import_file
+from modules.live import LiveChanges
+from modules.reservations import reservations_dialog
+from modules.widgets import VirtualTable
+
+EQUIPMENT_COLUMNS = ("eid", "name", "type", "status", "pur_date")
+
+EQUIPMENT_STATUS_SQL = "SELECT eid, name, status, pur_date FROM equipment WHERE eid = %s;"
+# USES.PERIOD is [start_date, end_date); "current" means it contains today,
+# answered from the (EID, PERIOD) GiST index (see create.migrate_uses_period)
+EQUIPMENT_OPEN_USES_SQL = "SELECT COUNT(*) AS cnt FROM uses WHERE eid = %s AND period @> CURRENT_DATE;"
+CURRENT_USERS_SQL = (
+    "SELECT u.mid, lm.name, u.purpose, p.title FROM uses u "
+    "LEFT JOIN lab_member lm ON lm.mid = u.mid "
+    "LEFT JOIN project p ON p.pid = u.purpose "
+    "WHERE u.eid = %s AND u.period @> CURRENT_DATE"
+)
+# Raised when a session would overlap another one of the same device
+EXCLUSION_VIOLATION = "23P01"
+
+# Sessions that have started; future bookings (see reservations.py) are not usage yet
+USAGE_SQL = (
+    "SELECT EID, MID, PURPOSE, START_DATE, END_DATE FROM USES "
+    "WHERE START_DATE <= CURRENT_DATE ORDER BY START_DATE DESC;"
+)
+USAGE_ROW_SQL = (
+    "SELECT EID, MID, PURPOSE, START_DATE, END_DATE FROM USES "
+    "WHERE EID = %s AND MID = %s AND START_DATE = %s AND START_DATE <= CURRENT_DATE;"
+)
+# Check-out from today until the device's next booking (open-ended if none).
+# Parameters: eid, mid, purpose, eid.
+START_USAGE_SQL = (
+    "INSERT INTO USES (EID, MID, PURPOSE, START_DATE, END_DATE) "
+    "SELECT %s, %s, %s, CURRENT_DATE, ("
+    "SELECT MIN(START_DATE) FROM USES WHERE EID = %s "
+    "AND PERIOD && daterange(CURRENT_DATE + 1, NULL) AND START_DATE > CURRENT_DATE"
+    ") RETURNING END_DATE;"
+)
+
 
 def equipment_menu(db):
     # Ensure there is a root Tk instance. If not, create one and keep it hidden.
@@ -45,40 +85,32 @@ def equipment_menu(db):
     tree.configure(yscrollcommand=scrollbar.set)
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-    def refresh_table():
-        # Fetch rows first. If fetch fails, leave the current table intact.
-        try:
-            rows = db.execute_query(
-                "SELECT eid, name, type, status, pur_date FROM equipment ORDER BY eid;",
-                fetch=True,
-            )
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to fetch equipment: {e}")
-            return
-
-        # Only clear and repopulate the tree when fetch succeeded
-        for row in tree.get_children():
-            tree.delete(row)
+    # Status bar: long reads run in the background with a busy indicator
+    status_frame = tk.Frame(window, bg="#e8f5e9")
+    status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+    status_label = tk.Label(status_frame, text="", bg="#e8f5e9")
+    status_label.pack(side=tk.LEFT, padx=6)
+    cancel_btn = tk.Button(status_frame, text="Cancel", state="disabled", command=lambda: executor.cancel_all())
+    cancel_btn.pack(side=tk.RIGHT, padx=6)
+    executor = QueryExecutor(window, db, on_busy=busy_indicator(window, status_label, cancel_btn))
+
+    # Only the visible window of rows lives in the Treeview; pages are read
+    # by keyset pagination on EID as the user scrolls.
+    table = VirtualTable(
+        tree, scrollbar, db, "equipment",
+        EQUIPMENT_COLUMNS, key="eid", headings=columns,
+        executor=executor,
+        on_error=lambda e: messagebox.showerror("Error", f"Failed to fetch equipment: {e}"),
+    )
+
+    # Apply changes made from other stations as they are committed
+    live = LiveChanges(window, db)
+    live.on("equipment", table.apply_change)
 
-        for idx, r in enumerate(rows):
-            if isinstance(r, dict):
-                vals = tuple(r.values())
-            else:
-                vals = tuple(r)
-            tag = 'odd' if idx % 2 == 0 else 'even'
-            tree.insert("", tk.END, values=vals, tags=(tag,))
-
-        for i, col in enumerate(columns):
-            max_val_len = 0
-            for child in tree.get_children():
-                try:
-                    cell = tree.item(child, "values")[i]
-                except Exception:
-                    cell = ""
-                max_val_len = max(max_val_len, len(str(cell)))
-            header_len = len(col)
-            width = max(80, max(header_len * 10, max_val_len * 10))
-            tree.column(col, width=width)
+    def refresh_table():
+        # Read on a worker; if the fetch fails, the table is left intact and
+        # on_error shows it.
+        table.refresh()
 
     refresh_table()
 
@@ -203,6 +235,24 @@ def equipment_menu(db):
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    # --- Bulk import from CSV/JSON ---
+    def import_equipment():
+        path = filedialog.askopenfilename(
+            parent=window, title="Import Equipment",
+            filetypes=[("CSV or JSON", "*.csv *.json"), ("All files", "*.*")])
+        if not path:
+            return
+
+        def done(result):
+            messagebox.showinfo("Import", result.summary())
+            refresh_table()
+
+        executor.submit(
+            lambda: import_file(db, "equipment", path),
+            done,
+            lambda e: messagebox.showerror("Error", f"Import failed: {e}"),
+        )
+
     btn_frame = tk.Frame(window, bg="#e8f5e9")
     btn_frame.pack(pady=10)
 
@@ -213,6 +263,7 @@ def equipment_menu(db):
     tk.Button(btn_frame, text="Update Status", bg="#2196f3", fg="white", command=update_status, **btn_kwargs).grid(row=0, column=2, padx=5)
     tk.Button(btn_frame, text="Show Status", bg="#607d8b", fg="white", command=lambda: show_status(), **btn_kwargs).grid(row=0, column=3, padx=5)
     tk.Button(btn_frame, text="Refresh Table", bg="#ff9800", fg="white", command=refresh_table, **btn_kwargs).grid(row=0, column=4, padx=5)
+    tk.Button(btn_frame, text="Import CSV/JSON", bg="#795548", fg="white", command=import_equipment, **btn_kwargs).grid(row=0, column=5, padx=5)
 
     def show_status():
         # Display equipment status and a short summary for given EID
@@ -220,17 +271,20 @@ def equipment_menu(db):
         if not eid:
             messagebox.showinfo("Input needed", "Enter EID in the EID field above.")
             return
-        try:
-            q = "SELECT eid, name, status, pur_date FROM equipment WHERE eid = %s;"
-            rows = db.execute_query(q, (eid,), fetch=True)
+        def fetch():
+            rows = db.execute_query(EQUIPMENT_STATUS_SQL, (eid,), fetch=True, prepare="equipment_by_eid")
+            if not rows:
+                return rows, []
+            # Count current users
+            return rows, db.execute_query(EQUIPMENT_OPEN_USES_SQL, (eid,), fetch=True, prepare="equipment_open_uses")
+
+        def show(result):
+            rows, cnt_rows = result
             if not rows:
                 messagebox.showinfo("Not found", f"No equipment found with EID {eid}.")
                 return
             r = rows[0] if isinstance(rows[0], dict) else { 'eid': rows[0][0], 'name': rows[0][1], 'status': rows[0][2], 'pur_date': rows[0][3] }
 
-            # Count current users
-            q2 = "SELECT COUNT(*) AS cnt FROM uses WHERE eid = %s AND (end_date IS NULL OR end_date > CURRENT_DATE);"
-            cnt_rows = db.execute_query(q2, (eid,), fetch=True)
             cnt = 0
             if cnt_rows:
                 cnt = int(cnt_rows[0].get('cnt') if isinstance(cnt_rows[0], dict) else cnt_rows[0][0])
@@ -240,8 +294,8 @@ def equipment_menu(db):
             pur_date = r.get('pur_date')
             msg = f"EID: {eid}\nName: {name}\nStatus: {status}\nPurchase date: {pur_date}\nCurrent active users: {cnt}"
             messagebox.showinfo(f"Status of {eid}", msg)
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+
+        executor.submit(fetch, show, lambda e: messagebox.showerror("Error", str(e)))
 
     # The explicit Show Status button above is replaced by the labeled button
     # created earlier with shortcut text.
@@ -261,14 +315,23 @@ def equipment_menu(db):
     pid_entry.grid(row=0, column=5)
 
     def add_usage():
-        # Use USES table (schema) with START_DATE, END_DATE columns
-        q = "INSERT INTO USES (EID, MID, PURPOSE, START_DATE) VALUES (%s, %s, %s, CURRENT_DATE);"
+        # The session ends when the device's next booking starts, so a future
+        # reservation does not block using it today
+        eid = eid_entry.get()
         try:
-            db.execute_query(q, (eid_entry.get(), mid_entry.get(), pid_entry.get()))
-            messagebox.showinfo("Success", "Usage started")
+            rows = db.execute_query(START_USAGE_SQL, (eid, mid_entry.get(), pid_entry.get(), eid),
+                                    fetch=True, row_format="tuple")
+            until = rows[0][0] if rows else None
+            if until is None:
+                messagebox.showinfo("Success", "Usage started")
+            else:
+                messagebox.showinfo("Success", f"Usage started until {until}, when {eid} is booked")
             refresh_usage()
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            if getattr(e, "pgcode", None) == EXCLUSION_VIOLATION:
+                messagebox.showerror("In use", f"Equipment {eid_entry.get()} is already in use.")
+            else:
+                messagebox.showerror("Error", str(e))
 
     def end_usage():
         # Close an active usage row. Use RETURNING to know whether any row
@@ -282,7 +345,10 @@ def equipment_menu(db):
         # Match case-insensitively to avoid issues with entered casing
         q = (
             "UPDATE USES SET END_DATE = GREATEST(COALESCE(START_DATE, CURRENT_DATE - INTERVAL '1 day'), CURRENT_DATE - INTERVAL '1 day') "
-            "WHERE UPPER(EID) = UPPER(%s) AND UPPER(MID) = UPPER(%s) AND END_DATE IS NULL "
+            "WHERE UPPER(EID) = UPPER(%s) AND UPPER(MID) = UPPER(%s) "
+            # Sessions running today, open or ending at a later booking; an
+            # open-ended booking that has not started yet is left alone
+            "AND PERIOD @> CURRENT_DATE "
             "RETURNING START_DATE, END_DATE;"
         )
         try:
@@ -298,20 +364,37 @@ def equipment_menu(db):
     tk.Button(usage_frame, text="Start Usage", bg="#4caf50", fg="white", command=add_usage).grid(row=1, column=1, pady=6)
     tk.Button(usage_frame, text="End Usage", bg="#2196f3", fg="white", command=end_usage).grid(row=1, column=3, pady=6)
 
+    # --- Bulk import from CSV/JSON ---
+    def import_usage():
+        path = filedialog.askopenfilename(
+            parent=window, title="Import Usage Records",
+            filetypes=[("CSV or JSON", "*.csv *.json"), ("All files", "*.*")])
+        if not path:
+            return
+
+        def done(result):
+            messagebox.showinfo("Import", result.summary())
+            refresh_usage()
+
+        executor.submit(
+            lambda: import_file(db, "usage", path),
+            done,
+            lambda e: messagebox.showerror("Error", f"Import failed: {e}"),
+        )
+
+    tk.Button(usage_frame, text="Import Usage", bg="#795548", fg="white", command=import_usage).grid(row=1, column=7, padx=6, pady=6)
+
+    # Future bookings, recurring slots and next-free-slot search
+    tk.Button(usage_frame, text="Reservations", bg="#00897b", fg="white",
+              command=lambda: reservations_dialog(window, db, executor, on_change=refresh_usage)).grid(row=1, column=8, padx=6, pady=6)
+
     # Button to show current users of a given equipment and their projects
     def show_current_users():
         eid = eid_entry.get().strip()
         if not eid:
             messagebox.showinfo("Input needed", "Enter EID in the EID field above.")
             return
-        try:
-            q = (
-                "SELECT u.mid, lm.name, u.purpose, p.title FROM uses u "
-                "LEFT JOIN lab_member lm ON lm.mid = u.mid "
-                "LEFT JOIN project p ON p.pid = u.purpose "
-                "WHERE u.eid = %s AND (u.end_date IS NULL OR u.end_date > CURRENT_DATE)"
-            )
-            rows = db.execute_query(q, (eid,), fetch=True)
+        def show(rows):
             if not rows:
                 messagebox.showinfo("No users", "No current users found for this equipment.")
                 return
@@ -335,14 +418,15 @@ def equipment_menu(db):
                 tv.column(c, width=200, anchor='w')
             tv.pack(fill=tk.BOTH, expand=True)
             for r in rows:
-                if isinstance(r, dict):
-                    vals = (r.get('mid'), r.get('name'), r.get('purpose'), r.get('title'))
-                else:
-                    vals = (r[0], r[1] if len(r)>1 else '', r[2] if len(r)>2 else '', r[3] if len(r)>3 else '')
-                tv.insert('', tk.END, values=vals)
+                tv.insert('', tk.END, values=r)
             tk.Button(dlg, text='Close', command=lambda: (dlg.grab_release() if hasattr(dlg, 'grab_release') else None, dlg.destroy())).pack(pady=6)
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+
+        executor.submit(
+            lambda: db.execute_query(CURRENT_USERS_SQL, (eid,), fetch=True, row_format="tuple",
+                                     prepare="equipment_current_users"),
+            show,
+            lambda e: messagebox.showerror("Error", str(e)),
+        )
 
     tk.Button(usage_frame, text="Show Current Users", bg="#7b1fa2", fg="white", command=show_current_users).grid(row=1, column=5, padx=6)
 
@@ -359,23 +443,74 @@ def equipment_menu(db):
     usage_tree.configure(yscrollcommand=usage_scroll.set)
     usage_scroll.pack(side=tk.RIGHT, fill=tk.Y)
 
+    # Latest usage stream; a new refresh cancels one still running
+    usage_job = [None]
+
     def refresh_usage():
-        # Fetch usage rows first. If fetch fails, keep existing usage table intact.
-        try:
-            rows = db.execute_query("SELECT EID, MID, PURPOSE, START_DATE, END_DATE FROM USES ORDER BY START_DATE DESC;", fetch=True)
-        except Exception:
+        # Stream usage rows in batches on a worker so the table starts
+        # rendering before the whole USES history has arrived. The table is
+        # only cleared once the query has produced its first batch (or
+        # finished empty), so a failed query leaves it intact.
+        if usage_job[0] is not None:
+            usage_job[0].cancel()
+        cleared = [False]
+
+        def clear():
+            if not cleared[0]:
+                for r in usage_tree.get_children():
+                    usage_tree.delete(r)
+                cleared[0] = True
+
+        def insert_batch(rows):
+            clear()
+            for r in rows:
+                put_usage_row(r, tk.END)
+
+        usage_job[0] = executor.stream(
+            lambda: db.stream_query(USAGE_SQL, row_format="tuple"),
+            insert_batch,
+            clear,
             # If table missing or query failed, skip updating the usage table
+            lambda e: None,
+        )
+
+    def usage_iid(key):
+        # Usage items are keyed by the USES primary key (EID, MID, START_DATE)
+        return "|".join(str(v) for v in key)
+
+    def put_usage_row(row, index):
+        iid = usage_iid((row[0], row[1], row[3]))
+        if usage_tree.exists(iid):
+            usage_tree.item(iid, values=row)
+        else:
+            usage_tree.insert('', index, iid=iid, values=row)
+
+    def apply_usage_change(op, key):
+        # Live check-outs/returns from other stations: patch the one row
+        if op == "RELOAD":
+            refresh_usage()
             return
+        iid = usage_iid(key)
 
-        for r in usage_tree.get_children():
-            usage_tree.delete(r)
+        def patch(rows):
+            if rows:
+                # New sessions start today, so they belong at the top
+                put_usage_row(rows[0], 0)
+            elif usage_tree.exists(iid):
+                usage_tree.delete(iid)
 
-        for r in rows:
-            if isinstance(r, dict):
-                vals = (r.get('eid'), r.get('mid'), r.get('purpose'), r.get('start_date'), r.get('end_date'))
-            else:
-                vals = tuple(r)
-            usage_tree.insert('', tk.END, values=vals)
+        if op == "DELETE":
+            patch([])
+            return
+        # Fetched on a worker: a burst of changes must not stall the window
+        executor.submit(
+            lambda: db.execute_query(USAGE_ROW_SQL, tuple(key), fetch=True, row_format="tuple",
+                                     prepare="uses_by_key"),
+            patch,
+            lambda e: print("Usage row refresh failed:", e),
+        )
+
+    live.on("uses", apply_usage_change)
 
     refresh_usage()
 
@@ -387,3 +522,5 @@ def equipment_menu(db):
         pass
 
     window.wait_window()
+    live.close()
+    executor.shutdown()
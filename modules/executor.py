@@ -0,0 +1,170 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from database import CancelScope
+
+
+class QueryJob:
+    """Handle for one piece of work submitted to a QueryExecutor."""
+
+    def __init__(self, executor):
+        self._executor = executor
+        self.cancelled = False
+        self.done = False
+        # Connections the job's statements are running on, to cancel them
+        self.scope = CancelScope()
+
+    def cancel(self):
+        # Mark the job so none of its callbacks run, and ask the server to
+        # abort its statement (the worker then fails with QueryCanceled).
+        if self.done or self.cancelled:
+            return
+        self.cancelled = True
+        try:
+            self.scope.cancel()
+        except Exception as e:
+            print("Cancel failed:", e)
+
+
+class QueryExecutor:
+    """Run database work on worker threads and hand the results back to Tk.
+
+    Results travel through a queue that the Tk thread drains with
+    `widget.after()`, so callbacks always run on the Tk thread and may touch
+    widgets. `on_busy(True)` is called when the first job starts and
+    `on_busy(False)` when the last one finishes, to drive a busy indicator.
+    """
+
+    def __init__(self, widget, db, max_workers=None, poll_ms=50, on_busy=None):
+        self.widget = widget
+        self.db = db
+        self.poll_ms = poll_ms
+        self.on_busy = on_busy
+        if max_workers is None:
+            # One worker per pooled connection; a single shared connection
+            # cannot run two statements at once.
+            pool = getattr(db, "pool", None)
+            max_workers = pool.maxconn if pool is not None else 1
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query")
+        self._results = queue.Queue()
+        self._jobs = set()
+        self._polling = False
+
+    def submit(self, work, on_done=None, on_error=None):
+        """Run work() on a worker; then on_done(result) or on_error(exc) on the Tk thread."""
+        job = QueryJob(self)
+
+        def run():
+            try:
+                if job.cancelled:
+                    result = None
+                else:
+                    with self._scope(job):
+                        result = work()
+            except Exception as e:
+                self._results.put((job, on_error, (e,), True))
+            else:
+                self._results.put((job, on_done, (result,), True))
+
+        self._start(job, run)
+        return job
+
+    def stream(self, batches, on_batch, on_done=None, on_error=None):
+        """Iterate batches() (e.g. a db.stream_query generator) on a worker.
+
+        on_batch(rows) runs on the Tk thread as each batch arrives, then
+        on_done() once the stream is exhausted.
+        """
+        job = QueryJob(self)
+
+        def run():
+            try:
+                if not job.cancelled:
+                    with self._scope(job):
+                        gen = batches()
+                        try:
+                            for rows in gen:
+                                if job.cancelled:
+                                    break
+                                self._results.put((job, on_batch, (rows,), False))
+                        finally:
+                            # Closing an unfinished stream rolls back its cursor
+                            gen.close()
+            except Exception as e:
+                self._results.put((job, on_error, (e,), True))
+            else:
+                self._results.put((job, on_done, (), True))
+
+        self._start(job, run)
+        return job
+
+    def _scope(self, job):
+        # Statements the job runs register their connection with its scope
+        cancel_scope = getattr(self.db, "cancel_scope", None)
+        return cancel_scope(job.scope) if cancel_scope is not None else nullcontext()
+
+    def _start(self, job, run):
+        if not self._jobs and self.on_busy:
+            self.on_busy(True)
+        self._jobs.add(job)
+        self._pool.submit(run)
+        if not self._polling:
+            self._polling = True
+            self._schedule()
+
+    def _schedule(self):
+        try:
+            self.widget.after(self.poll_ms, self.poll)
+        except Exception:
+            # The window is gone; there is nothing left to deliver results to
+            self._polling = False
+
+    def poll(self):
+        # Deliver every queued result, then keep polling while jobs remain
+        while True:
+            try:
+                job, callback, args, final = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if final:
+                job.done = True
+                self._jobs.discard(job)
+            if callback is not None and not job.cancelled:
+                try:
+                    callback(*args)
+                except Exception as e:
+                    print("Callback error:", e)
+
+        if self._jobs:
+            self._schedule()
+        else:
+            self._polling = False
+            if self.on_busy:
+                self.on_busy(False)
+
+    @property
+    def busy(self):
+        return bool(self._jobs)
+
+    def cancel_all(self):
+        for job in list(self._jobs):
+            job.cancel()
+
+    def shutdown(self):
+        # Called when the window closes: stop running queries, don't wait
+        self.cancel_all()
+        self._pool.shutdown(wait=False)
+
+
+def busy_indicator(window, label, cancel_button, text="Running query..."):
+    """on_busy callback: show `text` in label, enable Cancel and a watch cursor while busy."""
+    def on_busy(busy):
+        try:
+            label.config(text=text if busy else "")
+            cancel_button.config(state="normal" if busy else "disabled")
+            window.config(cursor="watch" if busy else "")
+        except Exception:
+            # The window was closed while a query was still running
+            pass
+    return on_busy
@@ -0,0 +1,208 @@
+import csv
+import json
+import os
+from datetime import date, datetime
+
+from psycopg2.extras import execute_values
+
+
+# Import specs: table and (column, kind, required) per field. Values are
+# normalised the way the add forms do it (IDs upper-cased, 'null' or an
+# empty cell means NULL, dates as YYYY-MM-DD).
+IMPORTS = {
+    "members": ("lab_member", [
+        ("mid", "upper", True),
+        ("name", "upper", True),
+        ("member_type", "member_type", True),
+        ("join_date", "date", True),
+        ("mentor_mid", "upper", False),
+    ]),
+    "projects": ("project", [
+        ("pid", "upper", True),
+        ("title", "upper", True),
+        ("start_date", "date", True),
+        ("end_date", "date", False),
+        ("exp_duration", "int", False),
+        ("facultyid", "upper", True),
+    ]),
+    "equipment": ("equipment", [
+        ("eid", "text", True),
+        ("name", "text", True),
+        ("type", "text", True),
+        ("status", "status", True),
+        ("pur_date", "date", False),
+    ]),
+    "usage": ("uses", [
+        ("eid", "text", True),
+        ("mid", "text", True),
+        ("purpose", "text", False),
+        ("start_date", "today", False),
+        ("end_date", "date", False),
+    ]),
+}
+
+# Header spellings of the form labels that differ from the column names
+ALIASES = {
+    "purchase_date": "pur_date",
+    "duration": "exp_duration",
+    "mentor": "mentor_mid",
+    "type_": "type",
+    "member_mid": "mid",
+    "start_time": "start_date",
+    "end_time": "end_date",
+}
+
+MEMBER_TYPES = {"STUDENT": "Student", "FACULTY": "Faculty", "COLLABORATOR": "Collaborator"}
+EQUIPMENT_STATUSES = {"Available", "In Use", "Under Maintenance", "Retired"}
+
+
+class ImportResult:
+    def __init__(self):
+        self.inserted = 0
+        # (line number, original record, error message)
+        self.rejected = []
+        self.rejected_path = None
+
+    def summary(self):
+        text = f"Imported {self.inserted} row(s)."
+        if self.rejected:
+            text += f"\n{len(self.rejected)} row(s) rejected"
+            if self.rejected_path:
+                text += f", see {self.rejected_path}"
+            text += "."
+        return text
+
+
+def _header(name):
+    key = str(name).strip().lower().replace(" ", "_")
+    return ALIASES.get(key, key)
+
+
+def read_records(path):
+    """Read a CSV (with a header row) or JSON (a list of objects) file.
+
+    Returns (line number, record) pairs, keys normalised to column names.
+    """
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise ValueError("A JSON import file must contain a list of objects.")
+        return [(i, {_header(k): v for k, v in item.items()}) for i, item in enumerate(data, start=1)]
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        # Data starts on line 2, after the header
+        return [(i, {_header(k): v for k, v in row.items() if k is not None})
+                for i, row in enumerate(reader, start=2)]
+
+
+def _convert(value, kind):
+    if isinstance(value, str):
+        value = value.strip()
+        if value == "" or value.lower() == "null":
+            value = None
+    if value is None:
+        return date.today() if kind == "today" else None
+    if kind == "upper":
+        return str(value).upper()
+    if kind in ("date", "today"):
+        if isinstance(value, date):
+            return value
+        try:
+            return datetime.strptime(str(value), "%Y-%m-%d").date()
+        except ValueError:
+            raise ValueError(f"{value!r} is not a YYYY-MM-DD date")
+    if kind == "int":
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{value!r} is not an integer")
+    if kind == "member_type":
+        return MEMBER_TYPES.get(str(value).upper(), str(value).title())
+    if kind == "status":
+        if value not in EQUIPMENT_STATUSES:
+            raise ValueError(f"status must be one of: {', '.join(sorted(EQUIPMENT_STATUSES))}")
+        return value
+    return str(value)
+
+
+def prepare_row(fields, record):
+    """Convert one record to a tuple of column values; raise ValueError if invalid."""
+    row = []
+    for column, kind, required in fields:
+        value = _convert(record.get(column), kind)
+        if required and value is None:
+            raise ValueError(f"{column} is required")
+        row.append(value)
+    return tuple(row)
+
+
+def write_rejected(path, fields, rejected):
+    columns = [column for column, _, _ in fields]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["line"] + columns + ["error"])
+        for line, record, error in rejected:
+            writer.writerow([line] + [record.get(c, "") for c in columns] + [error])
+
+
+def import_rows(db, kind, records, chunk_size=500, rejected_path=None):
+    """Insert (line, record) pairs of the given kind in one transaction.
+
+    Valid rows are sent in chunks of `chunk_size` with execute_values, each
+    chunk inside a SAVEPOINT. If a chunk fails (duplicate key, foreign key,
+    trigger ...), it is rolled back to its savepoint and retried row by row,
+    so only the offending rows are rejected. Rejected rows are returned and,
+    if `rejected_path` is given, written there with their error.
+    """
+    table, fields = IMPORTS[kind]
+    result = ImportResult()
+    columns = ", ".join(column for column, _, _ in fields)
+    many_sql = f"INSERT INTO {table} ({columns}) VALUES %s;"
+    one_sql = f"INSERT INTO {table} ({columns}) VALUES ({', '.join(['%s'] * len(fields))});"
+
+    valid = []
+    for line, record in records:
+        try:
+            valid.append((line, record, prepare_row(fields, record)))
+        except ValueError as e:
+            result.rejected.append((line, record, str(e)))
+
+    if kind == "members":
+        # Mentors must be Faculty rows that already exist: insert Faculty first
+        valid.sort(key=lambda item: item[2][2] != "Faculty")
+
+    with db.transaction() as cur:
+        for start in range(0, len(valid), chunk_size):
+            chunk = valid[start:start + chunk_size]
+            cur.execute("SAVEPOINT import_chunk;")
+            try:
+                execute_values(cur, many_sql, [row for _, _, row in chunk], page_size=len(chunk))
+                cur.execute("RELEASE SAVEPOINT import_chunk;")
+                result.inserted += len(chunk)
+                continue
+            except Exception:
+                cur.execute("ROLLBACK TO SAVEPOINT import_chunk;")
+
+            for line, record, row in chunk:
+                cur.execute("SAVEPOINT import_row;")
+                try:
+                    cur.execute(one_sql, row)
+                    cur.execute("RELEASE SAVEPOINT import_row;")
+                    result.inserted += 1
+                except Exception as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT import_row;")
+                    result.rejected.append((line, record, str(e).strip().splitlines()[0]))
+            cur.execute("RELEASE SAVEPOINT import_chunk;")
+
+    result.rejected.sort(key=lambda item: item[0])
+    if result.rejected and rejected_path:
+        write_rejected(rejected_path, fields, result.rejected)
+        result.rejected_path = rejected_path
+    return result
+
+
+def import_file(db, kind, path, chunk_size=500):
+    """Import a CSV/JSON file; rejected rows go to <name>.rejected.csv beside it."""
+    rejected_path = os.path.splitext(path)[0] + ".rejected.csv"
+    return import_rows(db, kind, read_records(path), chunk_size=chunk_size, rejected_path=rejected_path)
@@ -0,0 +1,68 @@
+import queue
+
+
+class LiveChanges:
+    """Deliver database change notifications to handlers on the Tk thread.
+
+    Database.add_listener() callbacks run on the listener thread, so they only
+    queue the event; the Tk thread drains the queue with `widget.after()` and
+    calls handler(op, key) for every handler registered for the event's table.
+    A burst of more than `max_batch` events for one table between two polls is
+    delivered as a single RELOAD.
+    """
+
+    def __init__(self, widget, db, poll_ms=200, max_batch=50):
+        self.widget = widget
+        self.db = db
+        self.poll_ms = poll_ms
+        self.max_batch = max_batch
+        self._events = queue.Queue()
+        self._handlers = {}
+        self._after_id = None
+        self._closed = False
+        self._listener = db.add_listener(self._events.put)
+        self._schedule()
+
+    def on(self, table, handler):
+        self._handlers.setdefault(table, []).append(handler)
+
+    def _schedule(self):
+        try:
+            self._after_id = self.widget.after(self.poll_ms, self.poll)
+        except Exception:
+            # The window is gone
+            self._after_id = None
+
+    def poll(self):
+        if self._closed:
+            return
+        by_table = {}
+        while True:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                break
+            table = event.get("table")
+            # A table-less RELOAD (listener reconnected) reloads every table
+            for name in ([table] if table else list(self._handlers)):
+                by_table.setdefault(name, []).append((event.get("op"), event.get("key")))
+
+        for table, changes in by_table.items():
+            if len(changes) > self.max_batch:
+                changes = [("RELOAD", None)]
+            for handler in self._handlers.get(table, []):
+                for op, key in changes:
+                    try:
+                        handler(op, key)
+                    except Exception as e:
+                        print("Live update failed:", e)
+        self._schedule()
+
+    def close(self):
+        self._closed = True
+        self.db.remove_listener(self._listener)
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
@@ -1,7 +1,17 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
 
+from modules.executor import QueryExecutor, busy_indicator
+from modules.importer import import_file
+from modules.live import LiveChanges
+from modules.mentorship import MentorshipGraph, mentorship_dialog
+from modules.reports import members_by_grant
+from modules.widgets import VirtualTable
+
+MEMBER_COLUMNS = ("mid", "name", "member_type", "join_date", "mentor_mid")
+
+
 def members_menu(db):
     # Ensure root exists
     root = tk._default_root
@@ -41,6 +51,15 @@ def members_menu(db):
     tree.configure(yscrollcommand=scrollbar.set)
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
+    # --- Status bar: long reads run in the background with a busy indicator ---
+    status_frame = tk.Frame(window, bg="#e0f7fa")
+    status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+    status_label = tk.Label(status_frame, text="", bg="#e0f7fa")
+    status_label.pack(side=tk.LEFT, padx=6)
+    cancel_btn = tk.Button(status_frame, text="Cancel", state="disabled", command=lambda: executor.cancel_all())
+    cancel_btn.pack(side=tk.RIGHT, padx=6)
+    executor = QueryExecutor(window, db, on_busy=busy_indicator(window, status_label, cancel_btn))
+
     # --- Form Frame ---
     form_frame = tk.Frame(window, bg="#e0f7fa")
     form_frame.pack(pady=10)
@@ -72,30 +91,23 @@ def members_menu(db):
             cb.grid(row=i, column=2, padx=6)
 
     # --- Treeview refresh ---
-    def refresh_table():
-        # Fetch rows first. If fetch fails, leave table intact and show an error.
-        try:
-            rows = db.execute_query(
-                "SELECT mid, name, member_type, join_date, mentor_mid FROM lab_member ORDER BY mid;",
-                fetch=True
-            )
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to fetch members: {e}")
-            return
+    # Only the visible window of rows lives in the Treeview; pages are read
+    # by keyset pagination on MID as the user scrolls.
+    table = VirtualTable(
+        tree, scrollbar, db, "lab_member",
+        MEMBER_COLUMNS, key="mid", headings=columns,
+        executor=executor,
+        on_error=lambda e: messagebox.showerror("Error", f"Failed to fetch members: {e}"),
+    )
 
-        # Clear and repopulate only after successful fetch
-        for row in tree.get_children():
-            tree.delete(row)
+    # Apply changes made from other stations as they are committed
+    live = LiveChanges(window, db)
+    live.on("lab_member", table.apply_change)
 
-        for idx, r in enumerate(rows):
-            vals = tuple(r.values()) if isinstance(r, dict) else tuple(r)
-            tag = 'odd' if idx % 2 == 0 else 'even'
-            tree.insert("", tk.END, values=vals, tags=(tag,))
-
-        # Auto-adjust column widths
-        for i, col in enumerate(columns):
-            max_len = max([len(str(tree.item(child, "values")[i])) for child in tree.get_children()] + [len(col)])
-            tree.column(col, width=max(80, max_len * 10))
+    def refresh_table():
+        # Read on a worker; if the fetch fails, the table is left intact and
+        # on_error shows it.
+        table.refresh()
 
     # --- Input helper ---
     def get_input(label, required=False):
@@ -176,15 +188,8 @@ def members_menu(db):
             if not gid:
                 messagebox.showinfo("Input needed", "Enter Grant ID")
                 return
-            try:
-                q = (
-                    "SELECT DISTINCT lm.mid, lm.name "
-                    "FROM lab_member lm "
-                    "JOIN works w ON w.mid = lm.mid "
-                    "JOIN funds f ON f.pid = w.pid "
-                    "WHERE f.gid = %s ORDER BY lm.mid;"
-                )
-                rows = db.execute_query(q, (gid,), fetch=True)
+            def show(result):
+                rows, _ = result
                 if not rows:
                     messagebox.showinfo("No results", f"No members found for grant {gid}.")
                     return
@@ -202,15 +207,14 @@ def members_menu(db):
                     tv.column(c, width=180, anchor='w')
                 tv.pack(fill=tk.BOTH, expand=True)
                 for r in rows:
-                    if isinstance(r, dict):
-                        vals = (r.get('mid'), r.get('name'))
-                    else:
-                        vals = (r[0], r[1])
-                    tv.insert('', tk.END, values=vals)
+                    tv.insert('', tk.END, values=r)
                 tk.Button(dlg, text='Close', command=dlg.destroy).pack(pady=6)
 
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
+            executor.submit(
+                lambda: members_by_grant(db, gid),
+                show,
+                lambda e: messagebox.showerror("Error", str(e)),
+            )
 
         frm = tk.Frame(window, bg="#e0f7fa")
         frm.pack(pady=(6, 10))
@@ -219,6 +223,24 @@ def members_menu(db):
         gid_entry.pack(side=tk.LEFT, padx=6)
         tk.Button(frm, text="Show Members for Grant", bg="#7b1fa2", fg="white", command=run).pack(side=tk.LEFT, padx=6)
 
+    # --- Bulk import from CSV/JSON ---
+    def import_members():
+        path = filedialog.askopenfilename(
+            parent=window, title="Import Members",
+            filetypes=[("CSV or JSON", "*.csv *.json"), ("All files", "*.*")])
+        if not path:
+            return
+
+        def done(result):
+            messagebox.showinfo("Import", result.summary())
+            refresh_table()
+
+        executor.submit(
+            lambda: import_file(db, "members", path),
+            done,
+            lambda e: messagebox.showerror("Error", f"Import failed: {e}"),
+        )
+
     # NOTE: Mentorship-by-project view moved to Projects menu. See modules/projects.py
 
     # --- Buttons ---
@@ -229,6 +251,11 @@ def members_menu(db):
     tk.Button(btn_frame, text="Update Name", bg="#2196f3", fg="white", command=update_member).grid(row=0, column=1, padx=5)
     tk.Button(btn_frame, text="Delete Member", bg="#f44336", fg="white", command=delete_member).grid(row=0, column=2, padx=5)
     tk.Button(btn_frame, text="Refresh Table", bg="#ff9800", fg="white", command=refresh_table).grid(row=0, column=3, padx=5)
+    tk.Button(btn_frame, text="Import CSV/JSON", bg="#607d8b", fg="white", command=import_members).grid(row=0, column=4, padx=5)
+    # One adjacency cache per window, shared by every tree the dialog opens
+    mentorship_graph = MentorshipGraph(db)
+    tk.Button(btn_frame, text="Mentorship Tree", bg="#7b1fa2", fg="white",
+              command=lambda: mentorship_dialog(window, db, executor, mentorship_graph)).grid(row=0, column=5, padx=5)
     # Mentorship report moved to Projects menu
 
     # --- Initial load ---
@@ -241,3 +268,5 @@ def members_menu(db):
     except Exception:
         pass
     window.wait_window()
+    live.close()
+    executor.shutdown()
@@ -0,0 +1,224 @@
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox
+from collections import deque
+
+
+# LAB_MEMBER.MENTOR_MID links each member to their mentor, forming a forest
+# whose roots are the members without a mentor. The recursive queries walk it
+# through idx_lab_member_mentor_mid and carry the visited path so a cycle
+# (e.g. two members mentoring each other) ends the walk instead of looping.
+
+# Every member mentored, directly or not, by a member: (mid, name, mentor_mid, depth)
+SUBTREE_SQL = """
+WITH RECURSIVE tree AS (
+    SELECT mid, name, mentor_mid, 0 AS depth, ARRAY[mid::text] AS path
+    FROM lab_member WHERE mid = %s
+    UNION ALL
+    SELECT m.mid, m.name, m.mentor_mid, t.depth + 1, t.path || m.mid::text
+    FROM tree t JOIN lab_member m ON m.mentor_mid = t.mid
+    WHERE NOT m.mid = ANY(t.path)
+)
+SELECT mid, name, mentor_mid, depth FROM tree ORDER BY path;
+"""
+
+# A member and their mentors up to the root: (mid, name, depth), member first
+LINEAGE_SQL = """
+WITH RECURSIVE up AS (
+    SELECT mid, name, mentor_mid, 0 AS depth, ARRAY[mid::text] AS path
+    FROM lab_member WHERE mid = %s
+    UNION ALL
+    SELECT m.mid, m.name, m.mentor_mid, u.depth + 1, u.path || m.mid::text
+    FROM up u JOIN lab_member m ON m.mid = u.mentor_mid
+    WHERE NOT m.mid = ANY(u.path)
+)
+SELECT mid, name, depth FROM up ORDER BY depth;
+"""
+
+# Lab-wide report in one query: per root, (mid, name, direct mentees, all
+# mentees, deepest level, mean mentee depth)
+DEPTH_STATS_SQL = """
+WITH RECURSIVE tree AS (
+    SELECT mid AS root, mid, 0 AS depth, ARRAY[mid::text] AS path
+    FROM lab_member WHERE mentor_mid IS NULL
+    UNION ALL
+    SELECT t.root, m.mid, t.depth + 1, t.path || m.mid::text
+    FROM tree t JOIN lab_member m ON m.mentor_mid = t.mid
+    WHERE NOT m.mid = ANY(t.path)
+)
+SELECT t.root AS mid, lm.name,
+       COUNT(*) FILTER (WHERE t.depth = 1) AS direct,
+       COUNT(*) - 1 AS mentees,
+       MAX(t.depth) AS max_depth,
+       ROUND(AVG(t.depth) FILTER (WHERE t.depth > 0), 2) AS avg_depth
+FROM tree t JOIN lab_member lm ON lm.mid = t.root
+GROUP BY t.root, lm.name
+ORDER BY mentees DESC, t.root;
+"""
+
+EDGES_SQL = "SELECT mid, name, mentor_mid FROM lab_member;"
+
+
+def subtree(db, mid):
+    return db.execute_query(SUBTREE_SQL, (mid,), fetch=True, row_format="tuple")
+
+
+def lineage(db, mid):
+    return db.execute_query(LINEAGE_SQL, (mid,), fetch=True, row_format="tuple")
+
+
+def depth_stats(db):
+    return db.execute_query(DEPTH_STATS_SQL, fetch=True, row_format="tuple")
+
+
+class MentorshipGraph:
+    """In-process adjacency cache of the mentorship forest.
+
+    The whole LAB_MEMBER (mid, mentor) list is read in one query and kept
+    until `ttl` seconds pass or the database's query cache is invalidated by
+    a write, so repeated subtree and lineage lookups cost no round trips.
+    Results match SUBTREE_SQL, LINEAGE_SQL and DEPTH_STATS_SQL.
+    """
+
+    def __init__(self, db, ttl=60.0):
+        self.db = db
+        self.ttl = ttl
+        self._loaded_at = None
+        self._generation = None
+        self.names = {}
+        self.mentor = {}
+        self.mentees = {}
+
+    def _generation_now(self):
+        cache = getattr(self.db, "cache", None)
+        return cache.generation if cache is not None else None
+
+    def refresh(self, force=False):
+        generation = self._generation_now()
+        if (not force and self._loaded_at is not None and generation == self._generation
+                and time.monotonic() - self._loaded_at < self.ttl):
+            return
+        rows = self.db.execute_query(EDGES_SQL, fetch=True, row_format="tuple", cache=False)
+        names, mentor, mentees = {}, {}, {}
+        for mid, name, mentor_mid in rows:
+            names[mid] = name
+            mentor[mid] = mentor_mid
+            if mentor_mid is not None:
+                mentees.setdefault(mentor_mid, []).append(mid)
+        for children in mentees.values():
+            children.sort()
+        self.names, self.mentor, self.mentees = names, mentor, mentees
+        self._generation = generation
+        self._loaded_at = time.monotonic()
+
+    def subtree(self, mid):
+        """(mid, name, mentor_mid, depth) of `mid` and everyone below, depth-first."""
+        self.refresh()
+        if mid not in self.names:
+            return []
+        result = []
+        seen = set()
+        stack = [(mid, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            result.append((node, self.names[node], self.mentor[node], depth))
+            stack.extend((child, depth + 1) for child in reversed(self.mentees.get(node, ())))
+        return result
+
+    def lineage(self, mid):
+        """(mid, name, depth) from `mid` up to its root mentor."""
+        self.refresh()
+        result = []
+        seen = set()
+        node, depth = mid, 0
+        while node in self.names and node not in seen:
+            seen.add(node)
+            result.append((node, self.names[node], depth))
+            node, depth = self.mentor[node], depth + 1
+        return result
+
+    def depth_stats(self):
+        """Per root: (mid, name, direct, mentees, max_depth, avg_depth)."""
+        self.refresh()
+        stats = []
+        for root in sorted(m for m, mentor in self.mentor.items() if mentor is None):
+            depths = []
+            queue = deque([(root, 0)])
+            seen = {root}
+            while queue:
+                node, depth = queue.popleft()
+                for child in self.mentees.get(node, ()):
+                    if child not in seen:
+                        seen.add(child)
+                        depths.append(depth + 1)
+                        queue.append((child, depth + 1))
+            avg = round(sum(depths) / len(depths), 2) if depths else None
+            stats.append((root, self.names[root], depths.count(1), len(depths), max(depths, default=0), avg))
+        stats.sort(key=lambda s: (-s[3], s[0]))
+        return stats
+
+
+def mentorship_dialog(window, db, executor, graph=None):
+    """Browse a member's mentee tree and lineage, or the lab-wide depth report."""
+    graph = graph or MentorshipGraph(db)
+    dlg = tk.Toplevel(window)
+    dlg.title("Mentorship Tree")
+    dlg.geometry("640x460")
+    top = tk.Frame(dlg)
+    top.pack(fill=tk.X, padx=8, pady=8)
+    tk.Label(top, text="MID:").pack(side=tk.LEFT)
+    mid_entry = tk.Entry(top, width=12)
+    mid_entry.pack(side=tk.LEFT, padx=4)
+    lineage_label = tk.Label(dlg, text="", anchor="w", justify=tk.LEFT, wraplength=600)
+    lineage_label.pack(fill=tk.X, padx=8)
+
+    tree = ttk.Treeview(dlg, columns=("name", "detail"), show="tree headings")
+    tree.heading("#0", text="MID")
+    tree.heading("name", text="Name")
+    tree.heading("detail", text="Depth / Mentees")
+    tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=(4, 8))
+
+    def show_tree(result):
+        rows, chain = result
+        tree.delete(*tree.get_children())
+        if not rows:
+            lineage_label.config(text="Member not found.")
+            return
+        lineage_label.config(text="Lineage: " + " ← ".join(f"{m} ({n})" for m, n, _ in chain))
+        # Rows are depth-first, so a row's mentor is already in the tree
+        for mid, name, mentor_mid, depth in rows:
+            parent = mentor_mid if depth and tree.exists(mentor_mid) else ""
+            tree.insert(parent, tk.END, iid=mid, text=mid, values=(name, depth), open=depth < 2)
+
+    def show_tree_for_member():
+        mid = mid_entry.get().strip().upper()
+        if not mid:
+            messagebox.showinfo("Input needed", "Enter MID", parent=dlg)
+            return
+        executor.submit(
+            lambda: (graph.subtree(mid), graph.lineage(mid)),
+            show_tree,
+            lambda e: messagebox.showerror("Error", str(e), parent=dlg),
+        )
+
+    def show_report(stats):
+        tree.delete(*tree.get_children())
+        lineage_label.config(text="Mentorship roots: direct / all mentees, deepest level, mean depth")
+        for mid, name, direct, mentees, max_depth, avg_depth in stats:
+            detail = f"{direct} / {mentees}, depth {max_depth}, mean {avg_depth if avg_depth is not None else '-'}"
+            tree.insert("", tk.END, iid=mid, text=mid, values=(name, detail))
+
+    def show_lab_report():
+        executor.submit(
+            lambda: depth_stats(db),
+            show_report,
+            lambda e: messagebox.showerror("Error", str(e), parent=dlg),
+        )
+
+    tk.Button(top, text="Show Tree", bg="#7b1fa2", fg="white", command=show_tree_for_member).pack(side=tk.LEFT, padx=4)
+    tk.Button(top, text="Lab Report", bg="#607d8b", fg="white", command=show_lab_report).pack(side=tk.LEFT, padx=4)
+    tk.Button(top, text="Close", command=dlg.destroy).pack(side=tk.RIGHT)
+    return dlg
@@ -1,7 +1,30 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
 
+from modules.activity import activity_dialog
+from modules.effort import effort_dialog
+from modules.executor import QueryExecutor, busy_indicator
+from modules.importer import import_file
+from modules.live import LiveChanges
+from modules.reports import grant_active_projects
+from modules.widgets import VirtualTable
+
+PROJECT_COLUMNS = ("pid", "title", "start_date", "end_date", "exp_duration", "facultyid")
+
+# Mentor/mentee pairs who both work on a project
+PROJECT_MENTORSHIPS_SQL = (
+    "SELECT DISTINCT lm.mid AS mentee_mid, lm.name AS mentee_name, "
+    "mentor.mid AS mentor_mid, mentor.name AS mentor_name "
+    "FROM works w "
+    "JOIN lab_member lm ON lm.mid = w.mid "
+    "JOIN lab_member mentor ON mentor.mid = lm.mentor_mid "
+    "JOIN works mw ON mw.mid = mentor.mid AND mw.pid = w.pid "
+    "WHERE w.pid = %s "
+    "ORDER BY mentor_mid, mentee_mid;"
+)
+PROJECT_STATUS_SQL = "SELECT pid, title, start_date, end_date FROM project WHERE pid = %s;"
+
 
 def projects_menu(db):
     # Ensure there is a root Tk instance. If not, create one and keep it hidden.
@@ -46,41 +69,32 @@ def projects_menu(db):
     tree.configure(yscrollcommand=scrollbar.set)
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-    def refresh_table():
-        # Fetch rows first; if fetch fails, do not clear the existing table.
-        try:
-            rows = db.execute_query(
-                "SELECT pid, title, start_date, end_date, exp_duration, facultyid FROM project ORDER BY pid;",
-                fetch=True,
-            )
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to fetch projects: {e}")
-            return
-
-        # Clear and repopulate only after successful fetch
-        for row in tree.get_children():
-            tree.delete(row)
+    # Status bar: long reads run in the background with a busy indicator
+    status_frame = tk.Frame(window, bg="#fff3e0")
+    status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+    status_label = tk.Label(status_frame, text="", bg="#fff3e0")
+    status_label.pack(side=tk.LEFT, padx=6)
+    cancel_btn = tk.Button(status_frame, text="Cancel", state="disabled", command=lambda: executor.cancel_all())
+    cancel_btn.pack(side=tk.RIGHT, padx=6)
+    executor = QueryExecutor(window, db, on_busy=busy_indicator(window, status_label, cancel_btn))
+
+    # Only the visible window of rows lives in the Treeview; pages are read
+    # by keyset pagination on PID as the user scrolls.
+    table = VirtualTable(
+        tree, scrollbar, db, "project",
+        PROJECT_COLUMNS, key="pid", headings=columns,
+        executor=executor,
+        on_error=lambda e: messagebox.showerror("Error", f"Failed to fetch projects: {e}"),
+    )
+
+    # Apply changes made from other stations as they are committed
+    live = LiveChanges(window, db)
+    live.on("project", table.apply_change)
 
-        for idx, r in enumerate(rows):
-            if isinstance(r, dict):
-                vals = tuple(r.values())
-            else:
-                vals = tuple(r)
-            tag = 'odd' if idx % 2 == 0 else 'even'
-            tree.insert("", tk.END, values=vals, tags=(tag,))
-
-        # Auto-adjust columns based on header and actual cell values
-        for i, col in enumerate(columns):
-            max_val_len = 0
-            for child in tree.get_children():
-                try:
-                    cell = tree.item(child, "values")[i]
-                except Exception:
-                    cell = ""
-                max_val_len = max(max_val_len, len(str(cell)))
-            header_len = len(col)
-            width = max(80, max(header_len * 10, max_val_len * 10))
-            tree.column(col, width=width)
+    def refresh_table():
+        # Read on a worker; if the fetch fails, the table is left intact and
+        # on_error shows it.
+        table.refresh()
 
     refresh_table()
 
@@ -261,18 +275,7 @@ def projects_menu(db):
             if not pid:
                 messagebox.showinfo("Input needed", "Enter PID")
                 return
-            try:
-                q = (
-                    "SELECT DISTINCT lm.mid AS mentee_mid, lm.name AS mentee_name, "
-                    "mentor.mid AS mentor_mid, mentor.name AS mentor_name "
-                    "FROM works w "
-                    "JOIN lab_member lm ON lm.mid = w.mid "
-                    "JOIN lab_member mentor ON mentor.mid = lm.mentor_mid "
-                    "JOIN works mw ON mw.mid = mentor.mid AND mw.pid = w.pid "
-                    "WHERE w.pid = %s "
-                    "ORDER BY mentor_mid, mentee_mid;"
-                )
-                rows = db.execute_query(q, (pid,), fetch=True)
+            def show(rows):
                 if not rows:
                     messagebox.showinfo("Mentorship", f"No mentorship relations found for project {pid}.")
                     return
@@ -287,20 +290,44 @@ def projects_menu(db):
                     tv.column(c, width=180, anchor='w')
                 tv.pack(fill=tk.BOTH, expand=True)
                 for r in rows:
-                    if isinstance(r, dict):
-                        vals = (r.get('mentee_mid'), r.get('mentee_name'), r.get('mentor_mid'), r.get('mentor_name'))
-                    else:
-                        vals = (r[0], r[1], r[2], r[3])
-                    tv.insert('', tk.END, values=vals)
+                    tv.insert('', tk.END, values=r)
                 tk.Button(results, text='Close', command=results.destroy).pack(pady=6)
 
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
+            executor.submit(
+                lambda: db.execute_query(PROJECT_MENTORSHIPS_SQL, (pid,), fetch=True, row_format="tuple",
+                                         prepare="project_mentorships"),
+                show,
+                lambda e: messagebox.showerror("Error", str(e)),
+            )
 
         tk.Button(dlg, text="Show", bg="#7b1fa2", fg="white", command=on_show).pack(pady=(0,10))
 
     tk.Button(btn_frame, text="Mentorship (by Project)", bg="#7b1fa2", fg="white", command=open_mentorship_dialog).grid(row=0, column=4, padx=6)
 
+    # --- Bulk import from CSV/JSON ---
+    def import_projects():
+        path = filedialog.askopenfilename(
+            parent=window, title="Import Projects",
+            filetypes=[("CSV or JSON", "*.csv *.json"), ("All files", "*.*")])
+        if not path:
+            return
+
+        def done(result):
+            messagebox.showinfo("Import", result.summary())
+            refresh_table()
+
+        executor.submit(
+            lambda: import_file(db, "projects", path),
+            done,
+            lambda e: messagebox.showerror("Error", f"Import failed: {e}"),
+        )
+
+    tk.Button(btn_frame, text="Import CSV/JSON", bg="#607d8b", fg="white", command=import_projects).grid(row=0, column=5, padx=6)
+    tk.Button(btn_frame, text="Activity Chart", bg="#fb8c00", fg="white",
+              command=lambda: activity_dialog(window, db, executor)).grid(row=0, column=6, padx=6)
+    tk.Button(btn_frame, text="Effort Report", bg="#00897b", fg="white",
+              command=lambda: effort_dialog(window, db, executor)).grid(row=0, column=7, padx=6)
+
     # Show status of a project (by PID)
     def show_project_status():
         def run():
@@ -308,9 +335,8 @@ def projects_menu(db):
             if not pid:
                 messagebox.showinfo("Input needed", "Enter PID")
                 return
-            try:
-                q = "SELECT pid, title, start_date, end_date FROM project WHERE pid = %s;"
-                rows = db.execute_query(q, (pid,), fetch=True)
+
+            def show(rows):
                 if not rows:
                     messagebox.showinfo("Not found", "Project not found")
                     return
@@ -323,8 +349,12 @@ def projects_menu(db):
                     title, start, end = r[1], r[2], r[3]
                 status = 'Active' if (end is None) or (str(end) == '') else 'Closed'
                 messagebox.showinfo("Project Status", f"PID: {pid}\nTitle: {title}\nStatus: {status}\nStart: {start}\nEnd: {end}")
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
+
+            executor.submit(
+                lambda: db.execute_query(PROJECT_STATUS_SQL, (pid,), fetch=True, prepare="project_by_pid"),
+                show,
+                lambda e: messagebox.showerror("Error", str(e)),
+            )
 
         row = tk.Frame(window, bg="#fff3e0")
         row.pack(pady=(6, 10))
@@ -342,18 +372,15 @@ def projects_menu(db):
             if not gid or not start or not end:
                 messagebox.showinfo("Input needed", "Enter grant id, start date and end date")
                 return
-            try:
-                # Join FUNDS to find projects funded by the grant and check active period
-                q = (
-                    "SELECT COUNT(DISTINCT p.pid) AS cnt FROM project p "
-                    "JOIN funds f ON f.pid = p.pid "
-                    "WHERE f.gid = %s AND (p.start_date <= %s AND (p.end_date IS NULL OR p.end_date >= %s));"
-                )
-                rows = db.execute_query(q, (gid, end, start), fetch=True)
-                cnt = rows[0].get('cnt') if isinstance(rows[0], dict) else rows[0][0]
+            def show(result):
+                cnt = result[0][0][3]
                 messagebox.showinfo("Count", f"Projects funded by grant {gid} active in period: {cnt}")
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
+
+            executor.submit(
+                lambda: grant_active_projects(db, gid, start, end),
+                show,
+                lambda e: messagebox.showerror("Error", str(e)),
+            )
 
         frm2 = tk.Frame(window, bg="#fff3e0")
         frm2.pack(pady=(6, 10))
@@ -381,3 +408,5 @@ def projects_menu(db):
         pass
 
     window.wait_window()
+    live.close()
+    executor.shutdown()
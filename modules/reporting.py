@@ -1,6 +1,15 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+from modules.executor import QueryExecutor, busy_indicator
+from modules.reports import (
+    GRANTS_SQL, PUBLICATIONS_SQL, VIEWS_AS_OF_SQL, burn_rate, freshness, grant_top_publishers,
+    student_publications, top_publishers as top_publishers_report,
+)
+
+# How often the open reporting window refreshes views with pending changes
+REFRESH_INTERVAL_MS = 60000
+
 
 def reporting_menu(db):
     # Base root
@@ -21,46 +30,71 @@ def reporting_menu(db):
     ctrl = tk.Frame(frame, bg="#f3e5f5")
     ctrl.pack(fill=tk.X)
 
+    # Status bar: reports run in the background with a busy indicator
+    status_frame = tk.Frame(window, bg="#f3e5f5")
+    status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+    status_label = tk.Label(status_frame, text="", bg="#f3e5f5")
+    status_label.pack(side=tk.LEFT, padx=6)
+    cancel_btn = tk.Button(status_frame, text="Cancel", state="disabled", command=lambda: executor.cancel_all())
+    cancel_btn.pack(side=tk.RIGHT, padx=6)
+    executor = QueryExecutor(window, db, on_busy=busy_indicator(window, status_label, cancel_btn))
+
+    def query_failed(e):
+        messagebox.showerror("Error", f"Query failed: {e}")
+
+    # ============================================================
+    # MATERIALIZED VIEW REFRESH
+    # ============================================================
+    views_label = tk.Label(status_frame, text="", bg="#f3e5f5")
+    views_label.pack(side=tk.LEFT, padx=12)
+    refresh_timer = [None]
+
+    def refresh_views(force=False):
+        # Refresh views with pending changes (all with force) off the Tk thread
+        def work():
+            db.execute_query("SELECT refresh_report_views(%s);", (force,), fetch=True, row_format="tuple")
+            return db.execute_query(VIEWS_AS_OF_SQL, fetch=True, row_format="tuple")[0][0]
+
+        def done(as_of):
+            if as_of is not None:
+                views_label.config(text=f"Reports as of {as_of.astimezone():%H:%M:%S}")
+
+        def failed(e):
+            # Views not installed: reports use live queries, stop the timer
+            if refresh_timer[0] is not None:
+                window.after_cancel(refresh_timer[0])
+                refresh_timer[0] = None
+            views_label.config(text="Live reports (reporting views not installed)")
+
+        executor.submit(work, done, failed)
+
+    def scheduled_refresh():
+        refresh_timer[0] = window.after(REFRESH_INTERVAL_MS, scheduled_refresh)
+        refresh_views()
+
     # ============================================================
     # 1) TOP PUBLISHERS
     # ============================================================
     def top_publishers():
-        try:
-            rows = db.execute_query(
-                """
-                SELECT lm.mid, lm.name, COUNT(p.publicationid) AS pubs
-                FROM lab_member lm
-                LEFT JOIN published p ON p.mid = lm.mid
-                GROUP BY lm.mid, lm.name
-                ORDER BY pubs DESC;
-                """,
-                fetch=True,
-            )
-
+        def show(result):
+            rows, status = result
             if not rows:
                 messagebox.showinfo("Top Publishers", "No publication data found.")
                 return
 
-            # Handle dict row or tuple
-            first = rows[0]
-            max_pubs = first["pubs"] if isinstance(first, dict) else first[2]
-
-            top = []
-            for r in rows:
-                pubs = r["pubs"] if isinstance(r, dict) else r[2]
-                if pubs == max_pubs:
-                    mid = r["mid"] if isinstance(r, dict) else r[0]
-                    name = r["name"] if isinstance(r, dict) else r[1]
-                    top.append((mid, name, pubs))
-
+            # Rows are (mid, name, pubs) of the members tied for the most
+            max_pubs = rows[0][2]
             text = f"Top publisher(s) with {max_pubs} publication(s):\n"
-            for mid, name, pubs in top:
+            for mid, name, pubs in rows:
                 text += f"- {mid} — {name} ({pubs})\n"
 
-            messagebox.showinfo("Top Publishers", text)
+            messagebox.showinfo("Top Publishers", text + "\n" + freshness(status))
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Query failed: {e}")
+        executor.submit(
+            lambda: top_publishers_report(db),
+            show,
+            query_failed,
+        )
 
     tk.Button(
         ctrl,
@@ -74,37 +108,24 @@ def reporting_menu(db):
     # 2) AVERAGE STUDENT PUBLISHING BY MAJOR
     # ============================================================
     def avg_student_pubs():
-        try:
-            rows = db.execute_query(
-                """
-                SELECT s.major, COUNT(pub.publicationid) AS pubs,
-                       COUNT(DISTINCT m.mid) AS students
-                FROM lab_member m
-                JOIN student s ON s.mid = m.mid
-                LEFT JOIN published pub ON pub.mid = m.mid
-                WHERE TRIM(m.member_type) ILIKE 'student'
-                GROUP BY s.major;
-                """,
-                fetch=True,
-            )
-
+        def show(result):
+            rows, status = result
             if not rows:
                 messagebox.showinfo("Average Student Publications", "No data available.")
                 return
 
             text = "Average student publications per major:\n"
 
-            for r in rows:
-                major = r["major"] if isinstance(r, dict) else r[0]
-                pubs = r["pubs"] if isinstance(r, dict) else r[1]
-                students = r["students"] if isinstance(r, dict) else r[2]
-                avg = pubs / students if students > 0 else 0
+            for major, pubs, students, avg in rows:
                 text += f"{major}: {avg:.2f}\n"
 
-            messagebox.showinfo("Average Student Publications", text)
+            messagebox.showinfo("Average Student Publications", text + "\n" + freshness(status))
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Query failed: {e}")
+        executor.submit(
+            lambda: student_publications(db),
+            show,
+            query_failed,
+        )
 
     tk.Button(
         ctrl,
@@ -131,36 +152,23 @@ def reporting_menu(db):
                 messagebox.showinfo("Input Needed", "Enter a grant ID.")
                 return
 
-            try:
-                rows = db.execute_query(
-                    """
-                    SELECT w.mid AS member_mid, COUNT(pub.publicationid) AS pubs
-                    FROM works w
-                    JOIN funds f ON f.pid = w.pid
-                    LEFT JOIN published pub ON pub.mid = w.mid
-                    WHERE f.gid = %s
-                    GROUP BY w.mid
-                    ORDER BY pubs DESC
-                    LIMIT 3;
-                    """,
-                    (gid,),
-                    fetch=True,
-                )
-
+            def show(result):
+                rows, status = result
                 if not rows:
                     messagebox.showinfo("Top 3", "No matching data found.")
                     return
 
                 text = f"Top 3 prolific members for grant {gid}:\n"
-                for r in rows:
-                    mid = r["member_mid"] if isinstance(r, dict) else r[0]
-                    pubs = r["pubs"] if isinstance(r, dict) else r[1]
+                for mid, pubs in rows:
                     text += f"{mid}: {pubs} publications\n"
 
-                messagebox.showinfo("Top 3", text)
+                messagebox.showinfo("Top 3", text + "\n" + freshness(status))
 
-            except Exception as e:
-                messagebox.showerror("Error", f"Query failed: {e}")
+            executor.submit(
+                lambda: grant_top_publishers(db, gid),
+                show,
+                query_failed,
+            )
 
         tk.Button(
             row,
@@ -172,41 +180,42 @@ def reporting_menu(db):
 
     top3_for_grant()
 
+    def stream_to_dialog(title, cols, width, query, empty_message):
+        # Stream a table into a dialog on a worker thread. The dialog opens
+        # with the first batch, and each later batch is drawn as it arrives.
+        dialog = {}
+
+        def add_batch(rows):
+            if "tv" not in dialog:
+                dlg = tk.Toplevel(window)
+                dlg.title(title)
+                tv = ttk.Treeview(dlg, columns=cols, show="headings")
+                for c in cols:
+                    tv.heading(c, text=c)
+                    tv.column(c, width=width, anchor="w")
+                tv.pack(fill=tk.BOTH, expand=True)
+                tk.Button(dlg, text="Close", command=dlg.destroy).pack(pady=6)
+                dialog["tv"] = tv
+            for r in rows:
+                dialog["tv"].insert("", tk.END, values=r)
+
+        def done():
+            if "tv" not in dialog:
+                messagebox.showinfo(title, empty_message)
+
+        executor.stream(lambda: db.stream_query(query, row_format="tuple"), add_batch, done, query_failed)
+
     # ============================================================
     # 4) SHOW GRANTS TABLE
     # ============================================================
     def show_grants():
-        try:
-            rows = db.execute_query(
-                "SELECT gid, source, budget, start_date, duration FROM grants ORDER BY gid;",
-                fetch=True,
-            )
-
-            if not rows:
-                messagebox.showinfo("Grants", "No grants found.")
-                return
-
-            dlg = tk.Toplevel(window)
-            dlg.title("Grants")
-
-            cols = ("GID", "Source", "Budget", "Start Date", "Duration")
-            tv = ttk.Treeview(dlg, columns=cols, show="headings")
-            for c in cols:
-                tv.heading(c, text=c)
-                tv.column(c, width=160, anchor="w")
-            tv.pack(fill=tk.BOTH, expand=True)
-
-            for r in rows:
-                if isinstance(r, dict):
-                    vals = (r["gid"], r["source"], r["budget"], r["start_date"], r["duration"])
-                else:
-                    vals = r
-                tv.insert("", tk.END, values=vals)
-
-            tk.Button(dlg, text="Close", command=dlg.destroy).pack(pady=6)
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Query failed: {e}")
+        stream_to_dialog(
+            "Grants",
+            ("GID", "Source", "Budget", "Start Date", "Duration"),
+            160,
+            GRANTS_SQL,
+            "No grants found.",
+        )
 
     tk.Button(
         ctrl,
@@ -220,49 +229,64 @@ def reporting_menu(db):
     # 5) SHOW ALL PUBLICATIONS
     # ============================================================
     def show_publications():
-        try:
-            rows = db.execute_query(
-                """
-                SELECT publicationid, title, venue, publication_date, doi
-                FROM publication
-                ORDER BY publication_date DESC NULLS LAST;
-                """,
-                fetch=True,
-            )
+        stream_to_dialog(
+            "Publications",
+            ("PubID", "Title", "Venue", "Date", "DOI"),
+            220,
+            PUBLICATIONS_SQL,
+            "No publications found.",
+        )
+
+    tk.Button(
+        ctrl,
+        text="Show Publications",
+        command=show_publications,
+        bg="#1e88e5",
+        fg="white"
+    ).pack(side=tk.LEFT, padx=6, pady=6)
 
+    # ============================================================
+    # 6) GRANT BURN RATE
+    # ============================================================
+    def show_grant_burn():
+        cols = ("GID", "Budget", "Monthly Burn", "Spent", "Remaining", "Runway (months)", "Exhausted By")
+
+        def show(result):
+            rows, _ = result
             if not rows:
-                messagebox.showinfo("Publications", "No publications found.")
+                messagebox.showinfo("Grant Burn Rate", "No grants found.")
                 return
-
             dlg = tk.Toplevel(window)
-            dlg.title("Publications")
-
-            cols = ("PubID", "Title", "Venue", "Date", "DOI")
+            dlg.title("Grant Burn Rate")
             tv = ttk.Treeview(dlg, columns=cols, show="headings")
             for c in cols:
                 tv.heading(c, text=c)
-                tv.column(c, width=220, anchor="w")
+                tv.column(c, width=130, anchor="w")
             tv.pack(fill=tk.BOTH, expand=True)
-
             for r in rows:
-                vals = (r[0], r[1], r[2], r[3], r[4]) if not isinstance(r, dict) else (
-                    r["publicationid"], r["title"], r["venue"], r["publication_date"], r["doi"]
-                )
-                tv.insert("", tk.END, values=vals)
-
+                tv.insert("", tk.END, values=["-" if v is None else v for v in r])
             tk.Button(dlg, text="Close", command=dlg.destroy).pack(pady=6)
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Query failed: {e}")
+        executor.submit(lambda: burn_rate(db), show, query_failed)
 
     tk.Button(
         ctrl,
-        text="Show Publications",
-        command=show_publications,
-        bg="#1e88e5",
+        text="Grant Burn Rate",
+        command=show_grant_burn,
+        bg="#00897b",
         fg="white"
     ).pack(side=tk.LEFT, padx=6, pady=6)
 
+    tk.Button(
+        ctrl,
+        text="Refresh Reports",
+        command=lambda: refresh_views(force=True),
+        bg="#546e7a",
+        fg="white"
+    ).pack(side=tk.LEFT, padx=6, pady=6)
+
+    scheduled_refresh()
+
     # Grabbing window
     try:
         window.transient(root)
@@ -271,3 +295,9 @@ def reporting_menu(db):
         pass
 
     window.wait_window()
+    if refresh_timer[0] is not None:
+        try:
+            window.after_cancel(refresh_timer[0])
+        except Exception:
+            pass
+    executor.shutdown()
@@ -0,0 +1,284 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from modules.analytics import grant_burn
+
+# Headless reports: the SQL and aggregation behind the reporting window and
+# the grant/period lookups of the member and project windows, without Tk.
+# The menus show their results in dialogs; report.py runs them from the
+# command line and writes them to files.
+
+# The aggregate reports read the materialized views created by views.py. The
+# live queries are used when the views have not been installed.
+TOP_PUBLISHERS_VIEW_SQL = """
+SELECT mid, name, pubs
+FROM report_member_publications
+WHERE pubs = (SELECT MAX(pubs) FROM report_member_publications)
+ORDER BY mid;
+"""
+TOP_PUBLISHERS_LIVE_SQL = """
+SELECT lm.mid, lm.name, COUNT(p.publicationid) AS pubs
+FROM lab_member lm
+LEFT JOIN published p ON p.mid = lm.mid
+GROUP BY lm.mid, lm.name
+ORDER BY pubs DESC;
+"""
+
+AVG_STUDENT_PUBS_VIEW_SQL = "SELECT major, pubs, students FROM report_major_publications;"
+AVG_STUDENT_PUBS_LIVE_SQL = """
+SELECT s.major, COUNT(pub.publicationid) AS pubs,
+       COUNT(DISTINCT m.mid) AS students
+FROM lab_member m
+JOIN student s ON s.mid = m.mid
+LEFT JOIN published pub ON pub.mid = m.mid
+WHERE TRIM(m.member_type) ILIKE 'student'
+GROUP BY s.major;
+"""
+
+TOP3_FOR_GRANT_VIEW_SQL = """
+SELECT mid AS member_mid, pubs
+FROM report_grant_member_publications
+WHERE gid = %s
+ORDER BY pubs DESC, mid
+LIMIT 3;
+"""
+TOP3_FOR_GRANT_LIVE_SQL = """
+SELECT w.mid AS member_mid, COUNT(pub.publicationid) AS pubs
+FROM works w
+JOIN funds f ON f.pid = w.pid
+LEFT JOIN published pub ON pub.mid = w.mid
+WHERE f.gid = %s
+GROUP BY w.mid
+ORDER BY pubs DESC
+LIMIT 3;
+"""
+
+VIEW_STATUS_SQL = """
+SELECT s.refreshed_at, COUNT(c.view_name) AS pending
+FROM report_view_state s
+LEFT JOIN report_view_changes c ON c.view_name = s.view_name
+WHERE s.view_name = %s
+GROUP BY s.refreshed_at;
+"""
+VIEWS_AS_OF_SQL = "SELECT MIN(refreshed_at) FROM report_view_state;"
+
+GRANTS_SQL = "SELECT gid, source, budget, start_date, duration FROM grants ORDER BY gid;"
+PUBLICATIONS_SQL = """
+SELECT publicationid, title, venue, publication_date, doi
+FROM publication
+ORDER BY publication_date DESC NULLS LAST;
+"""
+
+MEMBERS_BY_GRANT_SQL = (
+    "SELECT DISTINCT lm.mid, lm.name "
+    "FROM lab_member lm "
+    "JOIN works w ON w.mid = lm.mid "
+    "JOIN funds f ON f.pid = w.pid "
+    "WHERE f.gid = %s ORDER BY lm.mid;"
+)
+# Projects funded by a grant (gid, period end, period start) active in the period
+GRANT_PROJECTS_ACTIVE_SQL = (
+    "SELECT COUNT(DISTINCT p.pid) AS cnt FROM project p "
+    "JOIN funds f ON f.pid = p.pid "
+    "WHERE f.gid = %s AND (p.start_date <= %s AND (p.end_date IS NULL OR p.end_date >= %s));"
+)
+
+# Full-time weekly hours, the WORKS per-member weekly limit
+FULL_TIME_HOURS = 40
+
+# Per grant, from the effort ledger (see effort.py): (gid, projects, weeks
+# with effort, total hours, mean weekly FTE)
+GRANT_FTE_SQL = (
+    "SELECT f.gid, COUNT(DISTINCT f.pid) AS projects, COUNT(DISTINCT w.week) AS weeks, "
+    "SUM(w.hours) AS hours, "
+    "ROUND(SUM(w.hours)::numeric / %s / NULLIF(COUNT(DISTINCT w.week), 0), 2) AS fte "
+    "FROM funds f JOIN project_week_hours w ON w.pid = f.pid "
+    "GROUP BY f.gid ORDER BY fte DESC NULLS LAST, f.gid;"
+)
+
+UNDEFINED_TABLE = "42P01"
+
+
+def read_report(db, view_name, view_sql, live_sql, params=None):
+    """Return (rows, status) for a report; status is (refreshed_at, pending) or None for live data."""
+    try:
+        # Each view query is prepared once per connection under the view's name
+        rows = db.execute_query(view_sql, params, fetch=True, row_format="tuple", prepare=view_name)
+    except Exception as e:
+        if getattr(e, "pgcode", None) != UNDEFINED_TABLE:
+            raise
+        return db.execute_query(live_sql, params, fetch=True, row_format="tuple"), None
+    status = db.execute_query(VIEW_STATUS_SQL, (view_name,), fetch=True, row_format="tuple",
+                              prepare="report_view_status")
+    return rows, (status[0] if status else None)
+
+
+def freshness(status):
+    if status is None:
+        return "Live data (run views.py to serve this report from a materialized view)."
+    refreshed_at, pending = status
+    text = f"Data as of {refreshed_at.astimezone():%Y-%m-%d %H:%M:%S}"
+    if pending:
+        text += f" ({pending} change(s) not yet included)"
+    return text + "."
+
+
+class ReportResult:
+    """Rows of a report run, with their column names.
+
+    `status` is the materialized view's (refreshed_at, pending) for reports
+    served from views.py, None for live data.
+    """
+
+    def __init__(self, name, columns, rows, status=None):
+        self.name = name
+        self.columns = columns
+        self.rows = rows
+        self.status = status
+
+    def __len__(self):
+        return len(self.rows)
+
+    def records(self):
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+
+# Each report function takes the database and the report's parameters and
+# returns (rows, status).
+
+def top_publishers(db):
+    """Member(s) with the most publications: (mid, name, pubs)."""
+    rows, status = read_report(db, "report_member_publications", TOP_PUBLISHERS_VIEW_SQL, TOP_PUBLISHERS_LIVE_SQL)
+    # The live query returns every member ordered by pubs descending
+    top = [r for r in rows if r[2] == rows[0][2]] if rows else []
+    return top, status
+
+
+def student_publications(db):
+    """Average publications per student by major: (major, pubs, students, average)."""
+    rows, status = read_report(db, "report_major_publications", AVG_STUDENT_PUBS_VIEW_SQL, AVG_STUDENT_PUBS_LIVE_SQL)
+    return [(major, pubs, students, round(pubs / students, 2) if students > 0 else 0)
+            for major, pubs, students in rows], status
+
+
+def grant_top_publishers(db, gid):
+    """The three most prolific members on a grant's projects: (mid, pubs)."""
+    return read_report(db, "report_grant_member_publications", TOP3_FOR_GRANT_VIEW_SQL, TOP3_FOR_GRANT_LIVE_SQL, (gid,))
+
+
+def grants(db):
+    return db.execute_query(GRANTS_SQL, fetch=True, row_format="tuple"), None
+
+
+def publications(db):
+    return db.execute_query(PUBLICATIONS_SQL, fetch=True, row_format="tuple"), None
+
+
+def burn_rate(db):
+    return grant_burn(db).rows(), None
+
+
+def grant_fte(db):
+    return db.execute_query(GRANT_FTE_SQL, (FULL_TIME_HOURS,), fetch=True, row_format="tuple")
+
+
+def effort_fte(db):
+    return grant_fte(db), None
+
+
+def members_by_grant(db, gid):
+    """Members who worked on projects funded by a grant: (mid, name)."""
+    return db.execute_query(MEMBERS_BY_GRANT_SQL, (gid,), fetch=True, row_format="tuple",
+                            prepare="members_by_grant"), None
+
+
+def grant_active_projects(db, gid, start, end):
+    """Number of a grant's projects active between start and end: (gid, start, end, projects)."""
+    rows = db.execute_query(GRANT_PROJECTS_ACTIVE_SQL, (gid, end, start), fetch=True, row_format="tuple",
+                            prepare="grant_projects_active")
+    return [(gid, start, end, rows[0][0] if rows else 0)], None
+
+
+class Report:
+    """A named report: its title, columns, parameters and report function."""
+
+    def __init__(self, name, title, columns, func, params=()):
+        self.name = name
+        self.title = title
+        self.columns = columns
+        self.func = func
+        self.params = params
+
+    def missing(self, params):
+        return [p for p in self.params if params.get(p) in (None, "")]
+
+    def run(self, db, **params):
+        missing = self.missing(params)
+        if missing:
+            raise ValueError(f"Report {self.name!r} needs {', '.join(missing)}")
+        rows, status = self.func(db, **{p: params[p] for p in self.params})
+        return ReportResult(self.name, self.columns, rows, status)
+
+
+REPORTS = {
+    r.name: r for r in (
+        Report("top_publishers", "Member(s) with Highest Publications", ("mid", "name", "pubs"), top_publishers),
+        Report("student_publications", "Average Student Publications per Major",
+               ("major", "pubs", "students", "average"), student_publications),
+        Report("grant_top_publishers", "Top 3 Publishers for a Grant", ("mid", "pubs"), grant_top_publishers,
+               ("gid",)),
+        Report("grants", "Grants", ("gid", "source", "budget", "start_date", "duration"), grants),
+        Report("publications", "Publications", ("publicationid", "title", "venue", "publication_date", "doi"),
+               publications),
+        Report("grant_burn", "Grant Burn Rate",
+               ("gid", "budget", "monthly_burn", "spent", "remaining", "runway_months", "exhausted_by"), burn_rate),
+        Report("grant_fte", "Grant FTE", ("gid", "projects", "weeks", "hours", "fte"), effort_fte),
+        Report("members_by_grant", "Members for a Grant", ("mid", "name"), members_by_grant, ("gid",)),
+        Report("grant_active_projects", "Grant Projects Active in a Period", ("gid", "start", "end", "projects"),
+               grant_active_projects, ("gid", "start", "end")),
+    )
+}
+
+
+def run_report(db, name, **params):
+    """Run a registered report by name and return its ReportResult."""
+    try:
+        report = REPORTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown report {name!r}; choose from {', '.join(REPORTS)}") from None
+    return report.run(db, **params)
+
+
+def run_reports(db, names, params=None, max_workers=None):
+    """Run several reports at once and yield (name, result, seconds) as each finishes.
+
+    Every report runs on its own worker thread; with a pooled Database (pool_max)
+    each borrows its own connection, so max_workers defaults to the pool size.
+    A report that fails yields its exception as the result.
+    """
+    params = params or {}
+    unknown = [name for name in names if name not in REPORTS]
+    if unknown:
+        raise ValueError(f"Unknown report(s) {', '.join(unknown)}; choose from {', '.join(REPORTS)}")
+    reports = [REPORTS[name] for name in names]
+    for report in reports:
+        missing = report.missing(params)
+        if missing:
+            raise ValueError(f"Report {report.name!r} needs {', '.join(missing)}")
+    if max_workers is None:
+        pool = getattr(db, "pool", None)
+        max_workers = pool.maxconn if pool is not None else 1
+
+    def timed(report):
+        start = time.perf_counter()
+        try:
+            result = report.run(db, **params)
+        except Exception as e:
+            result = e
+        return report.name, result, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(reports) or 1)),
+                            thread_name_prefix="report") as pool:
+        futures = [pool.submit(timed, report) for report in reports]
+        for future in as_completed(futures):
+            yield future.result()
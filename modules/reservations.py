@@ -0,0 +1,321 @@
+import bisect
+import tkinter as tk
+from tkinter import messagebox
+from datetime import date, datetime, timedelta
+
+from psycopg2.extras import execute_values
+
+
+# Bookings are USES rows whose PERIOD, [start_date, end_date), lies in the
+# future; the exclusion constraint (or trigger) from create.py keeps the
+# sessions of one device from overlapping, so a device's bookings are
+# disjoint and sorted by start also sorted by end.
+EXCLUSION_VIOLATION = "23P01"
+
+# Sessions of a device overlapping [start, end)
+CONFLICTS_SQL = (
+    "SELECT mid, start_date, end_date FROM uses "
+    "WHERE eid = %s AND period && daterange(%s::date, %s::date, '[)') ORDER BY start_date;"
+)
+
+# Sessions of the given devices still running on or after a date, to load an
+# IntervalIndex
+BOOKINGS_SQL = (
+    "SELECT eid, start_date, end_date FROM uses "
+    "WHERE eid = ANY(%s) AND period && daterange(%s, NULL) ORDER BY eid, start_date;"
+)
+
+# Earliest start of `days` free days from a date on any bookable device of a
+# type. A device's first free slot starts either on the date itself or when
+# one of its sessions ends; both lookups use the (EID, PERIOD) index.
+# Parameters: after, after, days, type.
+NEXT_FREE_SLOT_SQL = """
+SELECT q.eid, slot.start_date
+FROM equipment q
+CROSS JOIN LATERAL (
+    SELECT c.start_date
+    FROM (
+        SELECT %s::date AS start_date
+        UNION
+        SELECT upper(u.period) FROM uses u
+        WHERE u.eid = q.eid AND u.period && daterange(%s::date, NULL)
+          AND NOT upper_inf(u.period)
+    ) c
+    WHERE NOT EXISTS (
+        SELECT 1 FROM uses b
+        WHERE b.eid = q.eid AND b.period && daterange(c.start_date, c.start_date + %s::int, '[)')
+    )
+    ORDER BY c.start_date
+    LIMIT 1
+) slot
+WHERE q.type = %s::text AND q.status IN ('Available', 'In Use')
+ORDER BY slot.start_date, q.eid
+LIMIT 1;
+"""
+
+BOOKABLE_EQUIPMENT_SQL = (
+    "SELECT eid FROM equipment WHERE type = %s AND status IN ('Available', 'In Use') ORDER BY eid;"
+)
+
+INSERT_BOOKINGS_SQL = "INSERT INTO uses (eid, mid, purpose, start_date, end_date) VALUES %s;"
+
+
+class BookingConflict(Exception):
+    """Raised when a booking overlaps existing sessions of the device."""
+
+    def __init__(self, eid, conflicts):
+        self.eid = eid
+        # (mid, start_date, end_date) of the clashing sessions
+        self.conflicts = conflicts
+        when = ", ".join(f"{start} to {end or 'open'}" for _, start, end in conflicts[:3])
+        super().__init__(f"Equipment {eid} is already booked: {when or 'overlapping session'}")
+
+
+class IntervalIndex:
+    """Per-device sorted start/end lists of disjoint [start, end) sessions.
+
+    Conflict checks and free-slot searches are binary searches, O(log n) in
+    the number of bookings of the device. An open session (end None) runs
+    forever.
+    """
+
+    def __init__(self):
+        self._starts = {}
+        self._ends = {}
+
+    @classmethod
+    def load(cls, db, eids, since=None):
+        """Index the sessions of `eids` still running on or after `since` (default today)."""
+        index = cls()
+        for eid in eids:
+            index._starts.setdefault(eid, [])
+            index._ends.setdefault(eid, [])
+        rows = db.execute_query(BOOKINGS_SQL, (list(eids), since or date.today()),
+                                fetch=True, row_format="tuple", cache=False)
+        for eid, start, end in rows:
+            index.add(eid, start, end)
+        return index
+
+    def eids(self):
+        return list(self._starts)
+
+    def add(self, eid, start, end):
+        end = end or date.max
+        starts = self._starts.setdefault(eid, [])
+        ends = self._ends.setdefault(eid, [])
+        if end <= start:
+            # An empty range occupies no day
+            return
+        i = bisect.bisect_left(starts, start)
+        starts.insert(i, start)
+        ends.insert(i, end)
+
+    def remove(self, eid, start):
+        starts = self._starts.get(eid, [])
+        i = bisect.bisect_left(starts, start)
+        if i < len(starts) and starts[i] == start:
+            del starts[i]
+            del self._ends[eid][i]
+
+    def conflicts(self, eid, start, end):
+        """(start, end) of the sessions overlapping [start, end); end None = open."""
+        end = end or date.max
+        starts = self._starts.get(eid, [])
+        ends = self._ends.get(eid, [])
+        # Overlap means s < end and e > start; both lists are sorted
+        first = bisect.bisect_right(ends, start)
+        last = bisect.bisect_left(starts, end)
+        return [(starts[i], None if ends[i] == date.max else ends[i]) for i in range(first, last)]
+
+    def is_free(self, eid, start, end):
+        return not self.conflicts(eid, start, end)
+
+    def next_free(self, eid, days, after):
+        """First date d >= after with [d, d + days) free, or None."""
+        starts = self._starts.get(eid, [])
+        ends = self._ends.get(eid, [])
+        day = after
+        i = bisect.bisect_right(ends, day)
+        while i < len(starts):
+            if starts[i] >= day + timedelta(days=days):
+                break
+            if ends[i] == date.max:
+                return None
+            day = max(day, ends[i])
+            i += 1
+        return day
+
+    def next_free_slot(self, days, after):
+        """(eid, start) of the earliest free slot over every indexed device, or None."""
+        best = None
+        for eid in self._starts:
+            start = self.next_free(eid, days, after)
+            if start is not None and (best is None or (start, eid) < (best[1], best[0])):
+                best = (eid, start)
+        return best
+
+
+def conflicts(db, eid, start, end):
+    return db.execute_query(CONFLICTS_SQL, (eid, start, end), fetch=True, row_format="tuple",
+                            cache=False, prepare="uses_conflicts")
+
+
+def book(db, eid, mid, purpose, start, end):
+    """Reserve `eid` for [start, end); raise BookingConflict if it is taken."""
+    if end is not None and end <= start:
+        raise ValueError("A booking must end after it starts.")
+    try:
+        db.execute_query(
+            "INSERT INTO uses (eid, mid, purpose, start_date, end_date) VALUES (%s, %s, %s, %s, %s);",
+            (eid, mid, purpose, start, end),
+        )
+    except Exception as e:
+        if getattr(e, "pgcode", None) != EXCLUSION_VIOLATION:
+            raise
+        raise BookingConflict(eid, conflicts(db, eid, start, end)) from e
+
+
+def recurring_slots(start, days, every, count):
+    """[start, end) of `count` slots of `days` days, `every` apart."""
+    return [(start + i * every, start + i * every + timedelta(days=days)) for i in range(count)]
+
+
+def book_recurring(db, eid, mid, purpose, start, days, every=timedelta(weeks=1), count=1,
+                   skip_conflicts=False):
+    """Book `count` slots of `days` days, `every` apart, in one transaction.
+
+    Slots are checked against an IntervalIndex of the device's bookings first;
+    with skip_conflicts the free slots are booked and the taken ones returned,
+    otherwise nothing is booked and BookingConflict lists every clash.
+    Returns (booked slots, conflicting slots).
+    """
+    if days < 1 or count < 1:
+        raise ValueError("Recurring bookings need at least one slot of at least one day.")
+    if count > 1 and every < timedelta(days=days):
+        raise ValueError("Recurring slots would overlap each other.")
+    slots = recurring_slots(start, days, every, count)
+    index = IntervalIndex.load(db, [eid], since=start)
+    taken = [slot for slot in slots if not index.is_free(eid, *slot)]
+    if taken and not skip_conflicts:
+        clashes = [c for slot in taken for c in conflicts(db, eid, *slot)]
+        raise BookingConflict(eid, clashes)
+    free = [slot for slot in slots if slot not in taken]
+    if free:
+        try:
+            with db.transaction() as cur:
+                # The constraint still guards against bookings made meanwhile
+                execute_values(cur, INSERT_BOOKINGS_SQL, [(eid, mid, purpose, s, e) for s, e in free])
+        except Exception as e:
+            if getattr(e, "pgcode", None) != EXCLUSION_VIOLATION:
+                raise
+            raise BookingConflict(eid, []) from e
+    return free, taken
+
+
+def next_free_slot(db, equipment_type, days, after=None):
+    """(eid, start) of the earliest `days`-day slot on a device of the type, in SQL."""
+    after = after or date.today()
+    rows = db.execute_query(NEXT_FREE_SLOT_SQL, (after, after, days, equipment_type),
+                            fetch=True, row_format="tuple", cache=False, prepare="next_free_slot")
+    return tuple(rows[0]) if rows else None
+
+
+def type_index(db, equipment_type, since=None):
+    """IntervalIndex over the bookable devices of a type, for repeated in-process searches."""
+    eids = [r[0] for r in db.execute_query(BOOKABLE_EQUIPMENT_SQL, (equipment_type,),
+                                           fetch=True, row_format="tuple")]
+    return IntervalIndex.load(db, eids, since=since)
+
+
+def _parse_date(text):
+    return datetime.strptime(text.strip(), "%Y-%m-%d").date()
+
+
+def reservations_dialog(window, db, executor, on_change=None):
+    """Book a device for future dates, optionally weekly, or find the next free slot."""
+    dlg = tk.Toplevel(window)
+    dlg.title("Reservations")
+    frm = tk.Frame(dlg, padx=10, pady=10)
+    frm.pack(fill=tk.BOTH, expand=True)
+
+    fields = ["EID", "MID", "Purpose", "Start (YYYY-MM-DD)", "End (YYYY-MM-DD)",
+              "Repeat weekly (times)", "Type (for next free slot)"]
+    entries = {}
+    for i, label in enumerate(fields):
+        tk.Label(frm, text=label).grid(row=i, column=0, sticky="w")
+        entries[label] = tk.Entry(frm, width=28)
+        entries[label].grid(row=i, column=1, pady=2)
+    entries["Repeat weekly (times)"].insert(0, "1")
+
+    def booking_input():
+        start = _parse_date(entries["Start (YYYY-MM-DD)"].get())
+        end = _parse_date(entries["End (YYYY-MM-DD)"].get())
+        if start < date.today():
+            raise ValueError("Bookings cannot start in the past.")
+        if end <= start:
+            raise ValueError("End must be after start.")
+        return start, end, int(entries["Repeat weekly (times)"].get() or 1)
+
+    def do_book():
+        eid = entries["EID"].get().strip()
+        mid = entries["MID"].get().strip().upper()
+        purpose = entries["Purpose"].get().strip()
+        if not eid or not mid:
+            messagebox.showwarning("Validation", "EID and MID are required.", parent=dlg)
+            return
+        try:
+            start, end, count = booking_input()
+        except ValueError as e:
+            messagebox.showwarning("Validation", str(e), parent=dlg)
+            return
+
+        def done(result):
+            booked, _ = result
+            messagebox.showinfo("Booked", f"Booked {eid} for {len(booked)} slot(s) from {start}.", parent=dlg)
+            if on_change:
+                on_change()
+
+        def failed(e):
+            title = "Conflict" if isinstance(e, BookingConflict) else "Error"
+            messagebox.showerror(title, str(e), parent=dlg)
+
+        executor.submit(
+            lambda: book_recurring(db, eid, mid, purpose or None, start, (end - start).days, count=count),
+            done,
+            failed,
+        )
+
+    def do_next_free():
+        equipment_type = entries["Type (for next free slot)"].get().strip()
+        if not equipment_type:
+            messagebox.showwarning("Validation", "Enter an equipment type.", parent=dlg)
+            return
+        try:
+            start, end, _ = booking_input()
+        except ValueError as e:
+            messagebox.showwarning("Validation", str(e), parent=dlg)
+            return
+
+        def show(slot):
+            if slot is None:
+                messagebox.showinfo("Next free slot", f"No {equipment_type} is free for {(end - start).days} day(s).",
+                                    parent=dlg)
+                return
+            eid, free_from = slot
+            entries["EID"].delete(0, tk.END)
+            entries["EID"].insert(0, eid)
+            messagebox.showinfo("Next free slot", f"{eid} is free from {free_from} for {(end - start).days} day(s).",
+                                parent=dlg)
+
+        executor.submit(
+            lambda: next_free_slot(db, equipment_type, (end - start).days, after=start),
+            show,
+            lambda e: messagebox.showerror("Error", str(e), parent=dlg),
+        )
+
+    btns = tk.Frame(dlg)
+    btns.pack(pady=(0, 10))
+    tk.Button(btns, text="Book", bg="#4caf50", fg="white", command=do_book).pack(side=tk.LEFT, padx=5)
+    tk.Button(btns, text="Next Free Slot", bg="#7b1fa2", fg="white", command=do_next_free).pack(side=tk.LEFT, padx=5)
+    tk.Button(btns, text="Close", command=dlg.destroy).pack(side=tk.LEFT, padx=5)
+    return dlg
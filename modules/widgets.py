@@ -0,0 +1,336 @@
+from collections import OrderedDict
+
+
+def page_queries(table, columns, key):
+    """The statements a VirtualTable over `table` issues, by purpose."""
+    cols = ", ".join(columns)
+    return {
+        "first_page": f"SELECT {cols} FROM {table} ORDER BY {key} LIMIT %s;",
+        "keyset": f"SELECT {cols} FROM {table} WHERE {key} > %s ORDER BY {key} LIMIT %s;",
+        "offset": f"SELECT {cols} FROM {table} ORDER BY {key} LIMIT %s OFFSET %s;",
+        "count": f"SELECT COUNT(*) FROM {table};",
+        "row": f"SELECT {cols} FROM {table} WHERE {key} = %s;",
+        "position": f"SELECT COUNT(*) FROM {table} WHERE {key} < %s;",
+    }
+
+
+class VirtualTable:
+    """Show a large keyed table through an existing ttk.Treeview.
+
+    Only the rows that fit in the view exist as Treeview items; scrolling
+    rewrites their values instead of inserting and deleting items. Rows are
+    read a page at a time with keyset pagination on `key` (a unique column,
+    which is also the sort order) and the most recently used pages are kept
+    in memory. Column widths are computed once per refresh from a sample of
+    the first page.
+
+    The tree and scrollbar are created by the menu as before; the table only
+    takes over their scrolling. With an `executor` (the window's
+    QueryExecutor) every query runs on a worker and the view is redrawn when
+    its rows arrive; failures go to `on_error`. Without one, queries run
+    right away and refresh() raises on failure.
+    """
+
+    def __init__(self, tree, scrollbar, db, table, columns, key, headings=None,
+                 page_size=200, visible_rows=25, cached_pages=20, sample_size=200, row_height=22,
+                 executor=None, on_error=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.db = db
+        self.table = table
+        self.columns = tuple(columns)
+        self.key = key
+        self.key_index = self.columns.index(key)
+        self.headings = tuple(headings) if headings else self.columns
+        self.page_size = page_size
+        self.visible_rows = visible_rows
+        self.cached_pages = cached_pages
+        self.sample_size = sample_size
+        self.row_height = row_height
+        self.executor = executor
+        self.on_error = on_error
+
+        self.total = 0
+        self.offset = 0
+        self._pages = OrderedDict()
+        # Last key of every page seen so far; lets page p+1 be read by keyset
+        # even after page p has been evicted from the cache.
+        self._last_keys = {}
+        self._items = []
+        # Pages being read on a worker (page -> job), and a counter bumped
+        # whenever cached pages are dropped, so late results are discarded.
+        self._loading = {}
+        self._generation = 0
+
+        sql = page_queries(table, self.columns, key)
+        self._first_page_sql = sql["first_page"]
+        self._keyset_sql = sql["keyset"]
+        self._offset_sql = sql["offset"]
+        self._count_sql = sql["count"]
+        self._row_sql = sql["row"]
+        self._position_sql = sql["position"]
+
+        # Take over scrolling from the Treeview: the scrollbar now moves the
+        # window over the whole table rather than over the few loaded items.
+        self.tree.configure(yscrollcommand=lambda *args: None, height=self.visible_rows)
+        self.scrollbar.configure(command=self.yview)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_wheel)
+        self.tree.bind("<Prior>", lambda event: self._scroll_by(-self.visible_rows))
+        self.tree.bind("<Next>", lambda event: self._scroll_by(self.visible_rows))
+        self.tree.bind("<Configure>", self._on_resize)
+
+    # ---------- data ----------
+    def _fetch(self, query, params):
+        return self.db.execute_query(query, params, fetch=True, row_format="tuple")
+
+    def _run(self, work, done, failed=None):
+        # Off the Tk thread when the window has an executor
+        if self.executor is None:
+            done(work())
+            return None
+        return self.executor.submit(work, done, failed or self._failed)
+
+    def _failed(self, e):
+        if self.on_error is not None:
+            self.on_error(e)
+        else:
+            print("Table fetch failed:", e)
+
+    def _load_page(self, page, after=None):
+        # `after` is the last key of the previous page, when known
+        if page == 0:
+            rows = self._fetch(self._first_page_sql, (self.page_size,))
+        elif after is not None:
+            rows = self._fetch(self._keyset_sql, (after, self.page_size))
+        else:
+            # Jumping far ahead (e.g. dragging the scrollbar): locate the page
+            # once by offset, then continue from its last key.
+            rows = self._fetch(self._offset_sql, (self.page_size, page * self.page_size))
+        return rows
+
+    def _load_pages(self, pages):
+        # Read consecutive pages in one job, each continuing from the last
+        # key of the one before, then redraw.
+        if all(p in self._loading and not self._loading[p].cancelled for p in pages):
+            return
+        generation = self._generation
+        after = self._last_keys.get(pages[0] - 1)
+
+        def fetch():
+            loaded, last = [], after
+            for page in pages:
+                rows = self._load_page(page, last) if page == pages[0] or last is not None else []
+                loaded.append((page, rows))
+                last = rows[-1][self.key_index] if rows else None
+            return loaded
+
+        def store(loaded):
+            if generation != self._generation:
+                # The pages were dropped while this read was running
+                self.render()
+                return
+            for page, rows in loaded:
+                self._loading.pop(page, None)
+                self._store_page(page, rows)
+            self.render()
+
+        def failed(e):
+            for page in pages:
+                self._loading.pop(page, None)
+            self._failed(e)
+
+        job = self._run(fetch, store, failed)
+        if job is not None and not job.done:
+            self._loading.update((page, job) for page in pages)
+
+    def page(self, page):
+        if page in self._pages:
+            self._pages.move_to_end(page)
+            return self._pages[page]
+        rows = self._load_page(page, self._last_keys.get(page - 1))
+        self._store_page(page, rows)
+        return rows
+
+    def _store_page(self, page, rows):
+        self._pages[page] = rows
+        if rows:
+            self._last_keys[page] = rows[-1][self.key_index]
+        while len(self._pages) > self.cached_pages:
+            self._pages.popitem(last=False)
+
+    def _missing_pages(self, offset, count):
+        end = min(offset + count, self.total)
+        return [page for page in range(offset // self.page_size, (end - 1) // self.page_size + 1)
+                if page not in self._pages] if end > offset else []
+
+    def rows_at(self, offset, count):
+        rows = []
+        page = offset // self.page_size
+        start = offset % self.page_size
+        while len(rows) < count and page * self.page_size < self.total:
+            chunk = self.page(page)
+            rows.extend(chunk[start:start + count - len(rows)])
+            if len(chunk) < self.page_size:
+                break
+            page += 1
+            start = 0
+        return rows
+
+    def refresh(self):
+        # Read the count and first page before touching the view, so a failed
+        # query leaves the current table in place (the caller reports it).
+        def fetch():
+            count_rows = self._fetch(self._count_sql, None)
+            return (count_rows[0][0] if count_rows else 0), self._fetch(self._first_page_sql, (self.page_size,))
+
+        def show(result):
+            self.total, first = result
+            self._drop_pages_from(0)
+            self._store_page(0, first)
+            self._size_columns(first[:self.sample_size])
+            self.offset = self._clamp(self.offset)
+            self.render()
+
+        self._run(fetch, show)
+
+    def invalidate(self):
+        # Forget cached pages and re-read the current window (after writes)
+        def show(count_rows):
+            self.total = count_rows[0][0] if count_rows else 0
+            self._drop_pages_from(0)
+            self.offset = self._clamp(self.offset)
+            self.render()
+
+        self._run(lambda: self._fetch(self._count_sql, None), show)
+
+    def apply_change(self, op, key):
+        # Apply a change notification (see modules/live.py) without re-reading
+        # the table: only pages at or after the changed key are dropped, and
+        # an updated row is re-read by key. `key` is the list of key values.
+        if op == "UPDATE":
+            self._update_row(key[0])
+        elif op in ("INSERT", "DELETE"):
+            self.total = max(0, self.total + (1 if op == "INSERT" else -1))
+
+            def drop(first):
+                self._drop_pages_from(first)
+                self.offset = self._clamp(self.offset)
+                self.render()
+
+            self._page_of(key[0], drop)
+        else:
+            self.invalidate()
+
+    def _drop_pages_from(self, first):
+        # Pages before the one holding the changed key keep their rows and
+        # positions; later pages shift by one row and are re-read on demand.
+        for page in [p for p in self._pages if p >= first]:
+            del self._pages[page]
+        for page in [p for p in self._last_keys if p >= first]:
+            del self._last_keys[page]
+        self._loading.clear()
+        self._generation += 1
+
+    def _page_of(self, key, done):
+        # Found by position, never by comparing keys in Python: keyset paging
+        # orders them by the database's collation, which may differ.
+        for page, rows in self._pages.items():
+            if any(row[self.key_index] == key for row in rows):
+                done(page)
+                return
+        self._run(lambda: self._fetch(self._position_sql, (key,)),
+                  lambda position: done((position[0][0] if position else 0) // self.page_size))
+
+    def _update_row(self, key):
+        # Only rows already on a cached page are re-read
+        if not any(row[self.key_index] == key for rows in self._pages.values() for row in rows):
+            return
+
+        def patch(fresh):
+            if not fresh:
+                return
+            for page, rows in self._pages.items():
+                for i, row in enumerate(rows):
+                    if row[self.key_index] == key:
+                        rows[i] = fresh[0]
+                        position = page * self.page_size + i - self.offset
+                        if 0 <= position < len(self._items):
+                            self.tree.item(self._items[position], values=fresh[0])
+                        return
+
+        self._run(lambda: self._fetch(self._row_sql, (key,)), patch)
+
+    # ---------- view ----------
+    def _size_columns(self, sample):
+        for i, col in enumerate(self.headings):
+            max_len = max([len(str(r[i])) for r in sample] + [len(col)])
+            self.tree.column(col, width=max(80, max_len * 10))
+
+    def render(self):
+        missing = self._missing_pages(self.offset, self.visible_rows)
+        if missing:
+            # Drawn again once the pages arrive; meanwhile the items keep
+            # their rows and only the scrollbar follows the new offset.
+            self._set_scrollbar(min(self.visible_rows, self.total - self.offset))
+            self._load_pages(missing)
+            return
+        rows = self.rows_at(self.offset, self.visible_rows)
+        for i, row in enumerate(rows):
+            tag = 'odd' if (self.offset + i) % 2 == 0 else 'even'
+            if i < len(self._items):
+                self.tree.item(self._items[i], values=row, tags=(tag,))
+            else:
+                self._items.append(self.tree.insert("", "end", values=row, tags=(tag,)))
+        for iid in self._items[len(rows):]:
+            self.tree.delete(iid)
+        del self._items[len(rows):]
+        self._set_scrollbar(len(rows))
+
+    def _set_scrollbar(self, shown):
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, (self.offset + shown) / self.total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _clamp(self, offset):
+        return max(0, min(offset, self.total - self.visible_rows))
+
+    def scroll_to(self, offset):
+        offset = self._clamp(offset)
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def _scroll_by(self, delta):
+        self.scroll_to(self.offset + delta)
+        return "break"
+
+    def yview(self, *args):
+        # Scrollbar protocol: ("moveto", fraction) or ("scroll", n, "units"|"pages")
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * self.total))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if len(args) > 2 and args[2] == "pages":
+                step *= self.visible_rows
+            self.scroll_to(self.offset + step)
+
+    def _on_wheel(self, event):
+        if getattr(event, "num", None) == 4:
+            delta = -3
+        elif getattr(event, "num", None) == 5:
+            delta = 3
+        else:
+            delta = -3 if event.delta > 0 else 3
+        return self._scroll_by(delta)
+
+    def _on_resize(self, event):
+        # Keep as many items as fit in the widget (minus the heading row)
+        rows = max(1, event.height // self.row_height - 1)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.offset = self._clamp(self.offset)
+            self.render()
@@ -0,0 +1,120 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+
+from database import Database
+from modules.reports import REPORTS, run_reports
+
+FORMATS = ("csv", "json", "parquet")
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot write {type(value).__name__} to JSON")
+
+
+def write_csv(result, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(result.columns)
+        writer.writerows(result.rows)
+
+
+def write_json(result, path):
+    as_of = result.status[0] if result.status else None
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"report": result.name, "as_of": as_of, "rows": result.records()}, f,
+                  default=_json_value, indent=2)
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet output needs pyarrow; install it with 'pip install pyarrow'.") from e
+    return pa, pq
+
+
+def write_parquet(result, path):
+    pa, pq = _pyarrow()
+    # Built column by column so an empty report keeps its schema
+    columns = {name: [row[i] for row in result.rows] for i, name in enumerate(result.columns)}
+    pq.write_table(pa.table(columns), path)
+
+
+WRITERS = {"csv": write_csv, "json": write_json, "parquet": write_parquet}
+
+
+def main(names, params, fmt="csv", out_dir="reports", jobs=4, **connect):
+    # Without names, run every report whose parameters were given
+    if not names:
+        names = [name for name, report in REPORTS.items() if not report.missing(params)]
+    if fmt == "parquet":
+        # Fail before running anything
+        _pyarrow()
+    os.makedirs(out_dir, exist_ok=True)
+    # One pooled connection per worker; the cache is no use to a single pass
+    db = Database(pool_min=1, pool_max=jobs, row_format="tuple", **connect)
+    failed = 0
+    try:
+        for name, result, elapsed in run_reports(db, names, params, max_workers=jobs):
+            if isinstance(result, Exception):
+                failed += 1
+                print(f"{name}: failed after {elapsed:.2f}s: {result}")
+                continue
+            path = os.path.join(out_dir, f"{name}.{fmt}")
+            try:
+                WRITERS[fmt](result, path)
+            except Exception as e:
+                failed += 1
+                print(f"{name}: could not write {path}: {e}")
+                continue
+            print(f"{name}: {len(result)} row(s) in {elapsed:.2f}s -> {path}")
+    finally:
+        db.close()
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run lab reports without the GUI and write them to files.")
+    parser.add_argument("reports", nargs="*", metavar="REPORT",
+                        help="reports to run (default: every report whose parameters are given)")
+    parser.add_argument("--list", action="store_true", help="list the reports and their parameters")
+    parser.add_argument("--format", choices=FORMATS, default="csv",
+                        help="output format (parquet needs pyarrow)")
+    parser.add_argument("--out", default="reports", help="directory for the output files, one per report")
+    parser.add_argument("--jobs", type=int, default=4, help="reports run at once, each on its own connection")
+    for param in sorted({p for report in REPORTS.values() for p in report.params}):
+        parser.add_argument(f"--{param}", help="report parameter")
+    parser.add_argument("--dbname", default="mydatabase")
+    parser.add_argument("--user", default="myuser")
+    parser.add_argument("--password", default=os.environ.get("PGPASSWORD", "mypassword"))
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5432)
+    args = parser.parse_args()
+
+    if args.list:
+        for name, report in REPORTS.items():
+            needs = " ".join(f"--{p}" for p in report.params)
+            print(f"{name:24} {report.title}" + (f" ({needs})" if needs else ""))
+        sys.exit(0)
+    unknown = [name for name in args.reports if name not in REPORTS]
+    if unknown:
+        parser.error(f"unknown report(s): {', '.join(unknown)} (see --list)")
+    params = {p: getattr(args, p) for report in REPORTS.values() for p in report.params
+              if getattr(args, p) is not None}
+    for name in args.reports:
+        missing = REPORTS[name].missing(params)
+        if missing:
+            parser.error(f"{name} needs " + ", ".join(f"--{p}" for p in missing))
+    sys.exit(1 if main(args.reports, params, args.format, args.out, max(1, args.jobs),
+                       dbname=args.dbname, user=args.user, password=args.password,
+                       host=args.host, port=args.port) else 0)
@@ -0,0 +1,63 @@
+from datetime import date
+
+import pytest
+
+from modules.activity import activity, activity_sql, buckets, sweep
+
+
+def test_buckets_align_to_months_and_quarters():
+    assert buckets(date(2024, 11, 15), date(2025, 1, 2)) == [
+        (date(2024, 11, 1), date(2024, 11, 30)),
+        (date(2024, 12, 1), date(2024, 12, 31)),
+        (date(2025, 1, 1), date(2025, 1, 31)),
+    ]
+    assert buckets(date(2024, 5, 1), date(2024, 7, 1), 'quarter') == [
+        (date(2024, 4, 1), date(2024, 6, 30)), (date(2024, 7, 1), date(2024, 9, 30))]
+    with pytest.raises(ValueError):
+        buckets(date(2024, 1, 1), date(2024, 2, 1), 'week')
+
+
+SPANS = [
+    ('G1', date(2024, 1, 10), date(2024, 2, 1)),
+    ('G1', date(2024, 2, 15), None),
+    ('G1', date(2024, 3, 31), date(2024, 3, 31)),
+    ('G2', date(2023, 6, 1), date(2024, 1, 31)),
+]
+
+
+def brute_force(spans, bkts):
+    return {gid: [sum(1 for g, s, e in spans if g == gid and s <= last and (e is None or e >= first))
+                  for first, last in bkts]
+            for gid in {g for g, _, _ in spans}}
+
+
+def test_sweep_counts_projects_overlapping_each_bucket():
+    bkts = buckets(date(2024, 1, 1), date(2024, 4, 30))
+    counts = sweep(SPANS, bkts)
+    assert counts == {'G1': [1, 2, 2, 1], 'G2': [1, 0, 0, 0]}
+    assert counts == brute_force(SPANS, bkts)
+
+
+class FakeDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def execute_query(self, query, params=None, fetch=False, row_format=None):
+        self.calls.append(params)
+        return self.rows
+
+
+def test_activity_queries_the_whole_period_once():
+    db = FakeDB(SPANS)
+    bkts, counts = activity(db, date(2024, 1, 20), date(2024, 3, 5), 'quarter')
+    assert db.calls == [(date(2024, 1, 1), date(2024, 3, 31))]
+    assert bkts == [(date(2024, 1, 1), date(2024, 3, 31))]
+    assert counts == {'G1': [3], 'G2': [1]}
+
+
+def test_activity_sql_fills_empty_buckets():
+    db = FakeDB([('G1', date(2024, 2, 1), 2)])
+    bkts, counts = activity_sql(db, date(2024, 1, 1), date(2024, 3, 1))
+    assert db.calls == [('1 months', date(2024, 1, 1), date(2024, 3, 1), '1 months')]
+    assert counts == {'G1': [0, 2, 0]}
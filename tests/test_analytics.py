@@ -0,0 +1,56 @@
+from datetime import date
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from modules.analytics import BURN_SQL, compute_burn, grant_burn
+
+
+ROWS = [
+    # G1: 1200 over 12 months from Jan 2024, spending 100 in Jan and Feb each year
+    ('G1', 1200, date(2024, 1, 15), 12, 1, 100),
+    ('G1', 1200, date(2024, 1, 15), 12, 2, 100),
+    # G2: no hours, budget, start or duration
+    ('G2', None, None, None, None, None),
+    # G3: 50 over 6 months from Nov 2023, spending 60 each December
+    ('G3', 50, date(2023, 11, 1), 6, 12, 60),
+]
+
+
+def test_compute_burn_projects_spending_over_each_grants_duration():
+    report = compute_burn(ROWS, today=date(2024, 3, 10))
+    assert report.gids == ['G1', 'G2', 'G3']
+    assert report.rows() == [
+        ('G1', 1200.0, 16.67, 200.0, 1000.0, 60.0, None),
+        ('G2', None, 0.0, 0.0, None, None, None),
+        ('G3', 50.0, 5.0, 60.0, -10.0, 0.0, date(2023, 12, 1)),
+    ]
+    assert report.remaining_by_month[0, :3].tolist() == [1100.0, 1000.0, 1000.0]
+    assert np.isnan(report.remaining_by_month[2, 6])
+
+
+def test_compute_burn_wraps_the_yearly_profile():
+    # Starting in December, month 1 is January of the next year
+    rows = [('G1', 150, date(2023, 12, 1), 14, 1, 100)]
+    report = compute_burn(rows, today=date(2023, 12, 5))
+    assert report.remaining_by_month[0].tolist() == [150.0, 50.0] + [50.0] * 11 + [-50.0]
+    assert report.exhaustion == [date(2025, 1, 1)]
+
+
+class FakeDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.params = None
+
+    def execute_query(self, query, params=None, fetch=False, row_format=None):
+        assert query == BURN_SQL
+        self.params = params
+        return self.rows
+
+
+def test_grant_burn_passes_rates_to_one_query():
+    db = FakeDB(ROWS)
+    report = grant_burn(db, rates={'Student': 20.0}, default_rate=50.0, today=date(2024, 3, 1))
+    assert db.params == (50.0, ['Student'], [20.0])
+    assert len(report) == 3
@@ -0,0 +1,99 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+pytest.importorskip('psycopg')
+pytest.importorskip('psycopg_pool')
+
+from async_database import AsyncDatabase
+from instrumentation import QueryMetrics
+
+
+class FakeCursor:
+    def __init__(self, pool, name=None):
+        self.pool = pool
+        self.name = name
+        self.description = [('mid',), ('name',)]
+        self.itersize = None
+        self._rows = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, params=None, prepare=None):
+        self.pool.queries.append((query, params, prepare, self.name))
+        self._rows = list(self.pool.rows)
+
+    async def fetchall(self):
+        return self._rows
+
+    async def fetchmany(self, size):
+        batch, self._rows = self._rows[:size], self._rows[size:]
+        return batch
+
+
+class FakeConn:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self, name=None, row_factory=None):
+        return FakeCursor(self.pool, name)
+
+
+class FakePool:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.borrowed = 0
+
+    @asynccontextmanager
+    async def connection(self):
+        self.borrowed += 1
+        yield FakeConn(self)
+
+
+def fake_db(rows=(('M1', 'Ann'), ('M2', 'Bo'), ('M3', 'Cy')), **kwargs):
+    db = AsyncDatabase('lab', 'user', 'secret', **kwargs)
+    db.pool = FakePool(list(rows))
+    return db, db.pool
+
+
+def test_execute_query_row_formats_and_cache():
+    async def run():
+        db, pool = fake_db(cache_size=8, row_format='tuple')
+        members = 'SELECT mid, name FROM lab_member;'
+        assert await db.execute_query(members, fetch=True) == [('M1', 'Ann'), ('M2', 'Bo'), ('M3', 'Cy')]
+        assert await db.execute_query(members, fetch=True) == [('M1', 'Ann'), ('M2', 'Bo'), ('M3', 'Cy')]
+        assert len(pool.queries) == 1
+        columns = await db.execute_query(members, fetch=True, row_format='columns')
+        assert columns == {'mid': ['M1', 'M2', 'M3'], 'name': ['Ann', 'Bo', 'Cy']}
+        # A write to the table drops its cached reads
+        assert await db.execute_query('INSERT INTO lab_member VALUES (%s);', ('M4',)) is True
+        await db.execute_query(members, fetch=True, prepare='members')
+        assert len(pool.queries) == 4
+        assert pool.queries[-1][2] is True
+
+    asyncio.run(run())
+
+
+def test_stream_query_batches_and_metrics_name_the_caller():
+    async def run():
+        metrics = QueryMetrics()
+        db, pool = fake_db(metrics=metrics)
+        batches = [batch async for batch in db.stream_query('SELECT mid, name FROM lab_member;', itersize=2)]
+        assert [len(b) for b in batches] == [2, 1]
+        assert pool.queries[0][3].startswith('stream_')
+        calls = []
+        for _ in range(3):
+            calls.append(db.execute_query('SELECT 1 FROM lab_member;', fetch=True))
+        # Run as tasks, the queries are still charged to the code that made them
+        await asyncio.gather(*calls)
+        return metrics.to_json()['queries']
+
+    queries = asyncio.run(run())
+    caller = 'test_async_database:test_stream_query_batches_and_metrics_name_the_caller.run'
+    assert sorted((q['caller'], q['count'], q['rows']) for q in queries) == [(caller, 1, 3), (caller, 3, 9)]
@@ -0,0 +1,77 @@
+import create
+
+
+class IndexCursor:
+    def __init__(self, present):
+        self.present = present
+        self.executed = []
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+    def fetchall(self):
+        return [(name,) for name in self.present]
+
+
+def test_missing_indexes_reports_absent_names_in_definition_order():
+    cur = IndexCursor(present=['idx_funds_pid', 'idx_works_mid_week'])
+    missing = create.missing_indexes(cur)
+    assert 'idx_funds_pid' not in missing and 'idx_works_mid_week' not in missing
+    assert missing == [n for n in create.INDEXES if n not in ('idx_funds_pid', 'idx_works_mid_week')]
+
+
+def test_index_definitions_are_idempotent():
+    for name, ddl in create.INDEXES.items():
+        assert f'IF NOT EXISTS {name} ' in ddl
+
+
+class MigrationCursor(IndexCursor):
+    def __init__(self, constraint=False, extension_error=None):
+        super().__init__(present=[])
+        self.constraint = constraint
+        self.extension_error = extension_error
+    def execute(self, query, params=None):
+        super().execute(query, params)
+        if 'btree_gist' in query and self.extension_error:
+            raise self.extension_error
+    def fetchone(self):
+        return (1,) if self.constraint else None
+
+
+def test_uses_migration_prefers_exclusion_constraint():
+    cur = MigrationCursor()
+    assert create.migrate_uses_period(cur) == 'exclusion'
+    statements = [q for q, _ in cur.executed]
+    assert create.USES_PERIOD_COLUMN_SQL in statements
+    assert create.USES_EXCLUSION_SQL in statements
+    assert create.USES_OVERLAP_TRIGGER_SQL not in statements
+    # Already migrated: nothing else to do
+    cur = MigrationCursor(constraint=True)
+    assert create.migrate_uses_period(cur) == 'exclusion'
+    assert create.USES_EXCLUSION_SQL not in [q for q, _ in cur.executed]
+
+
+def test_uses_migration_falls_back_to_trigger_without_btree_gist():
+    cur = MigrationCursor(extension_error=create.psycopg2.errors.UndefinedFile('not available'))
+    assert create.migrate_uses_period(cur) == 'trigger'
+    statements = [q for q, _ in cur.executed]
+    assert 'ROLLBACK TO SAVEPOINT uses_exclusion;' in statements
+    assert statements[-1] == create.USES_OVERLAP_TRIGGER_SQL
+
+
+class WeekCursor(IndexCursor):
+    def __init__(self, results):
+        super().__init__(present=[])
+        self.results = results
+    def fetchone(self):
+        return self.results.pop(0)
+
+
+def test_works_week_check_is_validated_only_without_bad_rows():
+    # No constraint yet and two rows outside 1..53: added, but not validated
+    cur = WeekCursor([None, (2,)])
+    assert create.migrate_works_week(cur) == 2
+    statements = [q for q, _ in cur.executed]
+    assert create.WORKS_WEEK_CHECK_SQL in statements
+    assert not any('VALIDATE' in q for q in statements)
+    cur = WeekCursor([(False,), (0,)])
+    assert create.migrate_works_week(cur) == 0
+    assert cur.executed[-1][0] == 'ALTER TABLE WORKS VALIDATE CONSTRAINT works_week_range;'
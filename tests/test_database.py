@@ -1,4 +1,5 @@
 import pytest
+import time
 import types
 
 import database
@@ -33,6 +34,10 @@ class DummyConn:
         self.rolled_back = True
     def close(self):
         self.closed = True
+    def get_backend_pid(self):
+        return 4242
+    def cancel(self):
+        self.cancelled = True
 
 
 def test_execute_query_fetch_success(monkeypatch):
@@ -66,3 +71,295 @@ def test_execute_query_raises_and_rolls_back(monkeypatch):
         db.execute_query('bad query', fetch=False)
     assert conn.rolled_back
     db.close()
+
+
+class PoolConn(DummyConn):
+    def __init__(self, healthy=True):
+        super().__init__(DummyCursor(fetch_result=[{'a': 1}]))
+        self.healthy = healthy
+    def cursor(self, cursor_factory=None):
+        if not self.healthy:
+            raise Exception('server closed the connection')
+        return self._cursor
+    def close(self):
+        self.closed = True
+
+
+def test_pooled_execute_query_reuses_connection(monkeypatch):
+    created = []
+    def connect(**k):
+        created.append(PoolConn())
+        return created[-1]
+    monkeypatch.setattr(database.psycopg2, 'connect', connect)
+    db = database.Database('db', 'u', 'p', pool_min=1, pool_max=2)
+    assert db.execute_query('select 1', fetch=True) == [{'a': 1}]
+    assert db.execute_query('update t', fetch=False) is True
+    assert len(created) == 1
+    assert created[0].committed
+    db.close()
+    assert created[0].closed
+
+
+def test_pool_checkout_timeout(monkeypatch):
+    monkeypatch.setattr(database.psycopg2, 'connect', lambda **k: PoolConn())
+    pool = database.ConnectionPool(0, 1, timeout=0.05)
+    conn = pool.getconn()
+    with pytest.raises(database.PoolTimeout):
+        pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+
+
+def test_pool_replaces_unhealthy_connection_on_borrow(monkeypatch):
+    conns = [PoolConn(healthy=False), PoolConn()]
+    monkeypatch.setattr(database.psycopg2, 'connect', lambda **k: conns.pop(0))
+    pool = database.ConnectionPool(1, 1)
+    conn = pool.getconn()
+    assert conn.healthy
+    pool.putconn(conn)
+
+
+def test_pool_reaps_idle_connections_above_minimum(monkeypatch):
+    monkeypatch.setattr(database.psycopg2, 'connect', lambda **k: PoolConn())
+    pool = database.ConnectionPool(1, 3)
+    a, b = pool.getconn(), pool.getconn()
+    pool.putconn(a)
+    pool.putconn(b)
+    assert len(pool._idle) == 2
+    pool.max_idle = 0
+    time.sleep(0.01)
+    pool.reap_idle()
+    assert len(pool._idle) == 1
+    assert a.closed
+
+
+class StreamCursor(DummyCursor):
+    def __init__(self, rows):
+        super().__init__()
+        self._rows = list(rows)
+        self.itersize = None
+    def fetchmany(self, size):
+        batch, self._rows = self._rows[:size], self._rows[size:]
+        return batch
+
+
+class StreamConn(DummyConn):
+    def cursor(self, name=None, cursor_factory=None):
+        self.cursor_name = name
+        return self._cursor
+
+
+def test_stream_query_yields_batches_from_named_cursor(monkeypatch):
+    cursor = StreamCursor([{'n': i} for i in range(5)])
+    conn = StreamConn(cursor)
+    monkeypatch.setattr(database.psycopg2, 'connect', lambda **k: conn)
+    db = database.Database('db', 'u', 'p')
+    batches = list(db.stream_query('select n', itersize=2))
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert conn.cursor_name.startswith('stream_')
+    assert cursor.itersize == 2
+    assert conn.committed
+
+
+def test_stream_query_rolls_back_when_abandoned(monkeypatch):
+    conn = StreamConn(StreamCursor([{'n': i} for i in range(5)]))
+    monkeypatch.setattr(database.psycopg2, 'connect', lambda **k: conn)
+    db = database.Database('db', 'u', 'p')
+    batches = db.stream_query('select n', itersize=2)
+    next(batches)
+    batches.close()
+    assert conn.rolled_back
+    assert not conn.committed
+
+
+class FactoryConn(DummyConn):
+    def cursor(self, cursor_factory=None, name=None):
+        self.cursor_factory = cursor_factory
+        return self._cursor
+
+
+def test_execute_query_row_formats(monkeypatch):
+    cursor = DummyCursor(fetch_result=[('M001', 'ALICE'), ('M002', 'BOB')])
+    cursor.description = [('mid',), ('name',)]
+    conn = FactoryConn(cursor)
+    monkeypatch.setattr(database.psycopg2, 'connect', lambda **k: conn)
+    db = database.Database('db', 'u', 'p', row_format='tuple')
+    assert db.execute_query('select', fetch=True) == [('M001', 'ALICE'), ('M002', 'BOB')]
+    assert conn.cursor_factory is None
+    cols = db.execute_query('select', fetch=True, row_format='columns')
+    assert cols == {'mid': ['M001', 'M002'], 'name': ['ALICE', 'BOB']}
+    db.execute_query('select', fetch=True, row_format='record')
+    assert conn.cursor_factory is database.psycopg2.extras.NamedTupleCursor
+    db.execute_query('select', fetch=True, row_format='dict')
+    assert conn.cursor_factory is database.psycopg2.extras.RealDictCursor
+
+
+def test_execute_query_rejects_unknown_row_format(monkeypatch):
+    monkeypatch.setattr(database.psycopg2, 'connect', lambda **k: DummyConn(DummyCursor()))
+    db = database.Database('db', 'u', 'p')
+    with pytest.raises(ValueError):
+        db.execute_query('select', fetch=True, row_format='xml')
+
+
+class RecordingCursor(DummyCursor):
+    def __init__(self):
+        super().__init__(fetch_result=[(True,)])
+        self.executed = []
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+
+def test_cancel_scope_cancels_only_connections_still_in_use(monkeypatch):
+    created = []
+    def connect(**k):
+        created.append(DummyConn(RecordingCursor()))
+        return created[-1]
+    monkeypatch.setattr(database.psycopg2, 'connect', connect)
+    db = database.Database('db', 'u', 'p', pool_min=0, pool_max=2)
+    scope = database.CancelScope()
+    with db.cancel_scope(scope):
+        with db._connection() as busy:
+            # Sent on the busy connection itself, no second pooled connection
+            assert scope.cancel() is True
+        assert len(created) == 1 and busy.cancelled
+        busy.cancelled = False
+        # Back in the pool, the connection may run another job's statement
+        assert scope.cancel() is False
+    assert not busy.cancelled
+    db.close()
+
+
+def test_cancel_scope_single_connection_sends_cancel_request(monkeypatch):
+    conn = DummyConn(DummyCursor())
+    monkeypatch.setattr(database.psycopg2, 'connect', lambda **k: conn)
+    db = database.Database('db', 'u', 'p')
+    scope = database.CancelScope()
+    with db.cancel_scope(scope), db._connection():
+        assert scope.cancel() is True
+    assert conn.cancelled
+    assert scope.cancel() is False
+
+
+class CountingCursor(DummyCursor):
+    def __init__(self):
+        super().__init__()
+        self.queries = []
+    def execute(self, query, params=None):
+        self.queries.append(query)
+    def fetchall(self):
+        return [(len(self.queries),)]
+
+
+def cached_db(monkeypatch, **kwargs):
+    cursor = CountingCursor()
+    monkeypatch.setattr(database.psycopg2, 'connect', lambda **k: DummyConn(cursor))
+    return database.Database('db', 'u', 'p', cache_size=2, **kwargs), cursor
+
+
+def test_cache_serves_repeated_selects_without_round_trip(monkeypatch):
+    db, cursor = cached_db(monkeypatch)
+    first = db.execute_query('SELECT * FROM  lab_member WHERE mid = %s;', ('M1',), fetch=True, row_format='tuple')
+    again = db.execute_query('SELECT *\n FROM lab_member WHERE mid = %s', ('M1',), fetch=True, row_format='tuple')
+    assert first == again == [(1,)]
+    assert len(cursor.queries) == 1
+    # Different params, row format or cache=False go to the database
+    db.execute_query('SELECT * FROM lab_member WHERE mid = %s;', ('M2',), fetch=True, row_format='tuple')
+    db.execute_query('SELECT * FROM lab_member WHERE mid = %s;', ('M1',), fetch=True, row_format='tuple', cache=False)
+    assert len(cursor.queries) == 3
+    # Function calls without FROM (e.g. refresh_report_views) are never cached
+    db.execute_query('SELECT now();', fetch=True)
+    db.execute_query('SELECT now();', fetch=True)
+    assert len(cursor.queries) == 5
+
+
+def test_cache_invalidates_by_table_and_clears_on_other_writes(monkeypatch):
+    db, cursor = cached_db(monkeypatch)
+    members = 'SELECT mid FROM lab_member;'
+    hours = 'SELECT hours FROM member_week_hours;'
+    db.execute_query(members, fetch=True, row_format='tuple')
+    db.execute_query(hours, fetch=True, row_format='tuple')
+    # WORKS triggers maintain MEMBER_WEEK_HOURS: only that entry is dropped
+    db.execute_query('INSERT INTO works VALUES (%s);', (1,))
+    db.execute_query(members, fetch=True, row_format='tuple')
+    assert len(cursor.queries) == 3
+    db.execute_query(hours, fetch=True, row_format='tuple')
+    assert len(cursor.queries) == 4
+    # UPDATE/DELETE may cascade, so they clear everything
+    db.execute_query('DELETE FROM project WHERE pid = %s;', ('P1',))
+    db.execute_query(members, fetch=True, row_format='tuple')
+    assert len(cursor.queries) == 6
+
+
+def test_cache_evicts_least_recently_used_and_expires(monkeypatch):
+    db, cursor = cached_db(monkeypatch, cache_ttl=0.05)
+    for table in ('a', 'b', 'a', 'c'):
+        db.execute_query(f'SELECT 1 FROM {table};', fetch=True, row_format='tuple')
+    assert len(db.cache) == 2
+    db.execute_query('SELECT 1 FROM a;', fetch=True, row_format='tuple')
+    assert len(cursor.queries) == 3
+    time.sleep(0.1)
+    db.execute_query('SELECT 1 FROM a;', fetch=True, row_format='tuple')
+    assert len(cursor.queries) == 4
+
+
+def test_cache_returns_copies(monkeypatch):
+    db, cursor = cached_db(monkeypatch)
+    rows = db.execute_query('SELECT 1 FROM a;', fetch=True, row_format='tuple')
+    rows.append('mutated')
+    assert db.execute_query('SELECT 1 FROM a;', fetch=True, row_format='tuple') == [(1,)]
+
+
+def test_change_events_invalidate_cache_and_reach_listeners(monkeypatch):
+    db, cursor = cached_db(monkeypatch)
+    seen = []
+    db._listeners.append(seen.append)
+    db.execute_query('SELECT 1 FROM uses;', fetch=True, row_format='tuple')
+    db.execute_query('SELECT 1 FROM project;', fetch=True, row_format='tuple')
+    db._dispatch({'table': 'uses', 'op': 'INSERT', 'key': ['E1', 'M1', '2024-01-01']})
+    assert len(db.cache) == 1
+    db._dispatch({'table': 'project', 'op': 'DELETE', 'key': ['P1']})
+    assert len(db.cache) == 0
+    assert [e['op'] for e in seen] == ['INSERT', 'DELETE']
+
+
+class LostStatementCursor(RecordingCursor):
+    """Raises InvalidSqlStatementName once, as after a DISCARD ALL."""
+    lose_once = True
+    def execute(self, query, params=None):
+        super().execute(query, params)
+        if query.startswith('EXECUTE') and self.lose_once:
+            self.lose_once = False
+            raise database.psycopg2.errors.InvalidSqlStatementName('prepared statement does not exist')
+
+
+def test_prepared_statement_is_prepared_once_per_connection(monkeypatch):
+    cursor = LostStatementCursor()
+    cursor.lose_once = False
+    conn = DummyConn(cursor)
+    monkeypatch.setattr(database.psycopg2, 'connect', lambda **k: conn)
+    db = database.Database('db', 'u', 'p')
+    q = "SELECT name FROM equipment WHERE eid = %s AND name LIKE 'A%%';"
+    db.execute_query(q, ('E1',), fetch=True, prepare='equipment_name')
+    db.execute_prepared('equipment_name', ('E2',), fetch=True)
+    assert cursor.executed == [
+        ("PREPARE equipment_name AS SELECT name FROM equipment WHERE eid = $1 AND name LIKE 'A%'", None),
+        ("EXECUTE equipment_name (%s)", ('E1',)),
+        ("EXECUTE equipment_name (%s)", ('E2',)),
+    ]
+    with pytest.raises(ValueError):
+        db.prepare('equipment_name', 'SELECT 1 FROM equipment;')
+    db.close()
+    assert db._prepared == {}
+
+
+def test_prepared_statement_reprepared_when_session_lost_it(monkeypatch):
+    cursor = LostStatementCursor()
+    monkeypatch.setattr(database.psycopg2, 'connect', lambda **k: DummyConn(cursor))
+    db = database.Database('db', 'u', 'p', pool_min=1, pool_max=1)
+    db.prepare('member_by_mid', 'SELECT * FROM lab_member WHERE mid = %s')
+    db.execute_prepared('member_by_mid', ('M1',), fetch=True)
+    assert [q for q, _ in cursor.executed].count('PREPARE member_by_mid AS SELECT * FROM lab_member WHERE mid = $1') == 2
+    # Discarded connections drop their prepared names
+    conn = db.pool.getconn()
+    db.pool.putconn(conn, discard=True)
+    assert db._prepared == {}
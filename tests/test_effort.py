@@ -0,0 +1,28 @@
+from modules.effort import FULL_TIME_HOURS, grant_fte, project_effort
+
+
+class FakeDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def execute_query(self, query, params=None, fetch=False, row_format=None):
+        self.calls.append((query, params))
+        return self.rows
+
+
+def test_project_effort_pivots_ledger_rows_by_month():
+    db = FakeDB([('M1', 'Ann', 1, 10), ('M1', 'Ann', 3, 5), ('M2', 'Bo', 3, 7)])
+    members, totals = project_effort(db, 'P1')
+    assert db.calls[0][1] == ('P1',)
+    assert 'member_project_month_hours' in db.calls[0][0] and 'works' not in db.calls[0][0]
+    assert members == [('M1', 'Ann', [10, 0, 5] + [0] * 9, 15), ('M2', 'Bo', [0, 0, 7] + [0] * 9, 7)]
+    assert totals == [10, 0, 12] + [0] * 9
+
+
+def test_grant_fte_reads_project_week_totals():
+    db = FakeDB([])
+    grant_fte(db)
+    query, params = db.calls[0]
+    assert params == (FULL_TIME_HOURS,)
+    assert 'project_week_hours' in query and 'works' not in query
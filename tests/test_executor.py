@@ -0,0 +1,100 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from modules.executor import QueryExecutor
+
+
+class FakeWidget:
+    # Records after() callbacks instead of running a Tk event loop
+    def __init__(self):
+        self.scheduled = []
+    def after(self, ms, func):
+        self.scheduled.append(func)
+
+
+class FakeConn:
+    def __init__(self):
+        self.cancelled = 0
+    def cancel(self):
+        self.cancelled += 1
+
+
+class FakeDB:
+    pool = None
+    def __init__(self):
+        self.conn = FakeConn()
+    @contextmanager
+    def cancel_scope(self, scope):
+        # The work runs one statement for the whole job
+        scope._enter(self.conn)
+        try:
+            yield scope
+        finally:
+            scope._exit(self.conn)
+
+
+def drain(widget, executor, timeout=5.0):
+    # Run the scheduled polls until every job has been delivered
+    deadline = time.monotonic() + timeout
+    while widget.scheduled and time.monotonic() < deadline:
+        widget.scheduled.pop(0)()
+        time.sleep(0.01)
+
+
+def test_submit_delivers_result_on_poll_and_toggles_busy():
+    widget, busy, results = FakeWidget(), [], []
+    executor = QueryExecutor(widget, FakeDB(), on_busy=busy.append)
+    executor.submit(lambda: [(1,)], results.append)
+    assert busy == [True]
+    # Nothing is delivered until the Tk thread polls
+    assert results == []
+    drain(widget, executor)
+    assert results == [[(1,)]]
+    assert busy == [True, False]
+    executor.shutdown()
+
+
+def test_submit_reports_errors_to_on_error():
+    widget, errors = FakeWidget(), []
+    executor = QueryExecutor(widget, FakeDB())
+    def fail():
+        raise RuntimeError("boom")
+    executor.submit(fail, lambda rows: None, errors.append)
+    drain(widget, executor)
+    assert [str(e) for e in errors] == ["boom"]
+    executor.shutdown()
+
+
+def test_stream_delivers_batches_in_order_then_done():
+    widget, events = FakeWidget(), []
+    executor = QueryExecutor(widget, FakeDB())
+    def batches():
+        yield [1, 2]
+        yield [3]
+    executor.stream(batches, events.append, lambda: events.append("done"))
+    drain(widget, executor)
+    assert events == [[1, 2], [3], "done"]
+    executor.shutdown()
+
+
+def test_cancel_cancels_running_query_and_skips_callbacks():
+    widget, db, results = FakeWidget(), FakeDB(), []
+    executor = QueryExecutor(widget, db)
+    started, release = threading.Event(), threading.Event()
+    def slow():
+        started.set()
+        release.wait(5)
+        return "late"
+    job = executor.submit(slow, results.append)
+    assert started.wait(5)
+    executor.cancel_all()
+    release.set()
+    drain(widget, executor)
+    assert db.conn.cancelled == 1
+    assert results == []
+    # A late cancel does not reach the connection once the job is done
+    job.cancel()
+    job.scope.cancel()
+    assert db.conn.cancelled == 1
+    executor.shutdown()
@@ -0,0 +1,66 @@
+import argparse
+from collections import defaultdict
+from datetime import date, timedelta
+
+import pytest
+
+import generate
+
+
+def small_lab():
+    return generate.SyntheticLab(members=60, projects=12, grants=5, equipment=7,
+                                 weeks=6, uses=100, publications=20, assignments=3, seed=7)
+
+
+def test_generated_rows_honour_triggers():
+    tables = {k: list(v) for k, v in small_lab().tables().items()}
+    members = tables["LAB_MEMBER"]
+    types = {m[0]: m[2] for m in members}
+    seen = set()
+    for mid, _, _, _, mentor in members:
+        # mentors are Faculty and already inserted when the mentee arrives
+        if mentor is not None:
+            assert types[mentor] == 'Faculty'
+            assert mentor in seen
+        seen.add(mid)
+    assert {r[0] for r in tables["FACULTY"]} == {m for m, t in types.items() if t == 'Faculty'}
+    assert {r[0] for r in tables["STUDENT"]} == {m for m, t in types.items() if t == 'Student'}
+    assert all(types[p[5]] == 'Faculty' for p in tables["PROJECT"])
+
+    hours = defaultdict(int)
+    for pid, mid, week, role, h in tables["WORKS"]:
+        hours[(mid, week)] += h
+    assert max(hours.values()) <= 40
+    assert len(tables["WORKS"]) == 60 * 3 * 6
+
+
+def test_generated_uses_do_not_overlap_per_device():
+    sessions = defaultdict(list)
+    for eid, mid, purpose, start, end in small_lab().uses_rows():
+        sessions[eid].append((start, end))
+    for runs in sessions.values():
+        runs.sort()
+        for (s1, e1), (s2, _) in zip(runs, runs[1:]):
+            assert e1 is not None and e1 < s2
+
+
+def test_generation_is_reproducible():
+    assert list(small_lab().works_rows()) == list(small_lab().works_rows())
+
+
+def test_dates_follow_the_anchor_not_the_clock():
+    rows = list(small_lab().uses_rows())
+    assert rows == list(small_lab().uses_rows())
+    later = generate.SyntheticLab(members=60, projects=12, grants=5, equipment=7, weeks=6, uses=100,
+                                  publications=20, assignments=3, seed=7, anchor=date(2020, 1, 1))
+    shift = date(2020, 1, 1) - generate.ANCHOR_DATE
+    assert [(r[3] + shift) for r in rows] == [r[3] for r in later.uses_rows()]
+
+
+def test_future_anchor_is_rejected():
+    tomorrow = date.today() + timedelta(days=1)
+    with pytest.raises(ValueError, match='in the future'):
+        generate.SyntheticLab(anchor=tomorrow)
+    with pytest.raises(argparse.ArgumentTypeError, match='in the future'):
+        generate.past_date(tomorrow.isoformat())
+    assert generate.past_date('2024-02-29') == date(2024, 2, 29)
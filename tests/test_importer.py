@@ -0,0 +1,90 @@
+import csv
+import json
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from modules.importer import import_rows, read_records
+
+
+class FakeCursor:
+    """Accepts INSERTs unless a row's first value is in `bad`; tracks savepoints."""
+    def __init__(self, bad=()):
+        self.bad = set(bad)
+        self.connection = SimpleNamespace(encoding='UTF8')
+        self.statements = []
+        self.rows = []
+        self._pending = []
+        self._values = []
+
+    def mogrify(self, template, args):
+        # execute_values renders each row through mogrify; keep the values
+        self._values.append(tuple(args))
+        return b'(?)'
+
+    def execute(self, query, params=None):
+        if isinstance(query, bytes):
+            query = query.decode()
+        self.statements.append(query)
+        if query.startswith('SAVEPOINT'):
+            self._pending.append(len(self.rows))
+        elif query.startswith('ROLLBACK TO'):
+            del self.rows[self._pending[-1]:]
+        elif query.startswith('RELEASE'):
+            self._pending.pop()
+        elif query.startswith('INSERT'):
+            values = [params] if params is not None else self._values
+            self._values = []
+            self.rows.extend(values)
+            if any(v[0] in self.bad for v in values):
+                raise Exception(f'duplicate key {values[0][0]}\nDETAIL: ...')
+
+
+class FakeDB:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    @contextmanager
+    def transaction(self):
+        yield self.cursor
+
+
+def member(mid, member_type='student', **extra):
+    record = dict(mid=mid, name=mid.lower(), member_type=member_type, join_date='2024-01-01')
+    record.update(extra)
+    return record
+
+
+def test_import_chunks_and_rejects_only_failing_rows(tmp_path):
+    cur = FakeCursor(bad={'M3'})
+    records = [(i + 2, member(f'M{i}')) for i in range(5)]
+    records.append((7, member('M9', join_date='01/02/2024')))
+    rejected = tmp_path / 'rejected.csv'
+    result = import_rows(FakeDB(cur), 'members', records, chunk_size=2, rejected_path=str(rejected))
+
+    assert result.inserted == 4
+    assert [r[0] for r in cur.rows] == ['M0', 'M1', 'M2', 'M4']
+    assert [(line, error) for line, _, error in result.rejected] == [
+        (5, 'duplicate key M3'), (7, "'01/02/2024' is not a YYYY-MM-DD date")]
+    # Three multi-row INSERTs; only the failing chunk is retried row by row
+    assert sum(1 for s in cur.statements if s.startswith('INSERT') and '(?)' in s) == 3
+    with open(rejected, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [(r['line'], r['mid']) for r in rows] == [('5', 'M3'), ('7', 'M9')]
+
+
+def test_import_normalises_values_and_inserts_faculty_first():
+    cur = FakeCursor()
+    records = [(2, member('s1', mentor_mid='f1')), (3, member('f1', 'FACULTY'))]
+    import_rows(FakeDB(cur), 'members', records)
+    assert [r[:3] for r in cur.rows] == [('F1', 'F1', 'Faculty'), ('S1', 'S1', 'Student')]
+    assert cur.rows[1][4] == 'F1'
+
+
+def test_read_records_maps_headers_from_csv_and_json(tmp_path):
+    path = tmp_path / 'equipment.csv'
+    path.write_text('EID,Name,Type,Status,Purchase Date\nE1,Scope,Optics,Available,2023-05-01\n')
+    assert read_records(str(path)) == [(2, {'eid': 'E1', 'name': 'Scope', 'type': 'Optics',
+                                            'status': 'Available', 'pur_date': '2023-05-01'})]
+    path = tmp_path / 'usage.json'
+    path.write_text(json.dumps([{'EID': 'E1', 'MID': 'M1', 'Purpose': 'null'}]))
+    assert read_records(str(path)) == [(1, {'eid': 'E1', 'mid': 'M1', 'purpose': 'null'})]
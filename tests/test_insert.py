@@ -0,0 +1,43 @@
+import insert
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+        self.copied = []
+        self.rowcount = 0
+    def execute(self, query, params=None):
+        self.statements.append(query)
+    def copy_expert(self, sql, buf):
+        self.copied.append((sql, buf.read()))
+
+
+def test_copy_value_escapes_text_format():
+    assert insert._copy_value(None) == '\\N'
+    assert insert._copy_value('a\tb\nc\\d') == 'a\\tb\\nc\\\\d'
+    assert insert._copy_value(40) == '40'
+
+
+def test_copy_rows_streams_chunks_and_merges():
+    cur = RecordingCursor()
+    rows = (('PR001', 'M%03d' % i, 1, 'ANALYST', 5) for i in range(5))
+    insert.copy_rows(cur, 'WORKS', ('PID', 'MID', 'WEEK', 'ROLE', 'HOURS'), ('PID', 'MID', 'WEEK'), rows, chunk_size=2)
+    assert len(cur.copied) == 3
+    assert cur.copied[0][1] == 'PR001\tM000\t1\tANALYST\t5\nPR001\tM001\t1\tANALYST\t5\n'
+    merge = [s for s in cur.statements if s.startswith('INSERT INTO WORKS')]
+    assert merge and 'ON CONFLICT (PID,MID,WEEK) DO NOTHING' in merge[0]
+    assert 'ORDER BY' not in merge[0]
+
+
+def test_copy_rows_keeps_lab_member_order():
+    cur = RecordingCursor()
+    insert.copy_rows(cur, 'LAB_MEMBER', ('MID', 'NAME', 'MEMBER_TYPE', 'JOIN_DATE', 'MENTOR_MID'), ('MID',),
+                     [('F001', 'A', 'Faculty', '2020-01-01', None)])
+    assert any('seed_ord' in s for s in cur.statements if s.startswith('INSERT INTO LAB_MEMBER'))
+
+
+def test_seed_rows_mentors_are_seeded_faculty():
+    rows = insert.seed_rows()
+    faculty = {r[0] for r in rows['LAB_MEMBER'] if r[2] == 'Faculty'}
+    mentors = {r[4] for r in rows['LAB_MEMBER'] if r[4] is not None}
+    assert mentors <= faculty
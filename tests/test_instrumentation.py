@@ -0,0 +1,50 @@
+import database
+from instrumentation import QueryMetrics, caller_tag, result_size
+from tests.test_database import DummyConn, RecordingCursor
+
+
+def test_record_buckets_and_exports():
+    m = QueryMetrics(buckets=(0.01, 0.1))
+    m.record('members:refresh', 'SELECT *\n  FROM lab_member;', 0.005, rows=3, nbytes=30)
+    m.record('members:refresh', 'SELECT * FROM lab_member', 0.05, rows=3, nbytes=30)
+    m.record('equipment:show_status', 'SELECT 1 FROM equipment', 2.0, error=True)
+
+    data = m.to_json()
+    assert data['queries'][0]['caller'] == 'equipment:show_status'
+    members = data['queries'][1]
+    assert (members['query'], members['count'], members['rows'], members['bytes']) == \
+        ('SELECT * FROM lab_member', 2, 6, 60)
+    assert members['buckets'] == {'0.01': 1, '0.1': 1, '+Inf': 0}
+
+    text = m.to_prometheus()
+    assert 'lab_query_duration_seconds_bucket{caller="members:refresh",le="0.1"} 2' in text
+    assert 'lab_query_duration_seconds_bucket{caller="equipment:show_status",le="+Inf"} 1' in text
+    assert 'lab_query_errors_total{caller="equipment:show_status"} 1' in text
+
+
+def test_caller_tag_and_result_size():
+    def show_status():
+        return caller_tag(depth=1)
+    assert show_status() == 'test_instrumentation:test_caller_tag_and_result_size.show_status'
+    assert result_size([('ab', None, 12)]) == 4
+    assert result_size({'mid': ['M1', 'M22']}) == 5
+
+
+class PlanCursor(RecordingCursor):
+    def fetchall(self):
+        return [('Seq Scan on lab_member',)]
+
+
+def test_slow_reads_capture_explain_plan(monkeypatch):
+    cursor = PlanCursor()
+    monkeypatch.setattr(database.psycopg2, 'connect', lambda **k: DummyConn(cursor))
+    db = database.Database('db', 'u', 'p', metrics=QueryMetrics(slow_threshold=0.0))
+    db.execute_query('SELECT * FROM lab_member WHERE mid = %s', ('M1',), fetch=True, tag='members')
+    db.execute_query('UPDATE lab_member SET name = %s', ('X',))
+    assert cursor.executed[1] == ('EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM lab_member WHERE mid = %s', ('M1',))
+    # Writes are timed but never re-run under EXPLAIN ANALYZE
+    assert len(cursor.executed) == 3
+    slow = list(db.metrics.slow_log)
+    assert [(s['caller'], s['plan']) for s in slow] == [
+        ('members', 'Seq Scan on lab_member'),
+        ('test_instrumentation:test_slow_reads_capture_explain_plan', None)]
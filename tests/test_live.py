@@ -0,0 +1,52 @@
+from modules.live import LiveChanges
+
+
+class FakeWidget:
+    def __init__(self):
+        self.scheduled = []
+    def after(self, ms, func):
+        self.scheduled.append(func)
+        return len(self.scheduled)
+    def after_cancel(self, after_id):
+        self.scheduled.clear()
+
+
+class ListenerDB:
+    def __init__(self):
+        self.listeners = []
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+        return callback
+    def remove_listener(self, callback):
+        self.listeners.remove(callback)
+    def notify(self, event):
+        # Called from the listener thread in the real Database
+        for callback in self.listeners:
+            callback(event)
+
+
+def test_events_reach_table_handlers_on_poll():
+    widget, db, seen = FakeWidget(), ListenerDB(), []
+    live = LiveChanges(widget, db)
+    live.on('uses', lambda op, key: seen.append((op, key)))
+    db.notify({'table': 'uses', 'op': 'INSERT', 'key': ['E1', 'M1', '2024-01-01']})
+    db.notify({'table': 'project', 'op': 'DELETE', 'key': ['P1']})
+    assert seen == []
+    widget.scheduled.pop(0)()
+    assert seen == [('INSERT', ['E1', 'M1', '2024-01-01'])]
+    live.close()
+    assert db.listeners == [] and widget.scheduled == []
+
+
+def test_bursts_and_reconnects_become_reloads():
+    widget, db, seen = FakeWidget(), ListenerDB(), []
+    live = LiveChanges(widget, db, max_batch=2)
+    live.on('lab_member', lambda op, key: seen.append((op, key)))
+    for i in range(3):
+        db.notify({'table': 'lab_member', 'op': 'UPDATE', 'key': [f'M{i}']})
+    widget.scheduled.pop(0)()
+    assert seen == [('RELOAD', None)]
+    db.notify({'table': None, 'op': 'RELOAD', 'key': None})
+    widget.scheduled.pop(0)()
+    assert seen == [('RELOAD', None), ('RELOAD', None)]
+    live.close()
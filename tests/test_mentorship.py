@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+from modules.mentorship import MentorshipGraph
+
+
+class FakeDB:
+    def __init__(self, members):
+        self.members = members
+        self.cache = SimpleNamespace(generation=0)
+        self.loads = 0
+
+    def execute_query(self, query, params=None, fetch=False, row_format=None, cache=True):
+        self.loads += 1
+        return list(self.members)
+
+
+MEMBERS = [
+    ('F1', 'Faculty 1', None),
+    ('F2', 'Faculty 2', None),
+    ('S3', 'Student 3', 'F1'),
+    ('S1', 'Student 1', 'F1'),
+    ('S2', 'Student 2', 'S1'),
+    # X1 and X2 mentor each other
+    ('X1', 'Loop 1', 'X2'),
+    ('X2', 'Loop 2', 'X1'),
+]
+
+
+def test_subtree_is_depth_first_and_lineage_reaches_root():
+    graph = MentorshipGraph(FakeDB(MEMBERS))
+    assert graph.subtree('F1') == [
+        ('F1', 'Faculty 1', None, 0), ('S1', 'Student 1', 'F1', 1),
+        ('S2', 'Student 2', 'S1', 2), ('S3', 'Student 3', 'F1', 1)]
+    assert graph.lineage('S2') == [('S2', 'Student 2', 0), ('S1', 'Student 1', 1), ('F1', 'Faculty 1', 2)]
+    assert graph.subtree('NOPE') == []
+
+
+def test_cycles_end_the_walk():
+    graph = MentorshipGraph(FakeDB(MEMBERS))
+    assert [r[0] for r in graph.subtree('X1')] == ['X1', 'X2']
+    assert [r[0] for r in graph.lineage('X1')] == ['X1', 'X2']
+
+
+def test_depth_stats_per_root():
+    graph = MentorshipGraph(FakeDB(MEMBERS))
+    assert graph.depth_stats() == [
+        ('F1', 'Faculty 1', 2, 3, 2, 1.33), ('F2', 'Faculty 2', 0, 0, 0, None)]
+
+
+def test_adjacency_is_cached_until_the_query_cache_is_invalidated():
+    db = FakeDB(MEMBERS)
+    graph = MentorshipGraph(db)
+    graph.subtree('F1')
+    graph.lineage('S2')
+    assert db.loads == 1
+    db.cache.generation += 1
+    graph.subtree('F1')
+    assert db.loads == 2
@@ -12,7 +12,7 @@ class FakeDB:
         self.raise_on = raise_on or set()
         self.executed = []
 
-    def execute_query(self, query, params=None, fetch=False):
+    def execute_query(self, query, params=None, fetch=False, **kwargs):
         self.executed.append((query, params, fetch))
         if any(r in query for r in self.raise_on):
             raise Exception("forced error")
@@ -22,6 +22,17 @@ class FakeDB:
         # default: empty list for fetch, True otherwise
         return [] if fetch else True
 
+    def add_listener(self, callback):
+        return callback
+
+    def remove_listener(self, callback):
+        return None
+
+    def stream_query(self, query, params=None, itersize=2000, **kwargs):
+        rows = self.execute_query(query, params, fetch=True)
+        for i in range(0, len(rows), itersize):
+            yield rows[i:i + itersize]
+
 
 # Minimal dummy tkinter/ttk components used by the menus
 class DummyWidget:
@@ -56,6 +67,13 @@ class DummyWidget:
     def wait_window(self):
         # do not block in tests
         return None
+    def update_idletasks(self):
+        return None
+    def after(self, ms, func=None, *args):
+        # Timers never fire in tests
+        return 'after#1'
+    def after_cancel(self, id):
+        return None
 
 class DummyEntry(DummyWidget):
     def __init__(self, *a, **k):
@@ -90,13 +108,20 @@ class DummyTreeview(DummyWidget):
         return None
     def column(self, *a, **k):
         return None
-    def insert(self, parent, index, values=None, tags=None):
+    def insert(self, parent, index, values=None, tags=None, iid=None):
         self._rows.append(values)
-        return 'id'
+        return len(self._rows) - 1
     def get_children(self):
         return list(range(len(self._rows)))
-    def item(self, child, option=None):
+    def exists(self, iid):
+        return False
+    def item(self, child, option=None, **k):
+        if 'values' in k:
+            self._rows[child] = k['values']
+            return None
         return { 'values': self._rows[child] }
+    def bind(self, *a, **k):
+        return None
     def delete(self, child):
         # accept anything
         return None
@@ -212,18 +237,48 @@ def test_projects_menu_and_helpers(patch_tkinter):
 
 def test_reporting_menu_queries(patch_tkinter):
     import modules.reporting as reporting_mod
-    # Prepare fake rows as list of dicts and tuples to exercise both branches
-    rows_publishers = [ {'mid':'M001','name':'ALICE','pubs':3}, {'mid':'M002','name':'BOB','pubs':1} ]
-    rows_avg = [ {'major':'CS','pubs':4,'students':2} ]
-    rows_top3 = [ {'member_mid':'M001','pubs':5} ]
-    rows_grants = [ {'gid':'G001','source':'AGENCY','budget':1000,'start_date':None,'duration':12} ]
+    # The reporting queries request row_format="tuple", so rows are tuples
+    rows_publishers = [ ('M001','ALICE',3) ]
+    rows_avg = [ ('CS',4,2) ]
+    rows_top3 = [ ('M001',5) ]
+    rows_grants = [ ('G001','AGENCY',1000,None,12) ]
     rows_pubs = [ ('PUB001','TITLE','VENUE','2020-01-01','DOI-1') ]
     fake_db = FakeDB(responses={
-        'published': rows_publishers,
-        'FROM student': rows_avg,
-        'FROM works': rows_top3,
+        'FROM report_member_publications': rows_publishers,
+        'FROM report_major_publications': rows_avg,
+        'FROM report_grant_member_publications': rows_top3,
         'FROM grants': rows_grants,
         'FROM publication': rows_pubs,
     })
     reporting_mod.reporting_menu(fake_db)
 
+
+class MissingView(Exception):
+    pgcode = '42P01'
+
+
+def test_read_report_falls_back_to_live_query_without_views():
+    import modules.reports as reports_mod
+    from datetime import datetime, timezone
+    live = [('M001', 'ALICE', 3)]
+    class ViewlessDB(FakeDB):
+        def execute_query(self, query, params=None, fetch=False, **kwargs):
+            if 'report_member_publications' in query:
+                raise MissingView()
+            return super().execute_query(query, params, fetch, **kwargs)
+    rows, status = reports_mod.read_report(
+        ViewlessDB(responses={'FROM lab_member lm': live}), 'report_member_publications',
+        reports_mod.TOP_PUBLISHERS_VIEW_SQL, reports_mod.TOP_PUBLISHERS_LIVE_SQL,
+    )
+    assert rows == live and status is None
+    assert reports_mod.freshness(None).startswith('Live data')
+
+    as_of = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    rows, status = reports_mod.read_report(
+        FakeDB(responses={'FROM report_member_publications': live, 'report_view_state': [(as_of, 2)]}),
+        'report_member_publications',
+        reports_mod.TOP_PUBLISHERS_VIEW_SQL, reports_mod.TOP_PUBLISHERS_LIVE_SQL,
+    )
+    assert rows == live and status == (as_of, 2)
+    assert '2 change(s) not yet included' in reports_mod.freshness(status)
+
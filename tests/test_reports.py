@@ -0,0 +1,86 @@
+import json
+import threading
+
+import pytest
+
+from modules.reports import REPORTS, run_report, run_reports
+from report import write_csv, write_json
+
+
+class FakeDB:
+    def __init__(self, responses):
+        # responses: query substring -> rows
+        self.responses = responses
+        self.threads = set()
+
+    def execute_query(self, query, params=None, fetch=False, row_format=None, **kwargs):
+        self.threads.add(threading.get_ident())
+        for k, v in self.responses.items():
+            if k in query:
+                if isinstance(v, Exception):
+                    raise v
+                return v
+        return []
+
+
+def test_reports_aggregate_their_rows():
+    db = FakeDB({
+        'FROM report_member_publications': [('M1', 'Ann', 3), ('M2', 'Bo', 3)],
+        'report_view_state': [],
+        'FROM report_major_publications': [('CS', 5, 2), ('EE', 0, 0)],
+        'FROM project p': [(4,)],
+    })
+    assert run_report(db, 'top_publishers').rows == [('M1', 'Ann', 3), ('M2', 'Bo', 3)]
+    result = run_report(db, 'student_publications')
+    assert result.records()[0] == {'major': 'CS', 'pubs': 5, 'students': 2, 'average': 2.5}
+    assert result.rows[1] == ('EE', 0, 0, 0)
+    assert run_report(db, 'grant_active_projects', gid='G1', start='2024-01-01', end='2024-06-30').rows == [
+        ('G1', '2024-01-01', '2024-06-30', 4)]
+    with pytest.raises(ValueError, match='needs gid'):
+        run_report(db, 'members_by_grant')
+    with pytest.raises(ValueError, match='Unknown report'):
+        run_report(db, 'nope')
+
+
+def test_run_reports_runs_each_report_on_a_worker():
+    db = FakeDB({'FROM grants': [('G1', 'NSF', 100, None, 12)], 'FROM lab_member lm': [('M1', 'Ann')]})
+    db.responses['FROM publication'] = RuntimeError('connection lost')
+    results = {name: result for name, result, _ in
+               run_reports(db, ['grants', 'members_by_grant', 'publications'], {'gid': 'G1'}, max_workers=3)}
+    assert results['grants'].rows == [('G1', 'NSF', 100, None, 12)]
+    assert results['members_by_grant'].columns == REPORTS['members_by_grant'].columns
+    # A failed report is reported, the others still finish
+    assert isinstance(results['publications'], RuntimeError)
+    assert threading.get_ident() not in db.threads
+    with pytest.raises(ValueError, match='needs gid'):
+        list(run_reports(db, ['grants', 'members_by_grant']))
+
+
+def test_writers_keep_columns_and_convert_values(tmp_path):
+    from datetime import date
+    from decimal import Decimal
+    result = run_report(FakeDB({'FROM grants': [('G1', 'NSF', Decimal('100.50'), date(2024, 1, 1), 12)]}), 'grants')
+    write_csv(result, tmp_path / 'grants.csv')
+    assert (tmp_path / 'grants.csv').read_text().splitlines() == [
+        'gid,source,budget,start_date,duration', 'G1,NSF,100.50,2024-01-01,12']
+    write_json(result, tmp_path / 'grants.json')
+    data = json.loads((tmp_path / 'grants.json').read_text())
+    assert data['rows'] == [{'gid': 'G1', 'source': 'NSF', 'budget': 100.5, 'start_date': '2024-01-01', 'duration': 12}]
+
+
+def test_reports_run_without_tkinter():
+    import os
+    import subprocess
+    import sys
+    # A server without Tk: importing tkinter fails
+    code = (
+        "import sys; sys.modules['tkinter'] = None\n"
+        "from report import REPORTS\n"
+        "class DB:\n"
+        "    def execute_query(self, *a, **k): return [('G1', 1, 2, 80, 1.0)]\n"
+        "print(REPORTS['grant_fte'].run(DB()).rows)\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=root)
+    assert out.returncode == 0, out.stderr
+    assert "('G1', 1, 2, 80, 1.0)" in out.stdout
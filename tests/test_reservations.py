@@ -0,0 +1,117 @@
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+
+from modules.reservations import BookingConflict, IntervalIndex, book, book_recurring
+
+
+D = date(2030, 1, 1)
+
+
+def day(n):
+    return D + timedelta(days=n)
+
+
+def index():
+    idx = IntervalIndex()
+    # E1 busy on days 2-3 and 5-7; E2 busy from day 1 with no end
+    idx.add('E1', day(5), day(8))
+    idx.add('E1', day(2), day(4))
+    idx.add('E2', day(1), None)
+    idx.add('E3', day(0), day(0))
+    return idx
+
+
+def test_conflicts_use_half_open_ranges():
+    idx = index()
+    assert idx.conflicts('E1', day(0), day(2)) == []
+    assert idx.conflicts('E1', day(3), day(6)) == [(day(2), day(4)), (day(5), day(8))]
+    assert idx.is_free('E1', day(4), day(5))
+    assert idx.conflicts('E2', day(100), day(101)) == [(day(1), None)]
+    # Empty ranges occupy nothing
+    assert idx.is_free('E3', day(0), day(1))
+
+
+def test_next_free_skips_busy_runs():
+    idx = index()
+    assert idx.next_free('E1', 2, day(0)) == day(0)
+    assert idx.next_free('E1', 1, day(2)) == day(4)
+    assert idx.next_free('E1', 2, day(2)) == day(8)
+    assert idx.next_free('E2', 1, day(0)) == day(0)
+    assert idx.next_free('E2', 2, day(0)) is None
+    assert idx.next_free_slot(3, day(2)) == ('E3', day(2))
+    idx.remove('E1', day(5))
+    assert idx.next_free('E1', 2, day(2)) == day(4)
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.connection = type('Conn', (), {'encoding': 'UTF8'})()
+
+    def mogrify(self, template, args):
+        self.db.inserted.append(tuple(args))
+        return b'(?)'
+
+    def execute(self, query, params=None):
+        pass
+
+
+class ExclusionError(Exception):
+    pgcode = '23P01'
+
+
+class FakeDB:
+    """USES holding `sessions` (eid, start, end); INSERTs that overlap fail with 23P01."""
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.inserted = []
+
+    def execute_query(self, query, params=None, fetch=False, **kwargs):
+        if query.startswith('INSERT'):
+            eid, _, _, start, end = params
+            if not IntervalIndex.load(self, [eid]).is_free(eid, start, end):
+                raise ExclusionError('conflicting key value violates exclusion constraint')
+            self.inserted.append(params)
+            return None
+        if 'ANY' in query:
+            eids, since = params
+            return [s for s in self.sessions if s[0] in eids and (s[2] is None or s[2] > since)]
+        eid, start, end = params
+        idx = IntervalIndex()
+        for s in self.sessions:
+            idx.add(*s)
+        return [('M1', s, e) for s, e in idx.conflicts(eid, start, end)]
+
+    @contextmanager
+    def transaction(self):
+        yield FakeCursor(self)
+
+
+def test_book_reports_conflicting_sessions():
+    db = FakeDB([('E1', day(2), day(4))])
+    with pytest.raises(BookingConflict) as err:
+        book(db, 'E1', 'M2', None, day(3), day(5))
+    assert err.value.conflicts == [('M1', day(2), day(4))]
+    book(db, 'E1', 'M2', None, day(4), day(5))
+    assert db.inserted == [('E1', 'M2', None, day(4), day(5))]
+
+
+def test_book_recurring_all_or_free_slots():
+    db = FakeDB([('E1', day(7), day(8))])
+    with pytest.raises(BookingConflict):
+        book_recurring(db, 'E1', 'M2', None, day(0), 2, count=3)
+    assert db.inserted == []
+    booked, taken = book_recurring(db, 'E1', 'M2', None, day(0), 2, count=3, skip_conflicts=True)
+    assert booked == [(day(0), day(2)), (day(14), day(16))]
+    assert taken == [(day(7), day(9))]
+    assert [row[3] for row in db.inserted] == [day(0), day(14)]
+
+
+def test_book_recurring_single_slot_may_outlast_the_interval():
+    db = FakeDB([])
+    booked, _ = book_recurring(db, 'E1', 'M1', None, day(0), 10, count=1)
+    assert booked == [(day(0), day(10))]
+    with pytest.raises(ValueError):
+        book_recurring(db, 'E1', 'M1', None, day(0), 10, count=2)
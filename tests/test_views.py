@@ -0,0 +1,15 @@
+import views
+
+
+def test_every_source_trigger_targets_a_defined_view():
+    for table, names in views.VIEW_SOURCES.items():
+        assert names and all(name in views.VIEWS for name in names)
+    ddl = views.source_triggers()
+    assert len(ddl) == 2 * len(views.VIEW_SOURCES)
+    assert "note_report_view_change('report_grant_member_publications')" in ddl[-1]
+
+
+def test_every_view_has_a_unique_index_for_concurrent_refresh():
+    for name, (definition, indexes) in views.VIEWS.items():
+        assert f"IF NOT EXISTS {name} AS" in definition
+        assert any(ddl.startswith("CREATE UNIQUE INDEX IF NOT EXISTS") and f" ON {name} (" in ddl for ddl in indexes)
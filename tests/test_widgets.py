@@ -0,0 +1,248 @@
+from modules.widgets import VirtualTable
+
+
+class PagedDB:
+    """Serves a sorted in-memory table through the SQL VirtualTable issues."""
+    def __init__(self, n):
+        self.rows = [(f'M{i:05}', f'NAME {i}') for i in range(n)]
+        self.queries = []
+        # Key order of the database's collation
+        self.order = lambda key: key
+    def execute_query(self, query, params=None, fetch=False, row_format=None):
+        self.queries.append((query, params))
+        if 'WHERE mid < %s' in query:
+            return [(sum(self.order(r[0]) < self.order(params[0]) for r in self.rows),)]
+        if query.startswith('SELECT COUNT(*)'):
+            return [(len(self.rows),)]
+        if 'WHERE mid > %s' in query:
+            last, limit = params
+            return [r for r in self.rows if self.order(r[0]) > self.order(last)][:limit]
+        if 'WHERE mid = %s' in query:
+            return [r for r in self.rows if r[0] == params[0]]
+        if 'OFFSET' in query:
+            limit, offset = params
+            return self.rows[offset:offset + limit]
+        return self.rows[:params[0]]
+
+
+class FakeTree:
+    def __init__(self):
+        self.items = {}
+        self.next_id = 0
+        self.widths = {}
+    def configure(self, **k):
+        pass
+    def bind(self, *a, **k):
+        pass
+    def column(self, col, width=None):
+        self.widths[col] = width
+    def insert(self, parent, index, values=None, tags=None):
+        self.next_id += 1
+        self.items[self.next_id] = values
+        return self.next_id
+    def item(self, iid, values=None, tags=None):
+        self.items[iid] = values
+    def delete(self, iid):
+        del self.items[iid]
+
+
+class FakeScrollbar:
+    def configure(self, **k):
+        pass
+    def set(self, first, last):
+        self.range = (first, last)
+
+
+class FakeJob:
+    def __init__(self, work, on_done, on_error):
+        self.work, self.on_done, self.on_error = work, on_done, on_error
+        self.cancelled = False
+        self.done = False
+
+
+class FakeExecutor:
+    """Holds submitted work until run() plays the worker and the Tk poll."""
+    def __init__(self):
+        self.jobs = []
+    def submit(self, work, on_done=None, on_error=None):
+        self.jobs.append(FakeJob(work, on_done, on_error))
+        return self.jobs[-1]
+    def run(self):
+        while self.jobs:
+            job = self.jobs.pop(0)
+            job.done = True
+            if job.cancelled:
+                continue
+            try:
+                result = job.work()
+            except Exception as e:
+                job.on_error(e)
+            else:
+                job.on_done(result)
+
+
+def make_table(n, **kw):
+    db, tree, sb = PagedDB(n), FakeTree(), FakeScrollbar()
+    table = VirtualTable(tree, sb, db, 'lab_member', ('mid', 'name'), key='mid',
+                         headings=('MID', 'Name'), page_size=10, visible_rows=4, **kw)
+    table.refresh()
+    return table, db, tree, sb
+
+
+def test_only_visible_rows_become_tree_items():
+    table, db, tree, sb = make_table(1000)
+    assert list(tree.items.values()) == db.rows[:4]
+    assert sb.range == (0.0, 4 / 1000)
+    table.yview('scroll', 2, 'pages')
+    assert len(tree.items) == 4
+    assert list(tree.items.values()) == db.rows[8:12]
+
+
+def test_sequential_pages_use_keyset_pagination():
+    table, db, tree, sb = make_table(1000)
+    table.scroll_to(15)
+    assert 'WHERE mid > %s' in db.queries[-1][0]
+    assert db.queries[-1][1] == ('M00009', 10)
+    table.scroll_to(26)
+    assert 'WHERE mid > %s' in db.queries[-1][0]
+    assert db.queries[-1][1] == ('M00019', 10)
+
+
+def test_far_jump_locates_page_by_offset_then_continues_by_key():
+    table, db, tree, sb = make_table(1000)
+    table.yview('moveto', '0.5')
+    assert 'OFFSET' in db.queries[-1][0]
+    assert list(tree.items.values()) == db.rows[500:504]
+    table.scroll_to(508)
+    assert 'WHERE mid > %s' in db.queries[-1][0]
+
+
+def test_short_table_and_column_widths_from_sample():
+    table, db, tree, sb = make_table(2)
+    assert list(tree.items.values()) == db.rows
+    assert sb.range == (0.0, 1.0)
+    assert tree.widths == {'MID': 80, 'Name': 80}
+
+
+def test_page_cache_is_bounded():
+    table, db, tree, sb = make_table(1000, cached_pages=3)
+    for offset in range(0, 200, 10):
+        table.scroll_to(offset)
+    assert len(table._pages) == 3
+
+
+def test_apply_change_patches_updated_row_in_place():
+    table, db, tree, sb = make_table(1000)
+    db.rows[2] = ('M00002', 'RENAMED')
+    before = len(db.queries)
+    table.apply_change('UPDATE', ['M00002'])
+    assert len(db.queries) == before + 1
+    assert ('M00002', 'RENAMED') in tree.items.values()
+
+
+def test_apply_change_insert_and_delete_only_reread_later_pages():
+    table, db, tree, sb = make_table(1000)
+    table.scroll_to(15)
+    table.scroll_to(25)
+    db.rows.insert(26, ('M00025a', 'NEW'))
+    before = len(db.queries)
+    table.apply_change('INSERT', ['M00025a'])
+    assert table.total == 1001
+    # The new key's position (by the database's ordering) picks its page:
+    # earlier pages are kept and the page holding it is re-read by keyset
+    assert 0 in table._pages and 1 in table._pages
+    assert db.queries[before:] == [(table._position_sql, ('M00025a',)), (table._keyset_sql, ('M00019', 10))]
+    assert list(tree.items.values()) == db.rows[25:29]
+
+    del db.rows[26]
+    before = len(db.queries)
+    table.apply_change('DELETE', ['M00025a'])
+    assert table.total == 1000
+    # A cached row needs no lookup to find its page
+    assert table._position_sql not in [q for q, _ in db.queries[before:]]
+    assert list(tree.items.values()) == db.rows[25:29]
+
+
+def test_apply_change_uses_the_database_order_not_python_comparison():
+    # A case-insensitive collation, unlike Python's str order
+    table, db, tree, sb = make_table(0)
+    db.order = str.lower
+    db.rows = sorted([(f'k{i:02}', 'x') for i in range(15)] + [(f'K{i:02}x', 'y') for i in range(15)],
+                     key=lambda r: r[0].lower())
+    table.refresh()
+    table.scroll_to(25)
+    assert set(table._pages) == {0, 2}
+    # 'k105' lands at row 21 here, but Python sorts it after every 'K..' key,
+    # including the last key of page 2
+    db.rows.insert(21, ('k105', 'new'))
+    table.apply_change('INSERT', ['k105'])
+    # Page 2 now holds the new row: it is re-read, page 0 is kept
+    assert set(table._pages) == {0, 2}
+    assert table._pages[2] == db.rows[20:30]
+
+
+def test_with_an_executor_pages_are_read_off_the_tk_thread():
+    executor, errors = FakeExecutor(), []
+    table, db, tree, sb = make_table(1000, executor=executor, on_error=errors.append)
+    assert db.queries == [] and tree.items == {}
+    executor.run()
+    assert list(tree.items.values()) == db.rows[:4]
+
+    before = len(db.queries)
+    table.yview('moveto', '0.5')
+    # Only the scrollbar moves until the page arrives
+    assert len(db.queries) == before
+    assert list(tree.items.values()) == db.rows[:4]
+    assert sb.range == (0.5, 504 / 1000)
+    # Scrolling within the page being read does not read it twice
+    table.scroll_to(501)
+    assert len(executor.jobs) == 1
+    executor.run()
+    assert list(tree.items.values()) == db.rows[501:505]
+    assert errors == []
+
+
+def test_with_an_executor_late_and_cancelled_reads_are_not_kept():
+    executor = FakeExecutor()
+    table, db, tree, sb = make_table(1000, executor=executor)
+    executor.run()
+    table.scroll_to(500)
+    # Cancelled (Cancel button): the page is read again on the next render
+    executor.jobs[0].cancelled = True
+    executor.run()
+    assert 50 not in table._pages
+    table.scroll_to(501)
+    # The worker reads the page, but its result is delivered only after a
+    # refresh that sees a newer row: the late rows are not kept
+    late = executor.jobs.pop()
+    rows = late.work()
+    db.rows[501] = ('M00501', 'RENAMED')
+    table.refresh()
+    executor.run()
+    late.on_done(rows)
+    assert list(tree.items.values()) == db.rows[501:505]
+    assert table._pages[50] == db.rows[500:510]
+
+
+def test_with_an_executor_changes_are_looked_up_on_a_worker():
+    executor, errors = FakeExecutor(), []
+    table, db, tree, sb = make_table(1000, executor=executor, on_error=errors.append)
+    executor.run()
+    db.rows.insert(600, ('M00599a', 'NEW'))
+    before = len(db.queries)
+    table.apply_change('INSERT', ['M00599a'])
+    assert len(db.queries) == before and len(executor.jobs) == 1
+    executor.run()
+    assert db.queries[before:] == [(table._position_sql, ('M00599a',))]
+    assert table.total == 1001 and 0 in table._pages
+
+    db.rows[1] = ('M00001', 'RENAMED')
+    table.apply_change('UPDATE', ['M00001'])
+    assert ('M00001', 'RENAMED') not in tree.items.values()
+    executor.run()
+    assert ('M00001', 'RENAMED') in tree.items.values()
+
+    db.execute_query = lambda *a, **k: 1 / 0
+    table.scroll_to(900)
+    executor.run()
+    assert len(errors) == 1
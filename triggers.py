@@ -40,118 +40,414 @@ EXECUTE FUNCTION check_mentor_faculty();
 
 -- ============================
 -- 2. STUDENT / FACULTY / COLLABORATOR: enforce subtype consistency
+--    Statement-level: each INSERT / UPDATE checks its whole batch of new
+--    rows with one anti-join against LAB_MEMBER, so bulk loads do not pay a
+--    lookup per row. The first offending row is reported.
 -- ============================
 
 -- STUDENT
 CREATE OR REPLACE FUNCTION check_student_type()
 RETURNS TRIGGER AS $$
-DECLARE memberType VARCHAR(20);
+DECLARE bad RECORD;
 BEGIN
-    SELECT member_type INTO memberType FROM lab_member WHERE mid = NEW.mid;
-    IF memberType IS NULL THEN
-        RAISE EXCEPTION 'Member % does not exist in LAB_MEMBER.', NEW.mid;
-    ELSIF memberType <> 'Student' THEN
-        RAISE EXCEPTION 'Member % is not of type Student in LAB_MEMBER.', NEW.mid;
+    SELECT n.mid, lm.member_type INTO bad
+    FROM new_rows n
+    LEFT JOIN lab_member lm ON lm.mid = n.mid
+    WHERE lm.mid IS NULL OR lm.member_type <> 'Student'
+    LIMIT 1;
+    IF FOUND THEN
+        IF bad.member_type IS NULL THEN
+            RAISE EXCEPTION 'Member % does not exist in LAB_MEMBER.', bad.mid;
+        ELSE
+            RAISE EXCEPTION 'Member % is not of type Student in LAB_MEMBER.', bad.mid;
+        END IF;
     END IF;
-    RETURN NEW;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS trg_check_student_type ON student;
-CREATE TRIGGER trg_check_student_type
-BEFORE INSERT OR UPDATE ON student
-FOR EACH ROW
+DROP TRIGGER IF EXISTS trg_check_student_type_insert ON student;
+CREATE TRIGGER trg_check_student_type_insert
+AFTER INSERT ON student
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION check_student_type();
+
+DROP TRIGGER IF EXISTS trg_check_student_type_update ON student;
+CREATE TRIGGER trg_check_student_type_update
+AFTER UPDATE ON student
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
 EXECUTE FUNCTION check_student_type();
 
 -- FACULTY
 CREATE OR REPLACE FUNCTION check_faculty_type()
 RETURNS TRIGGER AS $$
-DECLARE memberType VARCHAR(20);
+DECLARE bad RECORD;
 BEGIN
-    SELECT member_type INTO memberType FROM lab_member WHERE mid = NEW.mid;
-    IF memberType IS NULL THEN
-        RAISE EXCEPTION 'Member % does not exist in LAB_MEMBER.', NEW.mid;
-    ELSIF memberType <> 'Faculty' THEN
-        RAISE EXCEPTION 'Member % is not of type Faculty in LAB_MEMBER.', NEW.mid;
+    SELECT n.mid, lm.member_type INTO bad
+    FROM new_rows n
+    LEFT JOIN lab_member lm ON lm.mid = n.mid
+    WHERE lm.mid IS NULL OR lm.member_type <> 'Faculty'
+    LIMIT 1;
+    IF FOUND THEN
+        IF bad.member_type IS NULL THEN
+            RAISE EXCEPTION 'Member % does not exist in LAB_MEMBER.', bad.mid;
+        ELSE
+            RAISE EXCEPTION 'Member % is not of type Faculty in LAB_MEMBER.', bad.mid;
+        END IF;
     END IF;
-    RETURN NEW;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS trg_check_faculty_type ON faculty;
-CREATE TRIGGER trg_check_faculty_type
-BEFORE INSERT OR UPDATE ON faculty
-FOR EACH ROW
+DROP TRIGGER IF EXISTS trg_check_faculty_type_insert ON faculty;
+CREATE TRIGGER trg_check_faculty_type_insert
+AFTER INSERT ON faculty
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION check_faculty_type();
+
+DROP TRIGGER IF EXISTS trg_check_faculty_type_update ON faculty;
+CREATE TRIGGER trg_check_faculty_type_update
+AFTER UPDATE ON faculty
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
 EXECUTE FUNCTION check_faculty_type();
 
 -- COLLABORATOR
 CREATE OR REPLACE FUNCTION check_collaborator_type()
 RETURNS TRIGGER AS $$
-DECLARE memberType VARCHAR(20);
+DECLARE bad RECORD;
 BEGIN
-    SELECT member_type INTO memberType FROM lab_member WHERE mid = NEW.mid;
-    IF memberType IS NULL THEN
-        RAISE EXCEPTION 'Member % does not exist in LAB_MEMBER.', NEW.mid;
-    ELSIF memberType <> 'Collaborator' THEN
-        RAISE EXCEPTION 'Member % is not of type Collaborator in LAB_MEMBER.', NEW.mid;
+    SELECT n.mid, lm.member_type INTO bad
+    FROM new_rows n
+    LEFT JOIN lab_member lm ON lm.mid = n.mid
+    WHERE lm.mid IS NULL OR lm.member_type <> 'Collaborator'
+    LIMIT 1;
+    IF FOUND THEN
+        IF bad.member_type IS NULL THEN
+            RAISE EXCEPTION 'Member % does not exist in LAB_MEMBER.', bad.mid;
+        ELSE
+            RAISE EXCEPTION 'Member % is not of type Collaborator in LAB_MEMBER.', bad.mid;
+        END IF;
     END IF;
-    RETURN NEW;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS trg_check_collaborator_type ON collaborator;
-CREATE TRIGGER trg_check_collaborator_type
-BEFORE INSERT OR UPDATE ON collaborator
-FOR EACH ROW
+DROP TRIGGER IF EXISTS trg_check_collaborator_type_insert ON collaborator;
+CREATE TRIGGER trg_check_collaborator_type_insert
+AFTER INSERT ON collaborator
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION check_collaborator_type();
+
+DROP TRIGGER IF EXISTS trg_check_collaborator_type_update ON collaborator;
+CREATE TRIGGER trg_check_collaborator_type_update
+AFTER UPDATE ON collaborator
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
 EXECUTE FUNCTION check_collaborator_type();
 
 -- ============================
--- 3. PROJECT: FACULTYID MUST BE FACULTY
+-- 3. PROJECT: FACULTYID MUST BE FACULTY (statement-level, as above)
 -- ============================
 CREATE OR REPLACE FUNCTION check_project_faculty_type()
 RETURNS TRIGGER AS $$
-DECLARE memberType VARCHAR(20);
+DECLARE bad RECORD;
 BEGIN
-    SELECT member_type INTO memberType FROM lab_member WHERE mid = NEW.facultyid;
-    IF memberType IS NULL THEN
-        RAISE EXCEPTION 'FACULTYID % does not exist in LAB_MEMBER.', NEW.facultyid;
-    ELSIF memberType <> 'Faculty' THEN
-        RAISE EXCEPTION 'FACULTYID % is not of type Faculty in LAB_MEMBER.', NEW.facultyid;
+    SELECT n.facultyid AS mid, lm.member_type INTO bad
+    FROM new_rows n
+    LEFT JOIN lab_member lm ON lm.mid = n.facultyid
+    WHERE lm.mid IS NULL OR lm.member_type <> 'Faculty'
+    LIMIT 1;
+    IF FOUND THEN
+        IF bad.member_type IS NULL THEN
+            RAISE EXCEPTION 'FACULTYID % does not exist in LAB_MEMBER.', bad.mid;
+        ELSE
+            RAISE EXCEPTION 'FACULTYID % is not of type Faculty in LAB_MEMBER.', bad.mid;
+        END IF;
     END IF;
-    RETURN NEW;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS trg_check_project_faculty_type ON project;
-CREATE TRIGGER trg_check_project_faculty_type
-BEFORE INSERT OR UPDATE ON project
-FOR EACH ROW
+DROP TRIGGER IF EXISTS trg_check_project_faculty_type_insert ON project;
+CREATE TRIGGER trg_check_project_faculty_type_insert
+AFTER INSERT ON project
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION check_project_faculty_type();
+
+DROP TRIGGER IF EXISTS trg_check_project_faculty_type_update ON project;
+CREATE TRIGGER trg_check_project_faculty_type_update
+AFTER UPDATE ON project
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
 EXECUTE FUNCTION check_project_faculty_type();
 
 -- ============================
 -- 4. WORKS: WEEKLY HOURS ≤ 40
+--    MEMBER_WEEK_HOURS (see create.py) keeps the total hours and the number
+--    of WORKS rows per member and week. Statement-level triggers apply the
+--    net change of each INSERT / UPDATE / DELETE from its transition tables,
+--    so the 40-hour check is a lookup of the touched summary rows instead of
+--    a SUM over WORKS per row. A total whose count drops to 0 is deleted.
 -- ============================
-CREATE OR REPLACE FUNCTION check_member_week_hours()
+DROP TRIGGER IF EXISTS trg_check_member_week_hours ON works;
+DROP FUNCTION IF EXISTS check_member_week_hours();
+
+-- Summaries created before ENTRIES existed; rebuilt below
+ALTER TABLE member_week_hours ADD COLUMN IF NOT EXISTS entries INT NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION maintain_member_week_hours()
 RETURNS TRIGGER AS $$
-DECLARE total_hours INT;
+DECLARE over_limit RECORD;
 BEGIN
-    SELECT COALESCE(SUM(hours),0) INTO total_hours
-    FROM works
-    WHERE mid = NEW.mid
-      AND week = NEW.week
-      AND (pid, mid) <> (NEW.pid, NEW.mid);
-    IF total_hours + NEW.hours > 40 THEN
-        RAISE EXCEPTION 'Total hours for member % in week % would be %, exceeding 40.', NEW.mid, NEW.week, total_hours + NEW.hours;
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM member_week_hours;
+        RETURN NULL;
     END IF;
-    RETURN NEW;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE member_week_hours s
+        SET hours = s.hours - d.hours, entries = s.entries - d.entries
+        FROM (
+            SELECT mid, week, SUM(COALESCE(hours, 0)) AS hours, COUNT(*) AS entries
+            FROM old_rows GROUP BY mid, week
+        ) d
+        WHERE s.mid = d.mid AND s.week = d.week;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO member_week_hours AS s (mid, week, hours, entries)
+        SELECT mid, week, SUM(COALESCE(hours, 0)), COUNT(*)
+        FROM new_rows GROUP BY mid, week
+        ON CONFLICT (mid, week) DO UPDATE
+        SET hours = s.hours + EXCLUDED.hours, entries = s.entries + EXCLUDED.entries;
+
+        SELECT s.mid, s.week, s.hours INTO over_limit
+        FROM member_week_hours s
+        JOIN (SELECT DISTINCT mid, week FROM new_rows) n ON n.mid = s.mid AND n.week = s.week
+        WHERE s.hours > 40
+        ORDER BY s.mid, s.week
+        LIMIT 1;
+        IF FOUND THEN
+            RAISE EXCEPTION 'Total hours for member % in week % would be %, exceeding 40.', over_limit.mid, over_limit.week, over_limit.hours;
+        END IF;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        -- Drop summary rows whose member-week has no WORKS rows left
+        DELETE FROM member_week_hours s
+        USING (SELECT DISTINCT mid, week FROM old_rows) o
+        WHERE s.mid = o.mid AND s.week = o.week AND s.entries <= 0;
+    END IF;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
-DROP TRIGGER IF EXISTS trg_check_member_week_hours ON works;
-CREATE TRIGGER trg_check_member_week_hours
-BEFORE INSERT OR UPDATE ON works
-FOR EACH ROW
-EXECUTE FUNCTION check_member_week_hours();
+-- Transition tables allow only one event per trigger, hence three triggers.
+DROP TRIGGER IF EXISTS trg_member_week_hours_insert ON works;
+CREATE TRIGGER trg_member_week_hours_insert
+AFTER INSERT ON works
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_member_week_hours();
+
+DROP TRIGGER IF EXISTS trg_member_week_hours_update ON works;
+CREATE TRIGGER trg_member_week_hours_update
+AFTER UPDATE ON works
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_member_week_hours();
+
+DROP TRIGGER IF EXISTS trg_member_week_hours_delete ON works;
+CREATE TRIGGER trg_member_week_hours_delete
+AFTER DELETE ON works
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_member_week_hours();
+
+DROP TRIGGER IF EXISTS trg_member_week_hours_truncate ON works;
+CREATE TRIGGER trg_member_week_hours_truncate
+AFTER TRUNCATE ON works
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_member_week_hours();
+
+-- Validation: recompute MEMBER_WEEK_HOURS from WORKS and return how many
+-- member-weeks had drifted (0 when the summary was already correct).
+CREATE OR REPLACE FUNCTION rebuild_member_week_hours()
+RETURNS INT AS $$
+DECLARE drifted INT;
+BEGIN
+    -- Keep writers out of WORKS while the totals are recomputed
+    LOCK TABLE works IN SHARE MODE;
+    LOCK TABLE member_week_hours IN EXCLUSIVE MODE;
+
+    CREATE TEMP TABLE actual_week_hours ON COMMIT DROP AS
+    SELECT mid, week, SUM(COALESCE(hours, 0))::INT AS hours, COUNT(*)::INT AS entries
+    FROM works GROUP BY mid, week;
+
+    SELECT COUNT(*) INTO drifted
+    FROM actual_week_hours a
+    FULL JOIN member_week_hours s ON s.mid = a.mid AND s.week = a.week
+    WHERE (a.hours, a.entries) IS DISTINCT FROM (s.hours, s.entries);
+
+    DELETE FROM member_week_hours;
+    INSERT INTO member_week_hours (mid, week, hours, entries)
+    SELECT mid, week, hours, entries FROM actual_week_hours;
+    DROP TABLE actual_week_hours;
+    RETURN drifted;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill the summary for rows loaded before these triggers existed
+SELECT rebuild_member_week_hours();
+
+-- ============================
+-- 4b. WORKS: EFFORT LEDGER
+--    MEMBER_PROJECT_MONTH_HOURS and PROJECT_WEEK_HOURS (see create.py) roll
+--    WORKS up per member/project/month and per project/week. WEEK is a week
+--    number within the year (1..53, checked on WORKS by create.py);
+--    week_month() maps it to the month its first day falls in. Any other week
+--    has no month, so the ledger's NOT NULL MONTH rejects it rather than
+--    filing its hours under the wrong month. As for MEMBER_WEEK_HOURS,
+--    statement-level triggers add the new rows' totals and subtract the old
+--    rows', then drop totals whose ENTRIES count has reached 0.
+-- ============================
+CREATE OR REPLACE FUNCTION week_month(week INT)
+RETURNS INT AS $$
+    SELECT CASE WHEN week BETWEEN 1 AND 53
+                THEN EXTRACT(MONTH FROM DATE '2001-01-01' + (week - 1) * 7)::INT END;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION maintain_effort_ledger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM member_project_month_hours;
+        DELETE FROM project_week_hours;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO member_project_month_hours AS s (mid, pid, month, hours, entries)
+        SELECT mid, pid, week_month(week), -SUM(COALESCE(hours, 0)), -COUNT(*)
+        FROM old_rows GROUP BY mid, pid, week_month(week)
+        ON CONFLICT (mid, pid, month) DO UPDATE
+        SET hours = s.hours + EXCLUDED.hours, entries = s.entries + EXCLUDED.entries;
+
+        INSERT INTO project_week_hours AS s (pid, week, hours, entries)
+        SELECT pid, week, -SUM(COALESCE(hours, 0)), -COUNT(*)
+        FROM old_rows GROUP BY pid, week
+        ON CONFLICT (pid, week) DO UPDATE
+        SET hours = s.hours + EXCLUDED.hours, entries = s.entries + EXCLUDED.entries;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO member_project_month_hours AS s (mid, pid, month, hours, entries)
+        SELECT mid, pid, week_month(week), SUM(COALESCE(hours, 0)), COUNT(*)
+        FROM new_rows GROUP BY mid, pid, week_month(week)
+        ON CONFLICT (mid, pid, month) DO UPDATE
+        SET hours = s.hours + EXCLUDED.hours, entries = s.entries + EXCLUDED.entries;
+
+        INSERT INTO project_week_hours AS s (pid, week, hours, entries)
+        SELECT pid, week, SUM(COALESCE(hours, 0)), COUNT(*)
+        FROM new_rows GROUP BY pid, week
+        ON CONFLICT (pid, week) DO UPDATE
+        SET hours = s.hours + EXCLUDED.hours, entries = s.entries + EXCLUDED.entries;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM member_project_month_hours s
+        USING (SELECT DISTINCT mid, pid, week_month(week) AS month FROM old_rows) o
+        WHERE s.mid = o.mid AND s.pid = o.pid AND s.month = o.month AND s.entries <= 0;
+
+        DELETE FROM project_week_hours s
+        USING (SELECT DISTINCT pid, week FROM old_rows) o
+        WHERE s.pid = o.pid AND s.week = o.week AND s.entries <= 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_effort_ledger_insert ON works;
+CREATE TRIGGER trg_effort_ledger_insert
+AFTER INSERT ON works
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_effort_ledger();
+
+DROP TRIGGER IF EXISTS trg_effort_ledger_update ON works;
+CREATE TRIGGER trg_effort_ledger_update
+AFTER UPDATE ON works
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_effort_ledger();
+
+DROP TRIGGER IF EXISTS trg_effort_ledger_delete ON works;
+CREATE TRIGGER trg_effort_ledger_delete
+AFTER DELETE ON works
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_effort_ledger();
+
+DROP TRIGGER IF EXISTS trg_effort_ledger_truncate ON works;
+CREATE TRIGGER trg_effort_ledger_truncate
+AFTER TRUNCATE ON works
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_effort_ledger();
+
+-- Validation: recompute both ledger tables from WORKS and return how many
+-- totals had drifted (0 when the ledger was already correct).
+CREATE OR REPLACE FUNCTION rebuild_effort_ledger()
+RETURNS INT AS $$
+DECLARE
+    drifted INT;
+    drifted_weeks INT;
+BEGIN
+    LOCK TABLE works IN SHARE MODE;
+    LOCK TABLE member_project_month_hours IN EXCLUSIVE MODE;
+    LOCK TABLE project_week_hours IN EXCLUSIVE MODE;
+
+    CREATE TEMP TABLE actual_month_hours ON COMMIT DROP AS
+    SELECT mid, pid, week_month(week) AS month, SUM(COALESCE(hours, 0))::BIGINT AS hours, COUNT(*)::INT AS entries
+    FROM works GROUP BY mid, pid, week_month(week);
+
+    CREATE TEMP TABLE actual_project_week_hours ON COMMIT DROP AS
+    SELECT pid, week, SUM(COALESCE(hours, 0))::BIGINT AS hours, COUNT(*)::INT AS entries
+    FROM works GROUP BY pid, week;
+
+    SELECT COUNT(*) INTO drifted
+    FROM actual_month_hours a
+    FULL JOIN member_project_month_hours s ON s.mid = a.mid AND s.pid = a.pid AND s.month = a.month
+    WHERE (a.hours, a.entries) IS DISTINCT FROM (s.hours, s.entries);
+
+    SELECT COUNT(*) INTO drifted_weeks
+    FROM actual_project_week_hours a
+    FULL JOIN project_week_hours s ON s.pid = a.pid AND s.week = a.week
+    WHERE (a.hours, a.entries) IS DISTINCT FROM (s.hours, s.entries);
+
+    DELETE FROM member_project_month_hours;
+    INSERT INTO member_project_month_hours (mid, pid, month, hours, entries)
+    SELECT mid, pid, month, hours, entries FROM actual_month_hours;
+    DELETE FROM project_week_hours;
+    INSERT INTO project_week_hours (pid, week, hours, entries)
+    SELECT pid, week, hours, entries FROM actual_project_week_hours;
+    DROP TABLE actual_month_hours;
+    DROP TABLE actual_project_week_hours;
+    RETURN drifted + drifted_weeks;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill the ledger for rows loaded before these triggers existed
+SELECT rebuild_effort_ledger();
 
 -- ============================
 -- 5. CASCADE DELETES (implemented as AFTER DELETE triggers)
@@ -163,6 +459,92 @@ EXECUTE FUNCTION check_member_week_hours();
 -- in the schema (see create.py). To avoid duplicate or conflicting
 -- logic we do not create application-level cascade triggers here.
 
+-- ============================
+-- 6. CHANGE NOTIFICATIONS FOR OPEN WINDOWS
+--    Statement-level triggers send one pg_notify('lab_changes', ...) per
+--    changed row with a compact JSON payload {"table", "op", "key"}, where key
+--    is the array of the row's primary-key values (the trigger arguments).
+--    Database.add_listener() receives them and the open tables apply the
+--    deltas. An UPDATE that changes a key also reports the old key as a
+--    DELETE. Statements touching more than 100 rows, and TRUNCATE, send a
+--    single RELOAD event instead of flooding the notification queue.
+-- ============================
+CREATE OR REPLACE FUNCTION notify_lab_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    key_expr TEXT;
+    changed BIGINT;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('lab_changes', jsonb_build_object('table', TG_TABLE_NAME, 'op', 'RELOAD')::text);
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        SELECT COUNT(*) INTO changed FROM old_rows;
+    ELSE
+        SELECT COUNT(*) INTO changed FROM new_rows;
+    END IF;
+    IF changed = 0 THEN
+        RETURN NULL;
+    ELSIF changed > 100 THEN
+        PERFORM pg_notify('lab_changes', jsonb_build_object('table', TG_TABLE_NAME, 'op', 'RELOAD')::text);
+        RETURN NULL;
+    END IF;
+
+    SELECT 'jsonb_build_array(' || string_agg(quote_ident(col), ', ') || ')' INTO key_expr
+    FROM unnest(TG_ARGV) AS col;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        EXECUTE format(
+            'SELECT pg_notify(''lab_changes'', jsonb_build_object(''table'', %L, ''op'', %L, ''key'', %s)::text) FROM new_rows',
+            TG_TABLE_NAME, TG_OP, key_expr);
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        EXECUTE format(
+            'SELECT pg_notify(''lab_changes'', jsonb_build_object(''table'', %L, ''op'', ''DELETE'', ''key'', %s)::text) FROM old_rows',
+            TG_TABLE_NAME, key_expr);
+    ELSIF TG_OP = 'UPDATE' THEN
+        EXECUTE format(
+            'SELECT pg_notify(''lab_changes'', jsonb_build_object(''table'', %L, ''op'', ''DELETE'', ''key'', k)::text) '
+            'FROM (SELECT %s AS k FROM old_rows EXCEPT SELECT %s FROM new_rows) gone',
+            TG_TABLE_NAME, key_expr, key_expr);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- One trigger per event (transition tables allow only one) on each table
+-- shown in an open window, with the table's key columns as arguments.
+DO $$
+DECLARE
+    t RECORD;
+    ev TEXT;
+    referencing TEXT;
+BEGIN
+    FOR t IN SELECT * FROM (VALUES
+        ('uses', ARRAY['eid', 'mid', 'start_date']),
+        ('lab_member', ARRAY['mid']),
+        ('project', ARRAY['pid']),
+        ('equipment', ARRAY['eid'])
+    ) AS v(tbl, keys) LOOP
+        FOREACH ev IN ARRAY ARRAY['insert', 'update', 'delete', 'truncate'] LOOP
+            referencing := CASE ev
+                WHEN 'insert' THEN 'REFERENCING NEW TABLE AS new_rows'
+                WHEN 'update' THEN 'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows'
+                WHEN 'delete' THEN 'REFERENCING OLD TABLE AS old_rows'
+                ELSE ''
+            END;
+            EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_notify_' || t.tbl || '_' || ev, t.tbl);
+            EXECUTE format(
+                'CREATE TRIGGER %I AFTER %s ON %I %s FOR EACH STATEMENT EXECUTE FUNCTION notify_lab_change(%s)',
+                'trg_notify_' || t.tbl || '_' || ev, upper(ev), t.tbl, referencing,
+                (SELECT string_agg(quote_literal(k), ', ') FROM unnest(t.keys) AS k));
+        END LOOP;
+    END LOOP;
+END;
+$$;
+
 """
 
 # Connect to the database and execute triggers
@@ -0,0 +1,207 @@
+import argparse
+import time
+
+from create import get_connection
+
+
+# ------------------------
+# REPORTING VIEWS
+# ------------------------
+# Materialized copies of the reporting menu's aggregates, so a report reads a
+# few precomputed rows instead of re-aggregating PUBLISHED/WORKS/FUNDS on every
+# click. Each view has a unique index, which REFRESH ... CONCURRENTLY needs so
+# readers are never blocked while a view is rebuilt.
+VIEWS = {
+    # Top publishers: publications per member (0 for members without any)
+    "report_member_publications": (
+        """
+        CREATE MATERIALIZED VIEW IF NOT EXISTS report_member_publications AS
+        SELECT lm.mid, lm.name, COUNT(p.publicationid) AS pubs
+        FROM lab_member lm
+        LEFT JOIN published p ON p.mid = lm.mid
+        GROUP BY lm.mid, lm.name;
+        """,
+        [
+            "CREATE UNIQUE INDEX IF NOT EXISTS report_member_publications_mid ON report_member_publications (mid);",
+            "CREATE INDEX IF NOT EXISTS report_member_publications_pubs ON report_member_publications (pubs DESC);",
+        ],
+    ),
+    # Average student publications: publications and students per major
+    "report_major_publications": (
+        """
+        CREATE MATERIALIZED VIEW IF NOT EXISTS report_major_publications AS
+        SELECT s.major, COUNT(pub.publicationid) AS pubs,
+               COUNT(DISTINCT m.mid) AS students
+        FROM lab_member m
+        JOIN student s ON s.mid = m.mid
+        LEFT JOIN published pub ON pub.mid = m.mid
+        WHERE TRIM(m.member_type) ILIKE 'student'
+        GROUP BY s.major;
+        """,
+        [
+            "CREATE UNIQUE INDEX IF NOT EXISTS report_major_publications_major ON report_major_publications (major);",
+        ],
+    ),
+    # Top 3 for a grant: publications per member of every grant's projects
+    "report_grant_member_publications": (
+        """
+        CREATE MATERIALIZED VIEW IF NOT EXISTS report_grant_member_publications AS
+        SELECT f.gid, w.mid, COUNT(pub.publicationid) AS pubs
+        FROM works w
+        JOIN funds f ON f.pid = w.pid
+        LEFT JOIN published pub ON pub.mid = w.mid
+        GROUP BY f.gid, w.mid;
+        """,
+        [
+            "CREATE UNIQUE INDEX IF NOT EXISTS report_grant_member_publications_gid_mid "
+            "ON report_grant_member_publications (gid, mid);",
+            "CREATE INDEX IF NOT EXISTS report_grant_member_publications_gid_pubs "
+            "ON report_grant_member_publications (gid, pubs DESC);",
+        ],
+    ),
+}
+
+# Base tables whose writes make a view stale
+VIEW_SOURCES = {
+    "published": ["report_member_publications", "report_major_publications", "report_grant_member_publications"],
+    "lab_member": ["report_member_publications", "report_major_publications"],
+    "student": ["report_major_publications"],
+    "works": ["report_grant_member_publications"],
+    "funds": ["report_grant_member_publications"],
+}
+
+# Change log, refresh bookkeeping and the refresh function. Writers only
+# append to REPORT_VIEW_CHANGES (one row per statement and affected view), so
+# they never contend on a shared "dirty" flag. A refresh deletes the changes
+# it can see and then rebuilds the view from a later snapshot; a change that
+# commits in between keeps its log row and leaves the view marked stale.
+VIEWS_SQL = """
+CREATE TABLE IF NOT EXISTS REPORT_VIEW_STATE (
+    VIEW_NAME TEXT NOT NULL PRIMARY KEY,
+    REFRESHED_AT TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS REPORT_VIEW_CHANGES (
+    VIEW_NAME TEXT NOT NULL,
+    TABLE_NAME TEXT NOT NULL,
+    CHANGED_AT TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS idx_report_view_changes_view ON REPORT_VIEW_CHANGES (VIEW_NAME);
+
+CREATE OR REPLACE FUNCTION note_report_view_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- TG_ARGV lists the views that read the changed table
+    INSERT INTO report_view_changes (view_name, table_name)
+    SELECT unnest(TG_ARGV), TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Refresh the views with pending changes (every view when force is true) and
+-- return their names. A view another session is already refreshing is skipped.
+CREATE OR REPLACE FUNCTION refresh_report_views(force BOOLEAN DEFAULT false)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    v TEXT;
+    started TIMESTAMPTZ;
+BEGIN
+    FOR v IN SELECT view_name FROM report_view_state ORDER BY view_name LOOP
+        CONTINUE WHEN NOT force
+            AND NOT EXISTS (SELECT 1 FROM report_view_changes c WHERE c.view_name = v);
+        CONTINUE WHEN NOT pg_try_advisory_xact_lock(hashtext('report_view:' || v));
+        DELETE FROM report_view_changes WHERE view_name = v;
+        started := clock_timestamp();
+        EXECUTE format('REFRESH MATERIALIZED VIEW CONCURRENTLY %I', v);
+        UPDATE report_view_state SET refreshed_at = started WHERE view_name = v;
+        RETURN NEXT v;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# When each view was last refreshed and how many changes it has not seen yet
+STATUS_SQL = """
+SELECT s.view_name, s.refreshed_at, COUNT(c.view_name) AS pending
+FROM report_view_state s
+LEFT JOIN report_view_changes c ON c.view_name = s.view_name
+GROUP BY s.view_name, s.refreshed_at
+ORDER BY s.view_name;
+"""
+
+
+def source_triggers():
+    """DDL for the statement-level triggers that log changes to VIEW_SOURCES."""
+    statements = []
+    for table, views in VIEW_SOURCES.items():
+        trigger = f"trg_report_views_{table}"
+        args = ", ".join(f"'{v}'" for v in views)
+        statements.append(f"DROP TRIGGER IF EXISTS {trigger} ON {table};")
+        statements.append(
+            f"CREATE TRIGGER {trigger} "
+            f"AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION note_report_view_change({args});"
+        )
+    return statements
+
+
+def create_views(cur):
+    cur.execute(VIEWS_SQL)
+    for name, (definition, indexes) in VIEWS.items():
+        cur.execute(definition)
+        for ddl in indexes:
+            cur.execute(ddl)
+        cur.execute(
+            "INSERT INTO report_view_state (view_name) VALUES (%s) ON CONFLICT (view_name) DO NOTHING;",
+            (name,)
+        )
+    for ddl in source_triggers():
+        cur.execute(ddl)
+
+
+def refresh_views(cur, force=False):
+    """Refresh stale views (or all of them with force); return the refreshed names."""
+    cur.execute("SELECT refresh_report_views(%s);", (force,))
+    return [row[0] for row in cur.fetchall()]
+
+
+def view_status(cur):
+    cur.execute(STATUS_SQL)
+    return cur.fetchall()
+
+
+def main(refresh=False, force=False, watch=None):
+    conn = get_connection()
+    cur = conn.cursor()
+
+    if not refresh and watch is None:
+        create_views(cur)
+        conn.commit()
+        print(f"{len(VIEWS)} reporting views created (or already present).")
+        force = True
+
+    while True:
+        refreshed = refresh_views(cur, force=force)
+        conn.commit()
+        for name, refreshed_at, pending in view_status(cur):
+            mark = "refreshed" if name in refreshed else ("stale" if pending else "current")
+            print(f"{name}: {mark}, as of {refreshed_at:%Y-%m-%d %H:%M:%S}")
+        conn.commit()
+        if watch is None:
+            break
+        force = False
+        time.sleep(watch)
+
+    cur.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and refresh the materialized reporting views.")
+    parser.add_argument("--refresh", action="store_true",
+                        help="only refresh views with pending changes (skip creation)")
+    parser.add_argument("--force", action="store_true", help="with --refresh, refresh every view")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="keep refreshing stale views every SECONDS (e.g. from a service)")
+    args = parser.parse_args()
+    main(refresh=args.refresh, force=args.force, watch=args.watch)